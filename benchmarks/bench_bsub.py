@@ -0,0 +1,124 @@
+"""Micro-benchmark for boundary substitution vertex matching.
+
+Builds a pit-contour-like ring A of n vertices and a notch polygon B whose
+outer arc shares a quarter of A's vertices, then times
+i3model._boundary_substitution with the grid indexes of i3viewer.i3spatial
+against a reference run in which every grid lookup returns every vertex or
+edge (the original all-pairs matching). Both runs must return the same
+result.
+
+    python -m benchmarks.bench_bsub --sizes 500 1000 2000 5000
+"""
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+from unittest import mock
+
+import i3viewer.i3model as i3model_module
+from i3viewer.i3model import i3model
+
+
+class _AllPoints:
+    """Drop-in for GridIndex that scans every point (the O(n) lookup)."""
+
+    def __init__(self, points, radius):
+        self.points = points
+        self.radius = radius
+
+    def first_within(self, x, y):
+        r2 = self.radius * self.radius
+        for k, p in enumerate(self.points):
+            if (p[0] - x) ** 2 + (p[1] - y) ** 2 < r2:
+                return k
+        return None
+
+
+class _AllSegments:
+    """Drop-in for SegmentGrid whose queries return every segment."""
+
+    def __init__(self, points, radius, slack=None, closed=False, **_):
+        n = len(points)
+        self.all = list(range(n if closed else max(n - 1, 0)))
+
+    def candidates(self, x, y):
+        return self.all
+
+
+def make_pair(n, seed=11):
+    """Return (a_pts, b_pts): a closed ring of n vertices near (8e6, 8e6)
+    and a notch polygon sharing n // 4 of its vertices."""
+    rng = random.Random(seed)
+    cx, cy, radius = 8.0e6, 8.0e6, 600.0
+    a_pts = []
+    for i in range(n):
+        a = 2 * math.pi * i / n
+        r = radius * (1 + 0.05 * math.sin(7 * a))
+        a_pts.append((round(cx + r * math.cos(a), 3), round(cy + r * math.sin(a), 3), 3015.0))
+    a_pts.append(a_pts[0])
+
+    start = n // 8
+    shared = a_pts[start:start + n // 4 + 1]
+    inner = []
+    steps = max(4, len(shared) // 4)
+    for s in range(1, steps):
+        t = s / steps
+        x0, y0, _ = shared[-1]
+        x1, y1, _ = shared[0]
+        depth = 25.0 * math.sin(math.pi * t) + rng.uniform(0, 1)
+        px, py = x0 + (x1 - x0) * t, y0 + (y1 - y0) * t
+        norm = math.hypot(px - cx, py - cy)
+        inner.append((round(px - (px - cx) / norm * depth, 3),
+                      round(py - (py - cy) / norm * depth, 3), 3015.0))
+    return a_pts, shared + inner
+
+
+def _best_of(fn, repeat):
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat, reference=True):
+    print(f"{'n':>7} {'grid s':>10} {'all-pairs s':>12} {'speedup':>8}")
+    for n in sizes:
+        a_pts, b_pts = make_pair(n)
+
+        def substitute():
+            return i3model._boundary_substitution(a_pts, b_pts)
+
+        t_grid, got = _best_of(substitute, repeat)
+        if got is None:
+            raise AssertionError(f"n={n}: substitution failed on the synthetic pair")
+        if not reference:
+            print(f"{n:>7} {t_grid:>10.4f}")
+            continue
+
+        with mock.patch.object(i3model_module, "GridIndex", _AllPoints), \
+                mock.patch.object(i3model_module, "SegmentGrid", _AllSegments):
+            t_ref, ref = _best_of(substitute, repeat)
+        if ref != got:
+            raise AssertionError(f"n={n}: grid matching disagrees with all-pairs matching")
+        print(f"{n:>7} {t_grid:>10.4f} {t_ref:>12.4f} {t_ref / t_grid:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000, 5000],
+                        help="vertices in contour A")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size (best is kept)")
+    parser.add_argument("--no-reference", action="store_true",
+                        help="skip the all-pairs reference run")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, not args.no_reference)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Micro-benchmark for the segment intersection stage of _clip_contour_2d.
+
+Builds a pit-contour-like ring A of n vertices and a wavy ring B of n
+vertices that crosses it a few dozen times, then times
+i3model._segment_intersections_2d (sort-and-sweep over segment boxes)
+against the all-pairs loop _clip_contour_2d used before, which tests every
+A segment against every B edge. Both must return the same events. The
+all-pairs reference is O(n^2) and is skipped above --reference-max.
+
+    python -m benchmarks.bench_clip --sizes 100 1000 10000 100000
+"""
+import argparse
+import contextlib
+import io
+import math
+import time
+
+from i3viewer.i3model import i3model
+
+
+def make_pair(n, crossings=24):
+    """Return (arc, b_closed): a closed ring of n vertices near (8e6, 8e6)
+    and a closed ring of n vertices crossing it about `crossings` times."""
+    cx, cy, radius = 8.0e6, 8.0e6, 600.0
+    arc, b_closed = [], []
+    for i in range(n):
+        a = 2 * math.pi * i / n
+        r = radius * (1 + 0.05 * math.sin(7 * a))
+        arc.append((round(cx + r * math.cos(a), 3), round(cy + r * math.sin(a), 3), 3015.0))
+        r = radius * (1 + 0.05 * math.sin(7 * a) + 0.01 * math.sin(crossings / 2 * a + 0.3))
+        b_closed.append((round(cx + r * math.cos(a), 3), round(cy + r * math.sin(a), 3), 3015.0))
+    arc.append(arc[0])
+    b_closed.append(b_closed[0])
+    return arc, b_closed
+
+
+def all_pairs_events(arc, b_closed):
+    """The intersection loop of _clip_contour_2d before the sweep."""
+    events = []
+    for i in range(len(arc) - 1):
+        p1 = arc[i][:2]
+        p2 = arc[i + 1][:2]
+        for j in range(len(b_closed) - 1):
+            r = i3model._segment_intersect_2d(p1, p2, b_closed[j][:2], b_closed[j + 1][:2])
+            if r is not None:
+                t, u, ix, iy = r
+                events.append((i, t, ix, iy, j, u))
+    events.sort(key=lambda e: (e[0], e[1]))
+    return events
+
+
+def _best_of(fn, repeat):
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat, reference_max):
+    print(f"{'n':>7} {'events':>7} {'sweep s':>10} {'all-pairs s':>12} {'speedup':>8}")
+    for n in sizes:
+        arc, b_closed = make_pair(n)
+        t_sweep, got = _best_of(lambda: i3model._segment_intersections_2d(arc, b_closed), repeat)
+        if n > reference_max:
+            print(f"{n:>7} {len(got):>7} {t_sweep:>10.4f} {'-':>12} {'-':>8}")
+            continue
+
+        t_ref, ref = _best_of(lambda: all_pairs_events(arc, b_closed), repeat)
+        if ref != got:
+            raise AssertionError(f"n={n}: sweep events disagree with all-pairs events")
+        print(f"{n:>7} {len(got):>7} {t_sweep:>10.4f} {t_ref:>12.4f} {t_ref / t_sweep:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 300, 1000, 3000, 10000, 30000, 100000],
+                        help="vertices in each ring")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size (best is kept)")
+    parser.add_argument("--reference-max", type=int, default=3000,
+                        help="largest n to also run the all-pairs reference on")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.reference_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Throughput benchmark for the block parser in i3viewer.i3parser.
+
+Writes a synthetic XYZS file of the requested size (pit-contour-like rings
+separated by '$'), then times the NumPy block parser against a plain
+line-by-line reader and reports MB/s for both.
+
+    python -m benchmarks.bench_parser --mb 50 --repeat 3
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+from i3viewer.i3parser import (blocks_to_polylines, blocks_to_surfaces,
+                               read_xyz_blocks)
+
+
+def write_synthetic_xyzs(file_path, target_mb, ring_size=2000, seed=7):
+    """Write '$'-separated rings until the file reaches target_mb."""
+    rng = random.Random(seed)
+    target = int(target_mb * 1024 * 1024)
+    written = 0
+    with open(file_path, "w") as f:
+        while written < target:
+            cx, cy = rng.uniform(8.0e6, 8.1e6), rng.uniform(8.0e6, 8.1e6)
+            z = rng.choice(range(3000, 4200, 15))
+            radius = rng.uniform(50, 900)
+            lines = []
+            for i in range(ring_size):
+                a = 2 * math.pi * i / ring_size
+                r = radius * (1 + 0.05 * math.sin(7 * a))
+                lines.append(f"{cx + r * math.cos(a):.3f} {cy + r * math.sin(a):.3f} {z:.3f}\n")
+            lines.append("$\n")
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk)
+
+
+def read_line_by_line(file_path, with_gradient):
+    """Reference scalar reader: split(), float() and round() per line."""
+    blocks = {1: []}
+    block_id = 1
+    with open(file_path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if line == "$":
+                block_id += 1
+                blocks[block_id] = []
+                continue
+            parts = line.split()
+            if len(parts) != 3:
+                continue
+            x, y, z = (round(float(v), 3) for v in parts)
+            if not with_gradient:
+                blocks[block_id].append((x, y, z))
+                continue
+            prev = blocks[block_id][-1] if blocks[block_id] else None
+            gradient = 0.0
+            if prev is not None:
+                distance = math.sqrt((x - prev[0]) ** 2 + (y - prev[1]) ** 2)
+                gradient = (z - prev[2]) / distance * 100 if distance != 0 else 0.0
+            blocks[block_id].append((x, y, z, round(gradient, 3), None, None))
+    return {k: v for k, v in blocks.items() if v}
+
+
+def read_vectorized(file_path, with_gradient):
+    blocks = read_xyz_blocks(file_path)
+    if with_gradient:
+        return blocks_to_polylines(blocks, 1)
+    return blocks_to_surfaces(blocks, 1)
+
+
+def _best_of(fn, repeat):
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(target_mb, repeat, with_gradient):
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "synthetic.xyzs")
+        write_synthetic_xyzs(file_path, target_mb)
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+
+        t_scalar, ref = _best_of(lambda: read_line_by_line(file_path, with_gradient), repeat)
+        t_vector, got = _best_of(lambda: read_vectorized(file_path, with_gradient), repeat)
+
+        if ref != got:
+            raise AssertionError("vectorized parser disagrees with the line-by-line reader")
+
+        n_points = sum(len(v) for v in got.values())
+        print(f"file: {size_mb:.1f} MB, {len(got)} blocks, {n_points} vertices"
+              f"{' (with gradients)' if with_gradient else ''}")
+        print(f"  line-by-line: {t_scalar:8.3f} s  {size_mb / t_scalar:8.1f} MB/s")
+        print(f"  vectorized:   {t_vector:8.3f} s  {size_mb / t_vector:8.1f} MB/s"
+              f"  ({t_scalar / t_vector:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=20.0, help="synthetic file size in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per reader (best is kept)")
+    parser.add_argument("--gradient", action="store_true",
+                        help="benchmark the polyline path (gradients + tuples)")
+    args = parser.parse_args()
+    run(args.mb, args.repeat, args.gradient)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""End-to-end benchmark suite for i3viewer's data paths.
+
+Generates (or reuses) a synthetic data set (see benchmarks.synthetic) and
+times each stage with a fresh database, keeping the best of --repeat runs:
+the parsers, the *_save_database paths, import_files, run_contour_diff
+(full and fully resumed), updateRoutesTonnes and routes_tonnes_read_period
+over every period and actor building for surfaces, polylines and points. Results are written as JSON.
+
+With --compare, the run is checked against a stored result: a stage that
+is more than --tolerance slower (and at least --min-delta seconds slower)
+is reported as a regression and the exit status is 1.
+
+    python -m benchmarks.suite --scale small --json baseline.json
+    python -m benchmarks.suite --scale small --compare baseline.json
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import math
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import vtk  # registers the OpenGL overrides, as in the GUI
+
+from benchmarks.synthetic import SCALES, generate
+from i3viewer.i3model import i3model
+from i3viewer.i3parser import (blocks_to_polylines, blocks_to_surfaces,
+                               read_csv_blocks, read_xyz_blocks)
+
+
+def _parse(read, convert, file_path):
+    """Parse file_path and convert it to i3model's dict; return the vertex
+    count."""
+    blocks = read(file_path)
+    convert(blocks)
+    return len(blocks.coords)
+
+
+def _best_of(setup, fn, repeat):
+    """Time fn(setup()) repeat times, setup excluded; return (best, runs,
+    result of the last run)."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        state = setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn(state)
+            runs.append(time.perf_counter() - start)
+    return min(runs), runs, result
+
+
+class Suite:
+    """Stages of one benchmark run over the data set in data."""
+
+    def __init__(self, data, work, workers):
+        self.data = data
+        self.work = work
+        self.workers = workers
+        self.pit = os.path.join(data, "pit.xyzs")
+        self.cuts = sorted(glob.glob(os.path.join(data, "cuts", "*.xyzs")))
+        self.polylines_csv = os.path.join(data, "polylines.csv")
+        self.points_srg = os.path.join(data, "points.srg")
+        self._dbs = 0
+
+    # -------------------------------------------------------------------------
+    # Setup helpers
+    # -------------------------------------------------------------------------
+
+    def fresh_db(self):
+        self._dbs += 1
+        return os.path.join(self.work, f"bench{self._dbs}.db")
+
+    def clear_geometry_cache(self):
+        for path in glob.glob(os.path.join(os.environ["I3VIEWER_CACHE_DIR"], "*")):
+            os.remove(path)
+
+    def db_with_surfaces(self):
+        db = self.fresh_db()
+        model = i3model(self.pit)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.surfaces = model.surfaces_read_xyzs_file()
+            model.surfaces_save_database(db)
+        model.surfaces = {}
+        model.file_path = db
+        return model
+
+    def db_with_cuts(self):
+        model = self.db_with_surfaces()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.import_files(self.cuts, workers=self.workers)
+        return model
+
+    def db_with_heatmap(self):
+        """Polylines, routes and tonnes loaded, routes_tonnes joined.
+
+        i3model has no routes importer, so the routes table (route_id,
+        segments) is loaded from routes.csv directly.
+        """
+        db = self.fresh_db()
+        model = i3model(self.polylines_csv)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.polylines = model.polylines_read_csv_file()
+            model.polylines_save_database(db)
+            model.file_path = db
+            with sqlite3.connect(db) as conn:
+                conn.execute("CREATE TABLE routes (route_id TEXT, segments TEXT)")
+                with open(os.path.join(self.data, "routes.csv")) as f:
+                    conn.executemany("INSERT INTO routes VALUES (?, ?)",
+                                     (line.rstrip("\n").split(",", 1) for line in f))
+            model.tonnes_save_database(os.path.join(self.data, "tonnes.csv"))
+            model.routes_tonnes_save_database()
+        return model
+
+    # -------------------------------------------------------------------------
+    # Stages: name -> (setup, fn). fn(setup()) is timed and returns the
+    # number of items it processed (vertices, rows, files, periods or
+    # actors), reported with the per-second rate.
+    # -------------------------------------------------------------------------
+
+    def stages(self):
+        return {
+            "parse_pit_xyzs": (
+                lambda: None,
+                lambda _: _parse(read_xyz_blocks, blocks_to_surfaces, self.pit),
+            ),
+            "parse_cut_files": (
+                lambda: None,
+                lambda _: sum(_parse(read_xyz_blocks, blocks_to_surfaces, p) for p in self.cuts),
+            ),
+            "parse_polylines_csv": (
+                lambda: None,
+                lambda _: _parse(read_csv_blocks, blocks_to_polylines, self.polylines_csv),
+            ),
+            "parse_points_srg": (
+                lambda: i3model(self.points_srg),
+                lambda model: len(model.points_read_srg_file()),
+            ),
+            "surfaces_save_database": (self._surfaces_setup, self._save("surfaces")),
+            "polylines_save_database": (self._polylines_setup, self._save("polylines")),
+            "points_save_database": (self._points_setup, self._save("points")),
+            "tonnes_save_database": (self.db_with_heatmap, self._save_tonnes),
+            "import_files_cold": (self._import_setup, self._import),
+            "import_files_unchanged": (self.db_with_cuts, self._import),
+            "run_contour_diff": (
+                self.db_with_cuts,
+                lambda model: model.run_contour_diff(
+                    "All", "bench", workers=self.workers, resume=False).periods,
+            ),
+            "run_contour_diff_resumed": (
+                self._diff_done_setup,
+                lambda model: model.run_contour_diff(
+                    "All", "bench", workers=self.workers).reused,
+            ),
+            "update_routes_tonnes": (self.db_with_heatmap, self._update_routes_tonnes),
+            "read_period_tonnes": (self.db_with_heatmap, self._read_period_tonnes),
+            "actors_surfaces": (
+                self._surfaces_setup,
+                lambda model: len(model.surfaces_create_new_actors(model.surfaces)),
+            ),
+            "actors_polylines": (
+                self._polylines_setup,
+                lambda model: len(model.polylines_create_actors()),
+            ),
+            "actors_points": (
+                self._points_setup,
+                lambda model: len(model.points_create_actors()),
+            ),
+        }
+
+    def _surfaces_setup(self):
+        model = i3model(self.pit)
+        model.surfaces = model.surfaces_read_xyzs_file()
+        return model
+
+    def _polylines_setup(self):
+        model = i3model(self.polylines_csv)
+        model.polylines = model.polylines_read_csv_file()
+        return model
+
+    def _points_setup(self):
+        model = i3model(self.points_srg)
+        model.points = model.points_read_srg_file()
+        return model
+
+    def _save(self, kind):
+        def fn(model):
+            getattr(model, f"{kind}_save_database")(self.fresh_db())
+            return model.last_write_stats.rows
+        return fn
+
+    def _save_tonnes(self, model):
+        model.tonnes_save_database(os.path.join(self.data, "tonnes.csv"))
+        return model.last_write_stats.rows
+
+    def _import_setup(self):
+        model = self.db_with_surfaces()
+        self.clear_geometry_cache()
+        return model
+
+    def _import(self, model):
+        result = model.import_files(self.cuts, workers=self.workers)
+        return len(result["imported"]) + len(result["unchanged"])
+
+    def _diff_done_setup(self):
+        model = self.db_with_cuts()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.run_contour_diff("All", "bench", workers=self.workers)
+        return model
+
+    @staticmethod
+    def _update_routes_tonnes(model):
+        periods = model.getMaxPeriod()
+        for period in range(1, periods + 1):
+            model.updateRoutesTonnes(period)
+        return periods
+
+    @staticmethod
+    def _read_period_tonnes(model):
+        periods = model.getMaxPeriod()
+        polyline_ids = np.array(list(model.polylines), dtype=np.int64)
+        for period in range(1, periods + 1):
+            model.routes_tonnes_read_period(period, polyline_ids)
+        return periods
+
+
+def stage_names():
+    """Names of the suite's stages, in run order."""
+    return list(Suite("", "", 1).stages())
+
+
+def run(data, repeat, workers, only=None):
+    """Run every stage (or those named in only) and return the results
+    dict: {"meta": ..., "stages": {name: {"seconds", "runs", "items"}}}."""
+    with tempfile.TemporaryDirectory() as work:
+        suite = Suite(data, work, workers)
+        stages = {}
+        for name, (setup, fn) in suite.stages().items():
+            if only and name not in only:
+                continue
+            best, runs, items = _best_of(setup, fn, repeat)
+            stages[name] = {"seconds": round(best, 6),
+                            "runs": [round(r, 6) for r in runs],
+                            "items": items}
+            rate = f"{items / best:,.0f}/s" if items and best else ""
+            print(f"{name:<26} {best:>10.4f} s  {items!s:>10}  {rate}")
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "vtk": vtk.vtkVersion.GetVTKVersion(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "workers": workers,
+        },
+        "stages": stages,
+    }
+
+
+def compare(current, baseline, tolerance, min_delta):
+    """Print current against baseline stage by stage; return the names of
+    the stages that regressed. Baseline stages the current run lacks are
+    listed as missing."""
+    regressions = []
+    print(f"\n{'stage':<26} {'baseline s':>11} {'current s':>11} {'ratio':>7}")
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            print(f"{name:<26} {'-':>11} {stage['seconds']:>11.4f} {'new':>7}")
+            continue
+        ratio = stage["seconds"] / base["seconds"] if base["seconds"] else math.inf
+        slower = stage["seconds"] - base["seconds"]
+        flag = ""
+        if ratio > 1 + tolerance and slower >= min_delta:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<26} {base['seconds']:>11.4f} {stage['seconds']:>11.4f} {ratio:>6.2f}x{flag}")
+    for name, base in baseline.get("stages", {}).items():
+        if name not in current["stages"]:
+            print(f"{name:<26} {base['seconds']:>11.4f} {'-':>11} {'missing':>7}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="existing synthetic data folder (default: generate one)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small",
+                        help="scale of the generated data")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (best is kept)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="workers for import_files and run_contour_diff")
+    parser.add_argument("--stage", action="append", help="only run this stage (repeatable)")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="baseline results to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown as a fraction (default 0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+    if args.stage:
+        unknown = sorted(set(args.stage) - set(stage_names()))
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A private geometry cache, so runs don't depend on the user's.
+        os.environ["I3VIEWER_CACHE_DIR"] = os.path.join(tmp, "cache")
+        os.makedirs(os.environ["I3VIEWER_CACHE_DIR"])
+        data = args.data
+        if data is None:
+            data = os.path.join(tmp, "data")
+            generate(data, args.scale, args.seed)
+        results = run(data, args.repeat, args.workers, args.stage)
+        results["meta"].update(scale=None if args.data else args.scale,
+                               seed=None if args.data else args.seed,
+                               data=os.path.abspath(args.data) if args.data else None)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Synthetic mine data for the i3viewer benchmarks.
+
+Writes a folder of realistic inputs at a configurable scale:
+
+    pit.xyzs            nested pit contour rings, one per bench Z per pit
+    cuts/YYMM_SHnnn.xyzs
+                        per period and shovel, rings cutting notches into
+                        the pit rings (what run_contour_diff clips against)
+    polylines.csv       haul-road polylines ('name,x,y,z' lines, '$'
+                        separators), named S0001, S0002, ...
+    routes.csv          route_id,segments (';'-joined polyline names)
+    tonnes.csv          period,route_id,tonne
+    points.srg          survey points (x,y,z,,,name)
+
+Coordinates sit around a mine grid origin near (8e6, 8e6), like real data.
+Output is deterministic for a given scale and seed.
+
+    python -m benchmarks.synthetic out/ --scale medium --seed 1
+"""
+import argparse
+import math
+import os
+import random
+
+# Sizes of the generated data. pits x benches rings of ring_points vertices;
+# periods x shovels cut files; routes polylines of route_points vertices.
+SCALES = {
+    "small": dict(pits=1, benches=6, ring_points=200, periods=4, shovels=2,
+                  routes=40, route_points=50, points=500),
+    "medium": dict(pits=2, benches=20, ring_points=400, periods=12, shovels=4,
+                   routes=200, route_points=200, points=5000),
+    "large": dict(pits=3, benches=40, ring_points=1000, periods=24, shovels=6,
+                  routes=1000, route_points=400, points=50000),
+}
+
+ORIGIN = (8.0e6, 8.0e6)
+BENCH_HEIGHT = 15.0
+BOTTOM_Z = 3000.0
+
+
+def _ring(cx, cy, radius, n, z, rng, wobble=0.08):
+    """A closed, wobbly ring of n vertices (first vertex repeated last)."""
+    phase = rng.uniform(0, 2 * math.pi)
+    pts = []
+    for i in range(n):
+        a = 2 * math.pi * i / n
+        r = radius * (1 + wobble * math.sin(5 * a + phase))
+        pts.append((round(cx + r * math.cos(a), 3), round(cy + r * math.sin(a), 3), z))
+    pts.append(pts[0])
+    return pts
+
+
+def _notch(ring, k, m, depth, centre):
+    """A closed ring following ring[k:k + m + 1] and coming back inside or
+    outside it (depth > 0 pushes outwards), i.e. a cut across the edge."""
+    outer = ring[k:k + m + 1]
+    z = ring[k][2]
+    steps = max(4, m)
+    inner = []
+    for s in range(1, steps):
+        t = s / steps
+        idx = k + m - t * m
+        i0 = int(idx)
+        f = idx - i0
+        i1 = min(i0 + 1, len(ring) - 1)
+        px = ring[i0][0] * (1 - f) + ring[i1][0] * f
+        py = ring[i0][1] * (1 - f) + ring[i1][1] * f
+        r = math.hypot(px - centre[0], py - centre[1]) or 1.0
+        d = depth * math.sin(math.pi * t)
+        inner.append((round(px + (px - centre[0]) / r * d, 3),
+                      round(py + (py - centre[1]) / r * d, 3), z))
+    poly = outer + inner
+    poly.append(poly[0])
+    return poly
+
+
+def _write_xyzs(path, rings):
+    with open(path, "w") as f:
+        for k, ring in enumerate(rings):
+            if k:
+                f.write("$\n")
+            f.writelines(f"{x:.3f} {y:.3f} {z:.3f}\n" for x, y, z in ring)
+
+
+def pit_rings(sizes, rng):
+    """Return [(centre, ring)] for every pit and bench: concentric rings
+    whose radius grows with Z, bottom bench first."""
+    rings = []
+    for pit in range(sizes["pits"]):
+        centre = (ORIGIN[0] + 3000.0 * pit, ORIGIN[1] + 1500.0 * (pit % 2))
+        for bench in range(sizes["benches"]):
+            z = BOTTOM_Z + BENCH_HEIGHT * bench
+            radius = 300.0 + 25.0 * bench
+            rings.append((centre, _ring(centre[0], centre[1], radius,
+                                        sizes["ring_points"], z, rng)))
+    return rings
+
+
+def write_cuts(folder, sizes, rings, rng):
+    """One YYMM_SHnnn.xyzs file per (period, shovel). Each cuts a notch in
+    about 80% of the pit rings, in its own stretch of every ring, so cuts of
+    different files don't overlap."""
+    os.makedirs(folder, exist_ok=True)
+    slots = sizes["periods"] * sizes["shovels"]
+    width = max(8, (sizes["ring_points"] - 2) // slots)
+    for period in range(sizes["periods"]):
+        yy, mm = 25 + period // 12, period % 12 + 1
+        for shovel in range(sizes["shovels"]):
+            slot = (period * sizes["shovels"] + shovel) % max(1, (sizes["ring_points"] - 2) // width)
+            cuts = []
+            for centre, ring in rings:
+                if rng.random() < 0.8:
+                    m = rng.randint(3, width - 4)
+                    k = slot * width + rng.randint(0, width - m - 1)
+                    depth = rng.uniform(5, 30) * rng.choice([1, -1])
+                    cuts.append(_notch(ring, k, m, depth, centre))
+            _write_xyzs(os.path.join(folder, f"{yy:02d}{mm:02d}_SH{shovel + 1:03d}.xyzs"), cuts)
+
+
+def write_polylines(path, sizes, rng):
+    """Haul roads spiralling down from the rim, named S0001, S0002, ...
+    Returns their names."""
+    names = []
+    top = BOTTOM_Z + BENCH_HEIGHT * sizes["benches"]
+    with open(path, "w") as f:
+        for k in range(sizes["routes"]):
+            name = f"S{k + 1:04d}"
+            names.append(name)
+            if k:
+                f.write("$\n")
+            cx = ORIGIN[0] + 3000.0 * (k % sizes["pits"])
+            cy = ORIGIN[1] + 1500.0 * (k % sizes["pits"] % 2)
+            a0 = rng.uniform(0, 2 * math.pi)
+            n = sizes["route_points"]
+            for i in range(n):
+                t = i / max(1, n - 1)
+                a = a0 + 1.5 * math.pi * t
+                r = 300.0 + 25.0 * sizes["benches"] * (1 - t) + 40.0
+                z = top - (top - BOTTOM_Z) * t
+                f.write(f"{name},{cx + r * math.cos(a):.3f},{cy + r * math.sin(a):.3f},{z:.3f}\n")
+    return names
+
+
+def write_routes_tonnes(folder, sizes, segment_names, rng):
+    """routes.csv (route_id,segments) and tonnes.csv (period,route_id,tonne)."""
+    route_ids = [f"R{k + 1:03d}" for k in range(max(1, sizes["routes"] // 4))]
+    with open(os.path.join(folder, "routes.csv"), "w") as f:
+        for route_id in route_ids:
+            segments = rng.sample(segment_names, min(len(segment_names), rng.randint(1, 6)))
+            f.write(f"{route_id},{';'.join(segments)}\n")
+    with open(os.path.join(folder, "tonnes.csv"), "w") as f:
+        for period in range(1, sizes["periods"] + 1):
+            for route_id in route_ids:
+                f.write(f"{period},{route_id},{rng.uniform(1e6, 1e7):.1f}\n")
+
+
+def write_points(path, sizes, rng):
+    with open(path, "w") as f:
+        for k in range(sizes["points"]):
+            x = ORIGIN[0] + rng.uniform(-600, 3000.0 * sizes["pits"])
+            y = ORIGIN[1] + rng.uniform(-900, 2400)
+            z = BOTTOM_Z + rng.uniform(0, BENCH_HEIGHT * sizes["benches"])
+            f.write(f"{x:.3f},{y:.3f},{z:.3f},,,P{k + 1:06d}\n")
+
+
+def generate(folder, scale="small", seed=1):
+    """Write the synthetic data set for scale (a SCALES key or a dict of
+    the same keys) into folder. Returns the sizes used."""
+    sizes = SCALES[scale] if isinstance(scale, str) else dict(scale)
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+
+    rings = pit_rings(sizes, rng)
+    _write_xyzs(os.path.join(folder, "pit.xyzs"), [ring for _, ring in rings])
+    write_cuts(os.path.join(folder, "cuts"), sizes, rings, rng)
+    names = write_polylines(os.path.join(folder, "polylines.csv"), sizes, rng)
+    write_routes_tonnes(folder, sizes, names, rng)
+    write_points(os.path.join(folder, "points.srg"), sizes, rng)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder", help="output folder (created if needed)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sizes = generate(args.folder, args.scale, args.seed)
+    print(f"{args.folder}: " + ", ".join(f"{k}={v}" for k, v in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
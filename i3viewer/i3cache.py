@@ -0,0 +1,320 @@
+import hashlib
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from i3viewer.i3enums import Params
+from i3viewer.i3parser import GeometryBlocks, read_csv_blocks, read_xyz_blocks
+
+# Sidecar file layout (all little-endian, every section 8-byte aligned):
+#
+#   header      — _HEADER struct (see below)
+#   coords      — n_points * 3 float64
+#   offsets     — (n_blocks + 1) int64
+#   separators  — n_blocks int64
+#   names       — names_len bytes, UTF-8, '\n'-joined (CSV only)
+#
+# The header records the size and mtime of the source file the entry was
+# built from; a mismatch on open means the source changed and the entry is
+# rebuilt in place.
+_MAGIC = b"I3GEOCHE"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII6q")
+_HAS_NAMES = 1
+
+_SUFFIX = ".i3geo"
+
+
+def default_cache_dir():
+    """Return the per-user directory used for geometry sidecar files.
+
+    I3VIEWER_CACHE_DIR overrides the platform default (LOCALAPPDATA on
+    Windows, XDG_CACHE_HOME or ~/.cache elsewhere).
+    """
+    override = os.environ.get("I3VIEWER_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "i3viewer", "geometry")
+
+
+class GeometryCache:
+    """Binary cache of parsed geometry files (GeometryBlocks).
+
+    Each source file maps to one sidecar entry named after the hash of its
+    absolute path and reader kind. Entries are memory-mapped on open and
+    rebuilt whenever the source's size or mtime differs from the one stored
+    in the header. The total size of the cache directory is capped; the
+    least recently used entries are evicted first (hits refresh the entry's
+    mtime, which serves as the LRU clock).
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = (Params.GeometryCacheMaxBytes.value
+                          if max_bytes is None else max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def load(self, file_path, kind, parse):
+        """Return the GeometryBlocks for file_path, parsing it only on a miss.
+
+        Args:
+            file_path: Source geometry file.
+            kind: Reader name ("xyz" or "csv"); part of the cache key.
+            parse: Callable(file_path) -> GeometryBlocks used on a miss.
+
+        Returns:
+            GeometryBlocks; on a hit its arrays are read-only views into the
+            memory-mapped sidecar file.
+        """
+        stat = os.stat(file_path)
+        blocks = self.get(file_path, kind, stat)
+        if blocks is None:
+            blocks = parse(file_path)
+            self.put(file_path, kind, blocks, stat)
+        return blocks
+
+    def get(self, file_path, kind, stat=None):
+        """Return the cached GeometryBlocks for file_path, or None on a miss
+        (no entry, or the source changed since it was cached)."""
+        if stat is None:
+            stat = os.stat(file_path)
+        entry = self._entry_path(file_path, kind)
+        blocks = self._read_entry(entry, stat)
+        if blocks is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(entry)
+        return blocks
+
+    def put(self, file_path, kind, blocks, stat):
+        """Store blocks parsed from file_path. stat must be the os.stat()
+        taken before parsing, so a file modified mid-parse is re-parsed on
+        the next open instead of being cached under its new mtime."""
+        entry = self._entry_path(file_path, kind)
+        if self._write_entry(entry, stat, blocks):
+            self._evict(keep=entry)
+
+    def clear(self):
+        """Delete every sidecar entry in the cache directory."""
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    # -------------------------------------------------------------------------
+    # Entry I/O
+    # -------------------------------------------------------------------------
+
+    def _entry_path(self, file_path, kind):
+        key = f"{os.path.abspath(file_path)}|{kind}".encode("utf-8", "surrogatepass")
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest() + _SUFFIX)
+
+    @staticmethod
+    def _read_entry(entry, stat):
+        """Map a sidecar entry, or return None if missing, stale or corrupt."""
+        try:
+            if os.path.getsize(entry) < _HEADER.size:
+                return None
+            buf = np.memmap(entry, dtype=np.uint8, mode="r")
+        except (OSError, ValueError):
+            return None
+
+        (magic, version, flags, src_size, src_mtime,
+         n_points, n_blocks, n_separators, names_len) = _HEADER.unpack_from(buf, 0)
+        if (magic != _MAGIC or version != _VERSION
+                or src_size != stat.st_size or src_mtime != stat.st_mtime_ns):
+            return None
+
+        pos = _HEADER.size
+        expected = pos + 8 * (3 * n_points + 2 * n_blocks + 1) + names_len
+        if len(buf) != expected:
+            return None
+
+        coords = np.frombuffer(buf, dtype="<f8", count=3 * n_points, offset=pos)
+        pos += coords.nbytes
+        offsets = np.frombuffer(buf, dtype="<i8", count=n_blocks + 1, offset=pos)
+        pos += offsets.nbytes
+        separators = np.frombuffer(buf, dtype="<i8", count=n_blocks, offset=pos)
+        pos += separators.nbytes
+
+        names = None
+        if flags & _HAS_NAMES:
+            text = bytes(buf[pos:pos + names_len]).decode("utf-8", "surrogatepass")
+            names = text.split("\n") if n_points else []
+
+        return GeometryBlocks(coords.reshape(n_points, 3), offsets, separators,
+                              int(n_separators), names)
+
+    def _write_entry(self, entry, stat, blocks):
+        """Atomically write blocks to entry. Returns False if caching failed."""
+        names = b""
+        flags = 0
+        if blocks.names is not None:
+            flags |= _HAS_NAMES
+            names = "\n".join(blocks.names).encode("utf-8", "surrogatepass")
+
+        coords = np.ascontiguousarray(blocks.coords, dtype="<f8")
+        offsets = np.ascontiguousarray(blocks.offsets, dtype="<i8")
+        separators = np.ascontiguousarray(blocks.separators, dtype="<i8")
+        header = _HEADER.pack(_MAGIC, _VERSION, flags, stat.st_size,
+                              stat.st_mtime_ns, len(coords), len(separators),
+                              blocks.n_separators, len(names))
+
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as file:
+                file.write(header)
+                file.write(coords.tobytes())
+                file.write(offsets.tobytes())
+                file.write(separators.tobytes())
+                file.write(names)
+            os.replace(tmp_path, entry)
+            return True
+        except OSError as e:
+            print(f"Geometry cache write failed for {entry}: {e}")
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            return False
+
+    # -------------------------------------------------------------------------
+    # LRU Eviction
+    # -------------------------------------------------------------------------
+
+    def _entries(self):
+        """Yield (path, size, last_used_ns) for every entry in the cache dir."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield path, st.st_size, st.st_mtime_ns
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            if self._remove(path):
+                total -= size
+
+    @staticmethod
+    def _touch(entry):
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        # Removing a file that is still mapped fails on Windows; it is simply
+        # retried on the next eviction pass.
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+# -----------------------------------------------------------------------------
+# Cached Readers
+# -----------------------------------------------------------------------------
+
+_default_cache = None
+
+
+def get_geometry_cache():
+    """Return the process-wide GeometryCache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GeometryCache()
+    return _default_cache
+
+
+def cached_xyz_blocks(file_path):
+    """read_xyz_blocks() backed by the geometry cache."""
+    return get_geometry_cache().load(file_path, "xyz", read_xyz_blocks)
+
+
+def cached_csv_blocks(file_path):
+    """read_csv_blocks() backed by the geometry cache."""
+    return get_geometry_cache().load(file_path, "csv", read_csv_blocks)
+
+
+def redirect_worker_stdout(target):
+    """Process pool initializer: point a worker's sys.stdout at target,
+    "stderr" or "devnull"; None keeps the stdout the worker inherited.
+
+    Spawned workers write to the parent's original stdout (file
+    descriptor 1, or the console handle on Windows) whatever the parent
+    redirected in-process, e.g. i3cli, whose stdout is its JSON report.
+    """
+    if target == "stderr":
+        sys.stdout = sys.stderr
+    elif target == "devnull":
+        sys.stdout = open(os.devnull, "w")
+
+
+def iter_cached_xyz_blocks(file_paths, workers=None, worker_stdout=None):
+    """Yield the GeometryBlocks of every XYZ/XYZS file in file_paths, in
+    order.
+
+    Cache hits are served in-process; misses are parsed on a pool of
+    `workers` processes (default: CPU count, 1 parses in-process) and
+    cached as they come back. Results are yielded in input order as soon
+    as each one is ready, so a consumer can write file k while later files
+    are still being parsed. worker_stdout is where the pool's processes
+    print (see redirect_worker_stdout).
+    """
+    cache = get_geometry_cache()
+    file_paths = list(file_paths)
+    stats = [os.stat(file_path) for file_path in file_paths]
+    cached = [cache.get(p, "xyz", st) for p, st in zip(file_paths, stats)]
+    misses = [p for p, blocks in zip(file_paths, cached) if blocks is None]
+
+    workers = min(workers or os.cpu_count() or 1, len(misses))
+    executor = None
+    if workers > 1:
+        # spawn, not fork: the parent is a Qt application with live threads.
+        executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=redirect_worker_stdout, initargs=(worker_stdout,))
+        parsed = executor.map(read_xyz_blocks, misses)
+    else:
+        parsed = map(read_xyz_blocks, misses)
+
+    try:
+        for file_path, stat, blocks in zip(file_paths, stats, cached):
+            if blocks is None:
+                blocks = next(parsed)
+                cache.put(file_path, "xyz", blocks, stat)
+            yield blocks
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
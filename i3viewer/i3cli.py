@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from i3viewer.i3model import i3model
+
+# Headless contour-difference pipeline, for scheduled (cron) runs on
+# machines without a display. Only i3model is imported: no PySide6, no
+# render window, no OpenGL.
+#
+#   i3viewer-cli --db mine.db --folder cuts/2025 --surfaces pit.xyzs
+#   i3viewer-cli --db mine.db --folder cuts/2025 --all-shovels --workers 8
+#
+# The steps of ContourDiffDialog run in order: scan the folder, import
+# its XYZS files, run the contour difference and write the session rows.
+# A JSON report with per-step timings is written to stdout (or --json);
+# everything i3model prints goes to stderr (or nowhere with --quiet).
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="i3viewer-cli",
+        description="Run the contour difference pipeline (scan, import, "
+                    "diff, write session) without the GUI.",
+    )
+    parser.add_argument("--db", required=True, help="SQLite database to import into and write results to")
+    parser.add_argument("--folder", required=True, help="folder of YYMM_SHnnn.xyzs cut files")
+    parser.add_argument("--surfaces", help="XYZS file to (re)load the surfaces table (Contour A) from first")
+    shovels = parser.add_mutually_exclusive_group()
+    shovels.add_argument("--shovel", nargs="+", default=["All"], metavar="NAME",
+                         help='shovel filter(s); "All" for no filter (default). '
+                              "Several names run in one pass, one result each")
+    shovels.add_argument("--all-shovels", action="store_true",
+                         help='run "All" and every shovel found in the folder, in one pass')
+    parser.add_argument("--result", help="result name (default: the folder name); with several "
+                                         'shovels, the prefix of "<result>_<shovel>"')
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for parsing and clipping (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="recompute every period instead of reusing a previous run")
+    parser.add_argument("--json", metavar="FILE", help="write the JSON report to FILE instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="discard i3model's log output")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Run the pipeline for parsed args and return the report dict."""
+    report = {"db": os.path.abspath(args.db), "folder": os.path.abspath(args.folder)}
+    start = time.perf_counter()
+
+    if args.surfaces:
+        t = time.perf_counter()
+        model = i3model(args.surfaces)
+        model.surfaces = model.surfaces_read_xyzs_file()
+        model.surfaces_save_database(args.db)
+        report["surfaces"] = {
+            "seconds": round(time.perf_counter() - t, 3),
+            "surfaces": len(model.surfaces),
+            "rows": model.last_write_stats.rows,
+        }
+        model.surfaces = {}
+        model.file_path = args.db
+    else:
+        model = i3model(args.db)
+    model.contourdiff_folder_path = args.folder
+    # The pools' spawned processes print to the real stdout, not to the
+    # redirect in main(): send them where i3model's own output goes.
+    model.worker_stdout = "devnull" if args.quiet else "stderr"
+
+    t = time.perf_counter()
+    files = model.scan_folder(args.folder)
+    valid = [f for f in files if model.is_valid_shovel_filename(f)]
+    report["scan"] = {
+        "seconds": round(time.perf_counter() - t, 3),
+        "files": len(files),
+        "valid": len(valid),
+    }
+
+    t = time.perf_counter()
+    imported = model.import_files(files, workers=args.workers)
+    report["import"] = {
+        "seconds": round(time.perf_counter() - t, 3),
+        **{key: len(names) for key, names in imported.items()},
+    }
+
+    result_name = args.result or os.path.basename(os.path.normpath(args.folder))
+    resume = not args.no_resume
+    t = time.perf_counter()
+    if args.all_shovels or len(args.shovel) > 1:
+        shovel_names = None if args.all_shovels else args.shovel
+        results = model.run_contour_diff_batch(
+            shovel_names, result_name, workers=args.workers, resume=resume)
+        diff_seconds = time.perf_counter() - t
+        t = time.perf_counter()
+        sessions = model.write_batch_results()
+    else:
+        results = [model.run_contour_diff(
+            args.shovel[0], result_name, workers=args.workers, resume=resume)]
+        diff_seconds = time.perf_counter() - t
+        t = time.perf_counter()
+        sessions = [model.write_results()]
+    report["diff"] = {
+        "seconds": round(diff_seconds, 3),
+        "pairing": model.last_pairing_stats._asdict() if model.last_pairing_stats else None,
+        "results": [result._asdict() for result in results],
+    }
+    report["write"] = {
+        "seconds": round(time.perf_counter() - t, 3),
+        "sessions": [session._asdict() for session in sessions],
+    }
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def main(argv=None):
+    # Needed by the parser / clipping process pools in frozen builds.
+    multiprocessing.freeze_support()
+    args = parse_args(argv)
+    if not os.path.isdir(args.folder):
+        sys.exit(f"i3viewer-cli: folder not found: {args.folder}")
+    if not args.surfaces and not os.path.isfile(args.db):
+        sys.exit(f"i3viewer-cli: database not found: {args.db} (use --surfaces to create it)")
+
+    log = open(os.devnull, "w") if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(log):
+            report = run(args)
+    finally:
+        if log is not sys.stderr:
+            log.close()
+
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
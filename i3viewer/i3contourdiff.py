@@ -11,6 +11,7 @@ from PySide6.QtWidgets import (
 )
 
 from i3viewer.i3enums import Params
+from i3viewer.i3worker import Worker
 from i3viewer.i3contourdiffDialog import \
     Ui_Dialog  # Import the generated UI class for contour diff
 
@@ -27,6 +28,11 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
         self.folder_path = None
         self.scanned_files = []
 
+        # Background job (import or contour diff) in flight, if any, and
+        # whether the dialog should close once it has stopped.
+        self.worker = None
+        self.close_when_done = False
+
         # Customize the dialog (non-modal specific settings)
         self.setWindowTitle(f"{Params.ApplicationName.value} - Contour Difference Dialog")
         if hasattr(Qt, "RightToLeft"):
@@ -59,6 +65,7 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
         self.ui.pushButton_step1.clicked.connect(self.import_to_db)
         self.ui.pushButton_step2.clicked.connect(self.perform_contour_diff)
         self.ui.pushButton_confirmDelete.clicked.connect(self.delete_selected_session)
+        self.ui.pushButton_cancel.clicked.connect(self.cancel_worker)
         self.ui.pushButton_close.clicked.connect(self.reject)
         self.ui.lineEdit_search.textChanged.connect(self.filter_sessions)
 
@@ -68,6 +75,7 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
 
     def config_icons(self):
         if self.model:
+            self.model.refreshSchema()
             if self.model.hasImportedTable():
                 self.ui.pushButton_step1.setIcon(QIcon(":/icons/check.svg"))
             else:
@@ -86,6 +94,77 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
         self.ui.label_progressPct.setText(f"{int(pct)}%")
         self.ui.label_progressStatus.setText(label)
 
+    # -------------------------------------------------------------------------
+    # Background jobs
+    # -------------------------------------------------------------------------
+
+    def start_worker(self, fn, on_progress, on_finished):
+        """Run fn(worker) on a Worker, with the step buttons disabled and
+        Cancel enabled until it stops. on_progress(done, total, label) and
+        on_finished(result) run on the GUI thread; printed lines go to the
+        log box."""
+        self.worker = Worker(fn)
+        self.worker.signals.progress.connect(on_progress)
+        self.worker.signals.log.connect(self.log)
+        self.worker.signals.finished.connect(on_finished)
+        self.worker.signals.cancelled.connect(self._worker_cancelled)
+        self.worker.signals.failed.connect(self._worker_failed)
+        for signal in (self.worker.signals.finished, self.worker.signals.cancelled,
+                       self.worker.signals.failed):
+            signal.connect(self._worker_stopped)
+
+        self.set_busy(True)
+        self.worker.start()
+
+    def set_busy(self, busy):
+        """Disable the step buttons while a job runs; afterwards, enable the
+        ones whose prerequisite is met."""
+        self.ui.pushButton_browse.setEnabled(not busy)
+        self.ui.pushButton_confirmDelete.setEnabled(not busy)
+        self.ui.pushButton_scan.setEnabled(not busy and bool(self.folder_path))
+        self.ui.pushButton_step1.setEnabled(not busy and bool(self.scanned_files))
+        self.ui.comboBox_shovel.setEnabled(not busy and bool(self.scanned_files))
+        self.ui.pushButton_step2.setEnabled(not busy and self.model.hasImportedTable())
+        self.ui.pushButton_cancel.setEnabled(busy)
+
+    def cancel_worker(self):
+        if self.worker is not None and self.worker.running:
+            self.worker.cancel()
+            self.ui.pushButton_cancel.setEnabled(False)
+            self.ui.label_progressStatus.setText("Cancelling…")
+            self.log("Cancelling…")
+
+    def _worker_cancelled(self):
+        self.log("Cancelled — the step in progress was rolled back")
+        self.ui.label_progressStatus.setText("Cancelled")
+
+    def _worker_failed(self, error):
+        self.log(error.rstrip())
+        self.ui.label_progressStatus.setText("Failed")
+        QMessageBox.critical(self, "Error", error.strip().splitlines()[-1])
+
+    def _worker_stopped(self):
+        self.worker = None
+        # config_icons() refreshes the schema that set_busy() checks.
+        self.config_icons()
+        self.set_busy(False)
+        self.refresh_sessions_table()
+        if self.close_when_done:
+            super().reject()
+
+    def reject(self):
+        """Close the dialog; a running job is cancelled first, and the
+        dialog closes once it has stopped."""
+        if self.worker is not None and self.worker.running:
+            self.close_when_done = True
+            self.cancel_worker()
+            return
+        super().reject()
+
+    # -------------------------------------------------------------------------
+    # Steps
+    # -------------------------------------------------------------------------
+
     def pick_folder(self):
         """Handle picking the folder to scan."""
         folder_path = QFileDialog.getExistingDirectory(self, "Select Folder")
@@ -147,19 +226,31 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
         self.set_progress(33, "Importing to DB…")
         self.log("Importing files to DB…")
 
-        result = self.model.import_files(self.scanned_files)
+        scanned_files = list(self.scanned_files)
+        self.start_worker(
+            lambda worker: self.model.import_files(
+                scanned_files, progress=worker.report, cancel=worker.is_cancelled),
+            self._import_progress,
+            self._import_finished,
+        )
+
+    def _import_progress(self, done, total, basename):
+        """Per-file progress from import_files, mapped onto the 33–50% band."""
+        self.set_progress(33 + 17 * done / total, f"Imported {basename} ({done}/{total})")
+
+    def _import_finished(self, result):
         imported = result.get("imported", [])
+        unchanged = result.get("unchanged", [])
         skipped = result.get("skipped", [])
 
         for f in skipped:
             self.log(f"  skipped {f} — doesn't match YYMM_SHnnn.xyzs")
         self.log(
             f"{len(imported)} XYZS files imported"
+            + (f", {len(unchanged)} unchanged" if unchanged else "")
             + (f", {len(skipped)} skipped" if skipped else "")
         )
         self.set_progress(50, "Import complete")
-        self.config_icons()
-        self.ui.pushButton_step2.setEnabled(True)
 
     def perform_contour_diff(self):
         """Step 2: run the contour difference for the selected shovel, then
@@ -182,23 +273,29 @@ class ContourDiffDialog(QDialog, Ui_Dialog):
         self.set_progress(50, "Running contour difference…")
         self.log(f"Contour difference — shovel '{shovel_name}'…")
 
-        result = self.model.run_contour_diff(shovel_name, result_name)
-
-        self.log(f"Contour difference complete — {result.contours} regions processed")
-        self.set_progress(75, "Contour diff done")
+        def run(worker):
+            result = self.model.run_contour_diff(
+                shovel_name, result_name, progress=worker.report, cancel=worker.is_cancelled)
+            worker.signals.log.emit("Writing results to database…")
+            return result, self.model.write_results()
 
-        self.set_progress(80, "Writing to DB…")
-        self.log("Writing results to database…")
+        self.start_worker(run, self._contour_diff_progress, self._contour_diff_finished)
 
-        session = self.model.write_results()
+    def _contour_diff_progress(self, done, total, period):
+        """Per-period progress from run_contour_diff, mapped onto the
+        50–95% band (the session write takes the rest)."""
+        self.set_progress(50 + 45 * done / total, f"Period {period} ({done}/{total})")
 
+    def _contour_diff_finished(self, outcome):
+        result, session = outcome
+        self.log(f"Contour difference complete — {result.contours} regions processed")
+        if result.reused:
+            self.log(f"Reused {result.reused} of {result.periods} periods from the previous run")
         self.log(
             f"Done — {session.rows} rows, {session.contours} contours, "
             f"session {session.id} saved"
         )
         self.set_progress(100, "Complete")
-        self.config_icons()
-        self.refresh_sessions_table()
 
     def refresh_sessions_table(self):
         """Reload the sessions table from the model."""
@@ -153,6 +153,12 @@ class Ui_Dialog(object):
 
         self.horizontalLayout_progressMeta.addWidget(self.label_progressPct)
 
+        self.pushButton_cancel = QPushButton(Dialog)
+        self.pushButton_cancel.setObjectName(u"pushButton_cancel")
+        self.pushButton_cancel.setEnabled(False)
+
+        self.horizontalLayout_progressMeta.addWidget(self.pushButton_cancel)
+
 
         self.verticalLayout.addLayout(self.horizontalLayout_progressMeta)
 
@@ -290,6 +296,7 @@ class Ui_Dialog(object):
         self.pushButton_step2.setText(QCoreApplication.translate("Dialog", u"Diff and Write DB", None))
         self.label_progressStatus.setText(QCoreApplication.translate("Dialog", u"Ready", None))
         self.label_progressPct.setText(QCoreApplication.translate("Dialog", u"0%", None))
+        self.pushButton_cancel.setText(QCoreApplication.translate("Dialog", u"Cancel", None))
         self.plainTextEdit_log.setPlainText(QCoreApplication.translate("Dialog", u"Ready \u2014 browse and scan a folder, then run.", None))
         self.label_sessionsInDb.setText(QCoreApplication.translate("Dialog", u"<html><head/><body><p><span style=\" font-weight:600;\">Sessions in DB</span></p></body></html>", None))
         self.pushButton_confirmDelete.setText(QCoreApplication.translate("Dialog", u"Delete", None))
@@ -0,0 +1,365 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.request import pathname2url
+
+from i3viewer.i3enums import WriteStats
+
+# PRAGMAs applied for the duration of a bulk load and restored afterwards.
+# Bulk loads also write to the user's live project database (import_files,
+# run_contour_diff), so the on-disk rollback journal is kept: with
+# synchronous=NORMAL a commit syncs less often than with FULL, and a crash
+# or power loss may lose the last transaction but leaves the file intact.
+# cache_size is negative, i.e. in KiB (64 MB).
+BULK_PRAGMAS = (
+    ("synchronous", "NORMAL"),
+    ("cache_size", -65536),
+    ("temp_store", "MEMORY"),
+)
+
+
+class BulkWriter:
+    """Row sink for one bulk transaction: executemany() plus a row count."""
+
+    def __init__(self, conn, label):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.label = label
+        self.rows = 0
+        self.stats = None
+        self._start = time.perf_counter()
+
+    def insert(self, sql, rows):
+        """Insert every parameter tuple yielded by rows with executemany().
+
+        rows can be any iterable (typically a generator), so the full row
+        list is never materialized. Returns the number of rows written.
+        """
+        self.cursor.executemany(sql, rows)
+        written = max(self.cursor.rowcount, 0)
+        self.rows += written
+        return written
+
+    def finish(self):
+        """Freeze and return the WriteStats for this transaction."""
+        self.stats = write_stats(self.label, self.rows, time.perf_counter() - self._start)
+        return self.stats
+
+
+def write_stats(label, rows, seconds):
+    """Build a WriteStats, deriving rows/s."""
+    rate = rows / seconds if seconds > 0 else float(rows)
+    return WriteStats(label, rows, seconds, rate)
+
+
+def print_write_stats(stats):
+    print(f"{stats.label}: {stats.rows} rows in {stats.seconds:.3f} s "
+          f"({stats.rows_per_sec:,.0f} rows/s)")
+
+
+def _get_pragma(conn, name):
+    row = conn.execute(f"PRAGMA {name}").fetchone()
+    return row[0] if row else None
+
+
+@contextmanager
+def bulk_pragmas(conn, pragmas=BULK_PRAGMAS):
+    """Apply pragmas to conn and restore their previous values on exit.
+
+    Must be entered outside a transaction: some pragmas (journal_mode,
+    synchronous) don't take effect inside one.
+    """
+    saved = [(name, _get_pragma(conn, name)) for name, _ in pragmas]
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name}={value}")
+    try:
+        yield
+    finally:
+        for name, value in reversed(saved):
+            if value is not None:
+                conn.execute(f"PRAGMA {name}={value}")
+
+
+@contextmanager
+def bulk_transaction(conn, label, verbose=True, tune=True):
+    """Run a bulk save on conn inside one explicit transaction.
+
+    Tuned PRAGMAs are applied for the duration of the block (unless tune
+    is False, e.g. when the caller already holds bulk_pragmas() around a
+    series of transactions), the transaction is committed on success and
+    rolled back on error, and the resulting WriteStats (rows, seconds,
+    rows/s) is printed and left on writer.stats.
+
+    Usage:
+        with bulk_transaction(conn, "surfaces") as writer:
+            conn.execute("DELETE FROM surfaces")
+            writer.insert("INSERT INTO surfaces VALUES (?, ?, ?, ?, ?)", rows)
+        model.last_write_stats = writer.stats
+
+    conn must not be inside a transaction: committing it here would
+    commit changes that belong to the caller, so RuntimeError is raised.
+    """
+    if conn.in_transaction:
+        raise RuntimeError(
+            f"bulk_transaction({label!r}): the connection already has an open transaction")
+
+    with bulk_pragmas(conn) if tune else nullcontext():
+        writer = BulkWriter(conn, label)
+        conn.execute("BEGIN")
+        try:
+            yield writer
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        writer.finish()
+
+    if verbose:
+        print_write_stats(writer.stats)
+
+
+class ConnectionManager:
+    """Long-lived SQLite connections owned by one i3model.
+
+    Connections are opened lazily, one per (thread, database path), and
+    stay open until close() — so sqlite3's per-connection statement cache
+    prepares each query once instead of once per call. Worker threads get
+    their own connections; reader() hands out read-only ones
+    (mode=ro URIs) for threads that must never write.
+
+    connections_opened counts every connection opened. queries counts every
+    statement executed through the managed connections, but only while
+    profiling is on (profile=True or I3VIEWER_SQL_PROFILE=1): the trace
+    hook fires per row inside executemany() and roughly doubles the cost
+    of a bulk insert.
+    """
+
+    def __init__(self, cached_statements=256, profile=None):
+        if profile is None:
+            profile = os.environ.get("I3VIEWER_SQL_PROFILE", "") not in ("", "0")
+        self.cached_statements = cached_statements
+        self.profile = profile
+        self.connections_opened = 0
+        self.queries = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = []
+
+    def connection(self, path):
+        """Return the read-write connection to path for the calling thread."""
+        return self._get(path, read_only=False)
+
+    def reader(self, path):
+        """Return a read-only connection to path for the calling thread."""
+        return self._get(path, read_only=True)
+
+    def close(self):
+        """Close every managed connection, on all threads."""
+        with self._lock:
+            conns, self._open = self._open, []
+            self._local = threading.local()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def reset_counters(self):
+        """Zero connections_opened and queries."""
+        self.connections_opened = 0
+        self.queries = 0
+
+    def _get(self, path, read_only):
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+        key = (os.path.abspath(path), read_only)
+        conn = pool.get(key)
+        if conn is None:
+            conn = pool[key] = self._open_connection(path, read_only)
+        return conn
+
+    def _open_connection(self, path, read_only):
+        if read_only:
+            uri = "file:" + pathname2url(os.path.abspath(path)) + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        if self.profile:
+            conn.set_trace_callback(self._count_query)
+        with self._lock:
+            self._open.append(conn)
+            self.connections_opened += 1
+        return conn
+
+    def _count_query(self, _statement):
+        self.queries += 1
+
+
+class SchemaCatalog:
+    """In-memory catalog of a database's tables, columns and row counts.
+
+    Table names and columns are loaded together in a single query the first
+    time they are needed; row counts are counted lazily, one table at a
+    time, and cached. Lookups after that never touch sqlite_master.
+
+    The catalog goes stale in two ways, each with its own hook:
+        - the owner's own writes: call invalidate() after DDL, or
+          invalidate(table) after data-only changes to table;
+        - anyone else changing the schema: call refresh_if_changed(), which
+          reloads only if PRAGMA schema_version moved.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self.clear()
+
+    def clear(self):
+        """Forget everything; the next lookup reloads the catalog."""
+        self.schema_version = None
+        self.columns = {}
+        self._row_counts = {}
+
+    def invalidate(self, table=None):
+        """Drop cached state after a write: everything, or one table's row
+        count when only its data changed."""
+        if table is None:
+            self.clear()
+        else:
+            self._row_counts.pop(table, None)
+
+    def refresh_if_changed(self):
+        """Reload the catalog if the database's schema_version changed."""
+        if self.schema_version is None:
+            return
+        version = self._connect().execute("PRAGMA schema_version").fetchone()[0]
+        if version != self.schema_version:
+            self.clear()
+
+    def has_table(self, table):
+        return table in self._tables()
+
+    def table_columns(self, table):
+        """Return the column names of table (empty tuple if missing)."""
+        return self._tables().get(table, ())
+
+    def row_count(self, table):
+        """Return the number of rows in table (0 if missing)."""
+        if not self.has_table(table):
+            return 0
+        count = self._row_counts.get(table)
+        if count is None:
+            row = self._connect().execute(f'SELECT count(*) FROM "{table}"').fetchone()
+            count = self._row_counts[table] = row[0]
+        return count
+
+    def _tables(self):
+        if self.schema_version is None:
+            self._load()
+        return self.columns
+
+    def _load(self):
+        conn = self._connect()
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        columns = {}
+        for table, column in conn.execute(
+            """
+            SELECT m.name, p.name
+            FROM sqlite_master AS m, pragma_table_info(m.name) AS p
+            WHERE m.type='table'
+            ORDER BY m.name, p.cid
+            """
+        ):
+            columns.setdefault(table, []).append(column)
+        self.columns = {table: tuple(cols) for table, cols in columns.items()}
+        self._row_counts = {}
+        self.schema_version = version
+
+
+# -----------------------------------------------------------------------------
+# Secondary Indexes
+# -----------------------------------------------------------------------------
+
+# Indexes kept on the hot read paths, as table -> ((name, columns), ...).
+# An index is only created when its table has every listed column, so the
+# ring layout of cuts/contourdiffs (whose primary key already serves the
+# same lookups, see i3storage) only gets the ones that apply.
+INDEXES = {
+    "cuts": (
+        # "All" shovels read: WHERE period=? ORDER BY surface_id, point_id.
+        # shovel follows point_id so rows of different shovels that share a
+        # (surface_id, point_id) keep coming back in shovel order.
+        ("idx_cuts_period_surface",
+         ("period", "surface_id", "point_id", "shovel", "X", "Y", "Z")),
+    ),
+    "contourdiffs": (
+        # Snapshot read: WHERE result_name=? AND contourdiff_id=?.
+        ("idx_contourdiffs_snapshot",
+         ("result_name", "contourdiff_id", "surface_id", "point_id", "X", "Y", "Z")),
+        # MIN(rowid) per result_name (creation order of the results).
+        ("idx_contourdiffs_result_name", ("result_name",)),
+    ),
+    "routes_tonnes": (
+        # Heatmap step: WHERE period=? GROUP BY segments (or AND segments LIKE ...)
+        ("idx_routes_tonnes_period", ("period", "segments", "tonne")),
+    ),
+}
+
+
+def ensure_indexes(cursor, table):
+    """Create the INDEXES of table that its columns allow, if missing.
+
+    Returns the names of the indexes that apply to table.
+    """
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    columns = {row[1] for row in cursor.fetchall()}
+    names = []
+    for name, index_columns in INDEXES.get(table, ()):
+        if columns.issuperset(index_columns):
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" '
+                f'ON "{table}" ({", ".join(index_columns)})'
+            )
+            names.append(name)
+    return names
+
+
+def query_plan(conn, sql, params=()):
+    """Return the detail lines of EXPLAIN QUERY PLAN for sql."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def find_full_scans(conn, queries, tables=None):
+    """Flag full table scans in the plans of queries.
+
+    Args:
+        conn: Connection to the database the queries run against.
+        queries: Iterable of (name, sql, params).
+        tables: Only flag scans of these tables (default: every table, so
+            e.g. the outer scan of an UPDATE of every row is flagged too).
+
+    Returns:
+        List of (name, detail) for every plan step that scans a whole
+        table or index ("SCAN cuts", "SCAN cuts USING COVERING INDEX ...",
+        or "SEARCH cuts" with no index, as for MIN/MAX of an unindexed
+        column). Scans of CTEs and subquery results are not flagged, nor
+        are tables referred to by an alias.
+    """
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table'"
+    )}
+    tables = existing if tables is None else existing.intersection(tables)
+    flagged = []
+    for name, sql, params in queries:
+        for detail in query_plan(conn, sql, params):
+            # SQLite < 3.36 prints "SCAN TABLE cuts".
+            words = detail.replace(" TABLE ", " ", 1).split()
+            if len(words) < 2 or words[1] not in tables:
+                continue
+            if words[0] == "SCAN" or (words[0] == "SEARCH" and len(words) == 2):
+                flagged.append((name, detail))
+    return flagged
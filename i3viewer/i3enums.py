@@ -1,11 +1,11 @@
 from enum import Enum
 from collections import namedtuple
 
-import vtk
+from vtkmodules.vtkCommonCore import vtkLookupTable
 
 
 class LUT:
-    lut = vtk.vtkLookupTable()
+    lut = vtkLookupTable()
 
     def __init__(self):
         self.lut.SetNumberOfTableValues(256)
@@ -22,6 +22,9 @@ class Params(Enum):
     PolylineSelectedWidth = 5.0
     PolylineMinWidth = 2.0
     PolylineMaxWidth = 24.0
+    PolylineWidthStep = 1.0
+    PolylinesMerged = True
+    PointsMerged = True
     SelectedColor = (0, 1, 0)
     PointWinSelectedRadius = 30
     PointWinRadius = 20
@@ -33,7 +36,10 @@ class Params(Enum):
     PolylabelColor = (0, 1, 0)
     PointlabelFontSize = 10
     PointlabelColor = (1, 1, 0)
+    LabelMaximumScreenFraction = 0.2
     LookupTable = LUT().lut
+    GeometryCacheMaxBytes = 512 * 1024 * 1024
+    ContourDiffKeyframeInterval = 6
 
 
 class FileType(Enum):
@@ -85,9 +91,21 @@ class ContourDiffCfg(Enum):
 
 
 # Result of i3model.run_contour_diff(): summary of the cumulative
-# period-by-period contour difference calculation.
+# period-by-period contour difference calculation. reused is how many of
+# the periods were kept from a previous run instead of being recomputed.
 ContourDiffResult = namedtuple(
-    "ContourDiffResult", ["contours", "periods", "rows", "result_name"]
+    "ContourDiffResult", ["contours", "periods", "rows", "result_name", "reused"],
+    defaults=(0,),
+)
+
+# One row of the contourdiff_periods table: the fingerprint of the inputs
+# a contourdiffs snapshot was computed from, its row count, the keyframe
+# snapshot it is a delta of (its own id for a keyframe), and the ring
+# order and Z keys of Contour A after that period (see
+# i3model.run_contour_diff).
+ContourDiffCheckpoint = namedtuple(
+    "ContourDiffCheckpoint",
+    ["contourdiff_id", "period", "fingerprint", "rows", "keyframe", "surface_ids", "z"],
 )
 
 # Result of i3model.write_results(): summary of the session row written to
@@ -96,6 +114,49 @@ SessionResult = namedtuple(
     "SessionResult", ["id", "date", "folder", "rows", "contours", "status"]
 )
 
+class _Pick:
+    """Equality and hashing for the pick tuples below that include their
+    type: polyline and point ids both count from 1, and PolylinePick(5)
+    must not equal PointPick(5) (on_pick compares the new pick with the
+    selected one)."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self).__name__, tuple.__hash__(self)))
+
+
+# A polyline of the merged PolylineLayer, standing in for its actor in
+# i3vtkWidget's selection and dialogs (polylines_get_actor, on_pick,
+# select_actor, show_dialog) since the layer has no per-polyline actor.
+class PolylinePick(_Pick, namedtuple("PolylinePick", ["polyline_id"])):
+    __slots__ = ()
+
+
+# A point of the merged PointLayer, standing in for its actor in the same
+# way as PolylinePick.
+class PointPick(_Pick, namedtuple("PointPick", ["point_id"])):
+    __slots__ = ()
+
+# Result of an i3db.bulk_transaction(): how many rows one save path wrote
+# and how fast, kept on the model as last_write_stats.
+WriteStats = namedtuple(
+    "WriteStats", ["label", "rows", "seconds", "rows_per_sec"]
+)
+
+# Result of the contour-diff pairing stage: how many same-Z (A, B) contour
+# pairs were considered, how many were pruned because their bounding boxes
+# are further apart than the tolerance, and how many were actually clipped.
+PairingStats = namedtuple(
+    "PairingStats", ["considered", "pruned", "clipped"]
+)
+
 class DelaunayCfg:
     """
     A class to configure, run and save parameters for Delaunay-based surface reconstruction
@@ -0,0 +1,234 @@
+import hashlib
+
+import numpy as np
+
+from i3viewer.i3spatial import bboxes_within
+
+
+def _as_float32(coords):
+    """Round (x, y, z) coordinates to float32 precision, kept as float64.
+
+    This is the precision a contour has once it has been through a
+    vtkPoints (float32 by default), so headless contours carry exactly the
+    values i3model.actor_pts() would read back from the equivalent actor.
+    """
+    return np.asarray(coords, dtype=np.float64).reshape(-1, 3) \
+        .astype(np.float32).astype(np.float64)
+
+
+class ContourSet:
+    """Headless set of contour rings, as carried through run_contour_diff.
+
+    Ring i spans coords[offsets[i]:offsets[i + 1]] and is tagged with
+    surface_ids[i] and z[i] (the Z of its first vertex as given, the key
+    contours are paired on). coords holds float32-rounded values, see
+    _as_float32. Bounding boxes are computed once, on construction.
+
+    Nothing here touches VTK: actors are only built from a ContourSet when
+    it is displayed.
+    """
+
+    def __init__(self, surface_ids, z, coords, offsets):
+        self.surface_ids = list(surface_ids)
+        self.z = list(z)
+        self.coords = coords
+        self.offsets = offsets
+        self._by_z = None
+
+        if len(self.surface_ids):
+            starts = offsets[:-1]
+            xy = coords[:, :2]
+            lo = np.minimum.reduceat(xy, starts)
+            hi = np.maximum.reduceat(xy, starts)
+            self.bboxes = np.hstack([lo, hi])
+        else:
+            self.bboxes = np.empty((0, 4))
+
+    @classmethod
+    def from_rings(cls, rings):
+        """Build a set from (surface_id, z, vertices) triples, in order.
+
+        vertices is a sequence of (x, y, z, ...) tuples or an (n, 3) array.
+        Rings without vertices are skipped.
+        """
+        surface_ids, zs, parts, offsets = [], [], [], [0]
+        for surface_id, z, vertices in rings:
+            if isinstance(vertices, np.ndarray):
+                part = vertices
+            else:
+                part = [v[:3] for v in vertices]
+            if len(part) == 0:
+                continue
+            part = _as_float32(part)
+            surface_ids.append(surface_id)
+            zs.append(z)
+            parts.append(part)
+            offsets.append(offsets[-1] + len(part))
+        coords = np.concatenate(parts) if parts else np.empty((0, 3))
+        return cls(surface_ids, zs, coords, np.asarray(offsets, dtype=np.int64))
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Build a set from a dict of surface_id -> list of (x, y, z, ...)
+        vertices, like i3model._build_actors_from_groups does actors."""
+        return cls.from_rings(
+            (surface_id, vertices[0][2], vertices)
+            for surface_id, vertices in groups.items()
+            if vertices
+        )
+
+    def __len__(self):
+        return len(self.surface_ids)
+
+    def ring(self, i):
+        """Return (surface_id, z, coords) of ring i; coords is a view."""
+        return self.surface_ids[i], self.z[i], self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def points(self, i):
+        """Return ring i as a list of (x, y, z) tuples."""
+        return list(map(tuple, self.coords[self.offsets[i]:self.offsets[i + 1]].tolist()))
+
+    def bbox(self, i):
+        """Return the 2D bounding box (xmin, ymin, xmax, ymax) of ring i."""
+        return tuple(self.bboxes[i].tolist())
+
+    def digest(self):
+        """Return a hex SHA-1 of the set's content (rings, in order, with
+        their surface ids, Z keys and coordinates)."""
+        h = hashlib.sha1()
+        h.update(repr(self.surface_ids).encode())
+        h.update(np.asarray(self.z, dtype="<f8").tobytes())
+        h.update(np.asarray(self.offsets, dtype="<i8").tobytes())
+        h.update(np.ascontiguousarray(self.coords, dtype="<f8").tobytes())
+        return h.hexdigest()
+
+    def changed_since(self, previous):
+        """Return the indices of the rings whose surface_id is not in
+        ContourSet previous, or whose coordinates differ from that ring's
+        there, in set order."""
+        before = {sid: i for i, sid in enumerate(previous.surface_ids)}
+        changed = []
+        for i, surface_id in enumerate(self.surface_ids):
+            j = before.get(surface_id)
+            if j is None or not np.array_equal(
+                    self.coords[self.offsets[i]:self.offsets[i + 1]],
+                    previous.coords[previous.offsets[j]:previous.offsets[j + 1]]):
+                changed.append(i)
+        return changed
+
+    def subset(self, indices):
+        """Return a new ContourSet holding rings indices, in that order."""
+        surface_ids = [self.surface_ids[i] for i in indices]
+        z = [self.z[i] for i in indices]
+        parts = [self.coords[self.offsets[i]:self.offsets[i + 1]] for i in indices]
+        offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum([len(part) for part in parts], out=offsets[1:])
+        coords = np.concatenate(parts) if parts else np.empty((0, 3))
+        return ContourSet(surface_ids, z, coords, offsets)
+
+    def by_z(self):
+        """Return a dict of Z level -> indices of the rings at that level,
+        in set order. Computed once and cached."""
+        if self._by_z is None:
+            self._by_z = {}
+            for i, ring_z in enumerate(self.z):
+                self._by_z.setdefault(ring_z, []).append(i)
+        return self._by_z
+
+    def candidates(self, z, bbox, counts, tol=0.4):
+        """Pairing stage: yield the indices of the rings at Z level z whose
+        bounding box is within tol of bbox, in set order.
+
+        Same rules and Counter tallies ("considered", "pruned") as
+        i3model.contour_difference_candidates, which does this for actors.
+        """
+        for i in self.by_z().get(z, ()):
+            counts["considered"] += 1
+            if not bboxes_within(bbox, self.bbox(i), tol):
+                counts["pruned"] += 1
+                continue
+            yield i
+
+
+# -----------------------------------------------------------------------------
+# Batch 2D kernels
+#
+# NumPy versions of i3model._point_in_polygon_2d and
+# i3model._segment_intersect_2d. Every value is computed with the same
+# float64 operations in the same order as the scalar code, so results are
+# bit-identical to calling it in a loop.
+# -----------------------------------------------------------------------------
+
+# Largest points x edges block points_in_polygon_2d evaluates at once.
+_PIP_BLOCK = 1 << 20
+
+
+def _xy(points):
+    """Return the x, y columns of points ((x, y, ...) tuples or an array)
+    as an (m, 2) float64 array."""
+    try:
+        array = np.asarray(points, dtype=np.float64)
+    except ValueError:      # rows of different lengths
+        array = np.asarray([p[:2] for p in points], dtype=np.float64)
+    if array.ndim != 2:
+        return array.reshape(-1, 2)
+    return array[:, :2]
+
+
+def points_in_polygon_2d(xs, ys, polygon):
+    """Ray casting point-in-polygon test of many points against one
+    polygon, in the XY plane.
+
+    xs, ys are sequences of query coordinates; polygon is a list of
+    (x, y, ...) tuples (only x, y are used) or an (n, >=2) array. Returns a
+    bool array: element k is i3model._point_in_polygon_2d(xs[k], ys[k],
+    polygon).
+    """
+    px = np.asarray(xs, dtype=np.float64).reshape(-1, 1)
+    py = np.asarray(ys, dtype=np.float64).reshape(-1, 1)
+    poly = _xy(polygon)
+    inside = np.zeros(len(px), dtype=bool)
+    if not len(poly) or not len(px):
+        return inside
+
+    # Edge k runs from vertex k - 1 (j) to vertex k (i), as in the scalar loop.
+    xi, yi = poly[:, 0], poly[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+
+    step = max(1, _PIP_BLOCK // len(poly))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for lo in range(0, len(px), step):
+            bx, by = px[lo:lo + step], py[lo:lo + step]
+            spans = (yi > by) != (yj > by)
+            crosses = spans & (bx < (xj - xi) * (by - yi) / (yj - yi) + xi)
+            inside[lo:lo + step] = np.count_nonzero(crosses, axis=1) % 2 == 1
+    return inside
+
+
+def segments_intersect_2d(p1, p2, p3, p4):
+    """Intersect segments p1[k]-p2[k] with p3[k]-p4[k] in XY, pairwise.
+
+    Each argument is m (x, y, ...) points or an (m, >=2) array. Same rules as
+    i3model._segment_intersect_2d: near-parallel pairs (|denom| < 1e-10)
+    never intersect, t must be strictly inside (eps, 1 - eps) and u inside
+    [-eps, 1 + eps] with eps = 1e-9.
+
+    Returns (hit, t, u, ix, iy): a bool array and four float arrays; the
+    float values are only meaningful where hit is True.
+    """
+    p1, p2, p3, p4 = (_xy(p) for p in (p1, p2, p3, p4))
+    dx1 = p2[:, 0] - p1[:, 0]
+    dy1 = p2[:, 1] - p1[:, 1]
+    dx2 = p4[:, 0] - p3[:, 0]
+    dy2 = p4[:, 1] - p3[:, 1]
+    denom = dx1 * dy2 - dy1 * dx2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = ((p3[:, 0] - p1[:, 0]) * dy2 - (p3[:, 1] - p1[:, 1]) * dx2) / denom
+        u = ((p3[:, 0] - p1[:, 0]) * dy1 - (p3[:, 1] - p1[:, 1]) * dx1) / denom
+        ix = p1[:, 0] + t * dx1
+        iy = p1[:, 1] + t * dy1
+    eps = 1e-9
+    hit = ((np.abs(denom) >= 1e-10)
+           & (eps < t) & (t < 1.0 - eps)
+           & (-eps <= u) & (u <= 1.0 + eps))
+    return hit, t, u, ix, iy
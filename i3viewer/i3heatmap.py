@@ -40,6 +40,7 @@ class HeatMapDialog(QDialog, Ui_Dialog):
 
     def config_icons(self):
         if self.model:
+            self.model.refreshSchema()
             if self.model.hasRoutesTable():
                 self.ui.pushButton.setIcon(QIcon(":/icons/check.svg"))
             else:
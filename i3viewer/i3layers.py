@@ -0,0 +1,457 @@
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+from vtkmodules.vtkCommonCore import VTK_UNSIGNED_CHAR, vtkPoints, vtkStringArray
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkDataObject, vtkPolyData
+from vtkmodules.vtkFiltersCore import vtkThreshold
+from vtkmodules.vtkFiltersSources import vtkSphereSource
+from vtkmodules.vtkRenderingCore import (vtkActor, vtkActor2D, vtkDataSetMapper,
+                                         vtkGlyph3DMapper, vtkPolyDataMapper)
+from vtkmodules.vtkRenderingLabel import vtkLabelPlacementMapper, vtkPointSetToLabelHierarchy
+
+from i3viewer.i3enums import Params
+
+# Batched scene layers: many model items drawn through one vtkPolyData and
+# a handful of actors instead of one pipeline per item. Per-item appearance
+# lives in data arrays, so highlighting or restyling an item is an array
+# update, not a property change on its own actor.
+
+
+def _rgb(color):
+    """An (r, g, b) colour in [0, 1] as a uint8 triple."""
+    return np.round(np.asarray(color, dtype=float) * 255).astype(np.uint8)
+
+
+class PolylineLayer:
+    """Every polyline of the model in one vtkPolyData, one line cell each.
+
+    Cell data arrays, in cell order:
+        polyline_id  the model's polyline_id (how picks are resolved)
+        colors       RGB, uint8; the active scalars, drawn as they are
+        tonne        heatmap value, mapped through the heatmap lookup table
+        width        line width in pixels
+
+    OpenGL line width is a per-actor property, so the layer draws one actor
+    per distinct width: a single actor over the whole polydata while every
+    width is equal (the normal view), otherwise a vtkThreshold of the width
+    array per width level. Widths are snapped to Params.PolylineWidthStep to
+    bound the number of levels.
+
+    Normally the polylines are drawn in their own colours at
+    Params.PolylineDefaultWidth. set_heatmap() switches the mappers to
+    colour by the tonne array through one lookup table instead, with a
+    width per polyline; a period change is then a rewrite of these two
+    arrays. The selected polyline, if any, is drawn over either in
+    Params.SelectedColor at Params.PolylineSelectedWidth (in the heatmap
+    its tonne is NaN, drawn in the table's NaN colour). After a change,
+    call update() and swap the actors if it returns True.
+    """
+
+    def __init__(self, polylines, colors):
+        """polylines: {polyline_id: vertices} (x, y, z first in each vertex);
+        colors: {polyline_id: (r, g, b)} with components in [0, 1].
+        Polylines without vertices are left out."""
+        items = [(pid, vertices) for pid, vertices in polylines.items() if vertices]
+        self.polyline_ids = np.array([pid for pid, _ in items], dtype=np.int64)
+        self.cells = {pid: cell for cell, (pid, _) in enumerate(items)}
+
+        counts = np.array([len(vertices) for _, vertices in items], dtype=np.int64)
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coords = np.array([vertex[:3] for _, vertices in items for vertex in vertices],
+                          dtype=np.float64).reshape(-1, 3)
+
+        points = vtkPoints()
+        points.SetData(numpy_to_vtk(coords, deep=True))
+        lines = vtkCellArray()
+        lines.SetData(numpy_to_vtkIdTypeArray(offsets, deep=True),
+                      numpy_to_vtkIdTypeArray(np.arange(len(coords), dtype=np.int64), deep=True))
+
+        self.base_colors = np.array([_rgb(colors[pid]) for pid, _ in items],
+                                    dtype=np.uint8).reshape(-1, 3)
+        self.style_tonnes = None
+        self.style_widths = np.full(len(items), Params.PolylineDefaultWidth.value)
+        self.lookup_table = None
+        self.selected = None
+
+        # Displayed arrays; the VTK arrays below share their memory.
+        self.colors = self.base_colors.copy()
+        self.tonnes = np.full(len(items), np.nan)
+        self.widths = self.style_widths.copy()
+
+        self.polydata = vtkPolyData()
+        self.polydata.SetPoints(points)
+        self.polydata.SetLines(lines)
+        cell_data = self.polydata.GetCellData()
+        ids = numpy_to_vtkIdTypeArray(self.polyline_ids, deep=True)
+        ids.SetName("polyline_id")
+        cell_data.AddArray(ids)
+        self._colors = numpy_to_vtk(self.colors, deep=False, array_type=VTK_UNSIGNED_CHAR)
+        self._colors.SetName("colors")
+        cell_data.SetScalars(self._colors)
+        self._tonnes = numpy_to_vtk(self.tonnes, deep=False)
+        self._tonnes.SetName("tonne")
+        cell_data.AddArray(self._tonnes)
+        self._widths = numpy_to_vtk(self.widths, deep=False)
+        self._widths.SetName("width")
+        cell_data.AddArray(self._widths)
+
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputData(self.polydata)
+        self._whole = self._build_actor(mapper)
+        self._levels = {}   # width -> thresholded actor, built on demand
+        self.actors = []
+        self.update()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, polyline_id):
+        return polyline_id in self.cells
+
+    # -------------------------------------------------------------------------
+    # Actors
+    # -------------------------------------------------------------------------
+
+    def _configure_mapper(self, mapper):
+        if self.lookup_table is None:
+            mapper.SetScalarModeToUseCellData()
+            mapper.SetColorModeToDirectScalars()
+        else:
+            mapper.SetScalarModeToUseCellFieldData()
+            mapper.SelectColorArray("tonne")
+            mapper.SetColorModeToMapScalars()
+            mapper.SetLookupTable(self.lookup_table)
+            mapper.UseLookupTableScalarRangeOn()
+
+    def _build_actor(self, mapper):
+        self._configure_mapper(mapper)
+        actor = vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().SetRepresentationToWireframe()
+        return actor
+
+    def _level_actor(self, width):
+        actor = self._levels.get(width)
+        if actor is None:
+            step = Params.PolylineWidthStep.value
+            threshold = vtkThreshold()
+            threshold.SetInputData(self.polydata)
+            threshold.SetInputArrayToProcess(
+                0, 0, 0, vtkDataObject.FIELD_ASSOCIATION_CELLS, "width")
+            threshold.SetThresholdFunction(vtkThreshold.THRESHOLD_BETWEEN)
+            threshold.SetLowerThreshold(width - step / 2)
+            threshold.SetUpperThreshold(width + step / 2)
+            mapper = vtkDataSetMapper()
+            mapper.SetInputConnection(threshold.GetOutputPort())
+            actor = self._build_actor(mapper)
+            actor.GetProperty().SetLineWidth(width)
+            self._levels[width] = actor
+        return actor
+
+    def owns(self, actor):
+        """True if actor is one of the layer's actors."""
+        return any(actor is own for own in self.actors)
+
+    def polyline_id_at(self, dataset, cell_id):
+        """The polyline_id of cell cell_id of dataset, the input of a picked
+        layer actor (the whole polydata or one width level of it), or None."""
+        if dataset is None or cell_id < 0:
+            return None
+        ids = dataset.GetCellData().GetArray("polyline_id")
+        if ids is None or cell_id >= ids.GetNumberOfTuples():
+            return None
+        return int(ids.GetValue(cell_id))
+
+    # -------------------------------------------------------------------------
+    # Styling & Selection
+    # -------------------------------------------------------------------------
+
+    def set_heatmap(self, tonnes=None, widths=None, lookup_table=None):
+        """Colour every polyline by tonnes through lookup_table (whose range
+        the caller sets), with widths; both (n,) arrays in cell order (see
+        polyline_ids). No tonnes restores the polylines' own colours and
+        the default width."""
+        if tonnes is None:
+            self.style_tonnes = None
+            self.style_widths = np.full(len(self.cells), Params.PolylineDefaultWidth.value)
+            self.lookup_table = None
+        else:
+            self.style_tonnes = np.asarray(tonnes, dtype=float)
+            self.style_widths = np.asarray(widths, dtype=float)
+            lookup_table.SetNanColor(*Params.SelectedColor.value, 1.0)
+            self.lookup_table = lookup_table
+        for actor in [self._whole, *self._levels.values()]:
+            self._configure_mapper(actor.GetMapper())
+
+    def select(self, polyline_id):
+        self.selected = polyline_id if polyline_id in self.cells else None
+
+    def deselect(self):
+        self.selected = None
+
+    def update(self):
+        """Write the displayed colour and width arrays from the style and the
+        selection. Returns True if the set of actors changed."""
+        step = Params.PolylineWidthStep.value
+        self.colors[:] = self.base_colors
+        self.tonnes[:] = np.nan if self.style_tonnes is None else self.style_tonnes
+        self.widths[:] = np.round(self.style_widths / step) * step
+        if self.selected is not None:
+            cell = self.cells[self.selected]
+            self.colors[cell] = _rgb(Params.SelectedColor.value)
+            self.tonnes[cell] = np.nan
+            self.widths[cell] = Params.PolylineSelectedWidth.value
+        self._colors.Modified()
+        self._tonnes.Modified()
+        self._widths.Modified()
+        self.polydata.Modified()
+
+        levels = np.unique(self.widths).tolist()
+        if len(levels) <= 1:
+            self._whole.GetProperty().SetLineWidth(
+                levels[0] if levels else Params.PolylineDefaultWidth.value)
+            actors = [self._whole]
+        else:
+            actors = [self._level_actor(width) for width in levels]
+        changed = actors != self.actors
+        self.actors = actors
+        return changed
+
+
+class PointLayer:
+    """Every point of the model in one vtkPolyData, one vertex each.
+
+    Point data arrays, in point order:
+        point_id  the model's point_id (how picks are resolved)
+        colors    RGB, uint8; the active scalars, drawn as they are
+        scale     sphere radius of the point's glyph
+
+    With glyphs (what Windows uses), one vtkGlyph3DMapper draws a sphere
+    of radius scale at every point; pickers only see the vertices at the
+    spheres' centres, so picks are resolved against the spheres with
+    pick(). Otherwise the points are drawn as screen-space sprites of
+    Params.PointSize and scale is not used.
+
+    The selected point, if any, is drawn in Params.SelectedColor at
+    Params.PointWinSelectedRadius; selecting only rewrites the entries of
+    the old and the new selected point.
+    """
+
+    def __init__(self, points, colors, glyphs):
+        """points: {point_id: vertices} (x, y, z first in the first vertex);
+        colors: {point_id: (r, g, b)} with components in [0, 1].
+        Points without vertices are left out."""
+        self.glyphs = glyphs
+        items = [(pid, vertices[0]) for pid, vertices in points.items() if vertices]
+        self.point_ids = np.array([pid for pid, _ in items], dtype=np.int64)
+        self.indices = {pid: index for index, (pid, _) in enumerate(items)}
+
+        self.coords = np.array([vertex[:3] for _, vertex in items], dtype=np.float64).reshape(-1, 3)
+        vtk_points = vtkPoints()
+        vtk_points.SetData(numpy_to_vtk(self.coords, deep=True))
+        verts = vtkCellArray()
+        verts.SetData(numpy_to_vtkIdTypeArray(np.arange(len(items) + 1, dtype=np.int64), deep=True),
+                      numpy_to_vtkIdTypeArray(np.arange(len(items), dtype=np.int64), deep=True))
+
+        self.base_colors = np.array([_rgb(colors[pid]) for pid, _ in items],
+                                    dtype=np.uint8).reshape(-1, 3)
+        self.selected = None
+
+        # Displayed arrays; the VTK arrays below share their memory.
+        self.colors = self.base_colors.copy()
+        self.scales = np.full(len(items), float(Params.PointWinRadius.value))
+
+        self.polydata = vtkPolyData()
+        self.polydata.SetPoints(vtk_points)
+        self.polydata.SetVerts(verts)
+        point_data = self.polydata.GetPointData()
+        ids = numpy_to_vtkIdTypeArray(self.point_ids, deep=True)
+        ids.SetName("point_id")
+        point_data.AddArray(ids)
+        self._colors = numpy_to_vtk(self.colors, deep=False, array_type=VTK_UNSIGNED_CHAR)
+        self._colors.SetName("colors")
+        point_data.SetScalars(self._colors)
+        self._scales = numpy_to_vtk(self.scales, deep=False)
+        self._scales.SetName("scale")
+        point_data.AddArray(self._scales)
+
+        self.actor = vtkActor()
+        if glyphs:
+            sphere = vtkSphereSource()
+            sphere.SetRadius(1.0)
+            sphere.SetThetaResolution(Params.PointWinTheta.value)
+            sphere.SetPhiResolution(Params.PointWinPhi.value)
+            mapper = vtkGlyph3DMapper()
+            mapper.SetSourceConnection(sphere.GetOutputPort())
+            mapper.SetScaleArray("scale")
+            mapper.SetScaleModeToScaleByMagnitude()
+            self.actor.GetProperty().SetPointSize(Params.PointWinSize.value)
+        else:
+            mapper = vtkPolyDataMapper()
+            self.actor.GetProperty().SetRepresentationToPoints()
+            self.actor.GetProperty().SetPointSize(Params.PointSize.value)
+            self.actor.GetProperty().RenderPointsAsSpheresOn()
+        mapper.SetInputData(self.polydata)
+        mapper.SetScalarModeToUsePointData()
+        mapper.SetColorModeToDirectScalars()
+        self.actor.SetMapper(mapper)
+        self.actors = [self.actor]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __contains__(self, point_id):
+        return point_id in self.indices
+
+    def owns(self, actor):
+        """True if actor is the layer's actor."""
+        return actor is self.actor
+
+    def point_id_at(self, index):
+        """The point_id of point index of the layer's polydata (a picker's
+        GetPointId()), or None."""
+        if 0 <= index < len(self.point_ids):
+            return int(self.point_ids[index])
+        return None
+
+    def position(self, point_id):
+        return self.polydata.GetPoint(self.indices[point_id])
+
+    def pick(self, p0, p1):
+        """Hit-test the glyph spheres along the pick ray p0-p1 (world
+        coordinates, near to far). Return (point_id, distance) of the
+        sphere the ray enters first, distance being from p0, or
+        (None, None) if it misses them all."""
+        p0 = np.asarray(p0, dtype=np.float64)
+        direction = np.asarray(p1, dtype=np.float64) - p0
+        length = float(np.linalg.norm(direction))
+        if not len(self.point_ids) or length == 0.0:
+            return None, None
+        direction /= length
+
+        offsets = self.coords - p0
+        along = offsets @ direction
+        # Squared radius minus squared distance from the centre to the ray.
+        depth = self.scales * self.scales - (np.einsum("ij,ij->i", offsets, offsets) - along * along)
+        entry = np.maximum(along - np.sqrt(np.maximum(depth, 0.0)), 0.0)
+        hits = np.flatnonzero((depth >= 0.0) & (along >= 0.0) & (entry <= length))
+        if not len(hits):
+            return None, None
+        index = hits[np.argmin(entry[hits])]
+        return int(self.point_ids[index]), float(entry[index])
+
+    # -------------------------------------------------------------------------
+    # Selection
+    # -------------------------------------------------------------------------
+
+    def _restyle(self, point_id, color, scale):
+        index = self.indices[point_id]
+        self.colors[index] = color
+        self.scales[index] = scale
+        self._colors.Modified()
+        self._scales.Modified()
+        self.polydata.Modified()
+
+    def select(self, point_id):
+        if point_id not in self.indices:
+            return
+        self.deselect()
+        self._restyle(point_id, _rgb(Params.SelectedColor.value),
+                      Params.PointWinSelectedRadius.value)
+        self.selected = point_id
+
+    def deselect(self):
+        if self.selected is None:
+            return
+        self._restyle(self.selected, self.base_colors[self.indices[self.selected]],
+                      Params.PointWinRadius.value)
+        self.selected = None
+
+
+class LabelLayer:
+    """Text labels at anchor points, all drawn by one 2D actor.
+
+    The anchors are one vtkPolyData with point data arrays label (the
+    text) and priority. vtkPointSetToLabelHierarchy sorts them into a
+    label hierarchy and vtkLabelPlacementMapper places, each frame, the
+    labels that fit on screen without overlapping, higher priority first;
+    labels whose anchor is hidden behind scene geometry (depth buffer) are
+    skipped.
+
+    set_labels() replaces the anchors; set_texts() only rewrites the text
+    and priority arrays of the current anchors, e.g. on a heatmap period
+    change.
+    """
+
+    def __init__(self, font_size, color):
+        self.ids = []
+        self.base_priorities = np.zeros(0)
+        self.priorities = np.zeros(0)
+
+        self.polydata = vtkPolyData()
+        self._texts = vtkStringArray()
+        self._texts.SetName("label")
+        self._priorities = numpy_to_vtk(self.priorities, deep=False)
+        self._priorities.SetName("priority")
+        self.set_labels([], np.zeros((0, 3)), [])
+
+        self.hierarchy = vtkPointSetToLabelHierarchy()
+        self.hierarchy.SetInputData(self.polydata)
+        self.hierarchy.SetLabelArrayName("label")
+        self.hierarchy.SetPriorityArrayName("priority")
+        text_property = self.hierarchy.GetTextProperty()
+        text_property.SetFontSize(int(font_size))
+        text_property.SetColor(color)
+
+        mapper = vtkLabelPlacementMapper()
+        mapper.SetInputConnection(self.hierarchy.GetOutputPort())
+        mapper.SetPlaceAllLabels(False)
+        mapper.UseDepthBufferOn()
+        mapper.SetMaximumLabelFraction(Params.LabelMaximumScreenFraction.value)
+        self.actor = vtkActor2D()
+        self.actor.SetMapper(mapper)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_labels(self, ids, positions, texts, priorities=None):
+        """Replace every label: ids names the labelled items (kept for the
+        caller to check whether the anchors are still current), positions
+        is an (n, 3) array of anchors. priorities (default all equal) are
+        also the ones set_texts() falls back to."""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.ids = list(ids)
+        self.base_priorities = (np.zeros(len(self.ids)) if priorities is None
+                                else np.asarray(priorities, dtype=float))
+
+        points = vtkPoints()
+        points.SetData(numpy_to_vtk(positions, deep=True))
+        self.polydata.SetPoints(points)
+        verts = vtkCellArray()
+        verts.SetData(numpy_to_vtkIdTypeArray(np.arange(len(self.ids) + 1, dtype=np.int64), deep=True),
+                      numpy_to_vtkIdTypeArray(np.arange(len(self.ids), dtype=np.int64), deep=True))
+        self.polydata.SetVerts(verts)
+
+        self.priorities = self.base_priorities.copy()
+        self._priorities = numpy_to_vtk(self.priorities, deep=False)
+        self._priorities.SetName("priority")
+        point_data = self.polydata.GetPointData()
+        point_data.AddArray(self._priorities)
+        point_data.AddArray(self._texts)
+        self.set_texts(texts)
+
+    def set_texts(self, texts, priorities=None):
+        """Rewrite the label texts (and priorities, default: the ones given
+        to set_labels) of the current anchors, in order."""
+        if len(texts) != len(self.ids):
+            raise ValueError(f"{len(texts)} texts for {len(self.ids)} labels")
+        self._texts.SetNumberOfValues(len(texts))
+        for i, text in enumerate(texts):
+            self._texts.SetValue(i, text)
+        self.priorities[:] = self.base_priorities if priorities is None else priorities
+        self._texts.Modified()
+        self._priorities.Modified()
+        self.polydata.Modified()
+
+    def clear(self):
+        self.set_labels([], np.zeros((0, 3)), [])
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import random
 
 from PySide6 import QtWidgets
@@ -1100,8 +1101,7 @@ class MainWindowApp(QtWidgets.QMainWindow, Ui_mainWindow):
             self.currentPeriod = 1
             self.maxPeriod = model.getMaxPeriod()
             self.labelPeriod.setText(f"P: 01/{self.maxPeriod:02d}")
-            model.updateRoutesTonnes(1)
-            self.vtkWidget.polylines_update_data()
+            self.vtkWidget.heatmap_load_period(1)
             self.vtkWidget.OnHeatMap(checked)
         self.config_heatmap(HeatMapCfg.PERIOD, checked)
 
@@ -1121,8 +1121,7 @@ class MainWindowApp(QtWidgets.QMainWindow, Ui_mainWindow):
         model = self.vtkWidget.model
         if not model:
             return
-        model.updateRoutesTonnes(self.currentPeriod)
-        self.vtkWidget.polylines_update_data()
+        self.vtkWidget.heatmap_load_period(self.currentPeriod)
         self.vtkWidget.OnHeatMap(True)
 
     def config_heatmap(self, heatmapcfg, checked=True):
@@ -1134,6 +1133,8 @@ class MainWindowApp(QtWidgets.QMainWindow, Ui_mainWindow):
         if heatmapcfg == HeatMapCfg.INIT:
             self.config_heatmap_init()
         elif heatmapcfg in (HeatMapCfg.OPEN, HeatMapCfg.CONF):
+            if model:
+                model.refreshSchema()
             if model and model.hasRoutesTonnesTable():
                 self.actionHeatMap.setEnabled(True)
         elif heatmapcfg == HeatMapCfg.CLEAR:
@@ -1306,6 +1307,8 @@ class MainWindowApp(QtWidgets.QMainWindow, Ui_mainWindow):
             # actionContourDiff becomes clickable as soon as there's valid
             # data in the contourdiffs table — activating it (on_contourdiff)
             # is what then enables contourDiffResult/Backward/Period/Forward.
+            if model:
+                model.refreshSchema()
             if model and model.hasContourDiffResult():
                 self.actionContourDiff.setEnabled(True)
             else:
@@ -1486,6 +1489,8 @@ class MainWindowApp(QtWidgets.QMainWindow, Ui_mainWindow):
 # ---------------------------------------------------------------------------
 
 def main():
+    # Needed by the import process pool in frozen (PyInstaller) builds.
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     app.setStyle("Fusion")
     window = MainWindowApp()
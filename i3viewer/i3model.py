@@ -1,15 +1,41 @@
 import csv
-import math
+import hashlib
+import multiprocessing
 import os
 import random
 import re
 import sqlite3
 import sys
+import time
+from collections import Counter
+from contextlib import closing, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 from datetime import datetime
 
-import vtk
-
-from i3viewer.i3enums import ContourDiffResult, FileType, Params, SessionResult
+import numpy as np
+from vtkmodules.vtkCommonCore import vtkIdList, vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData, vtkPolyLine
+from vtkmodules.vtkFiltersCore import (vtkCleanPolyData, vtkDelaunay2D, vtkGlyph3D,
+                                       vtkPolyDataNormals)
+from vtkmodules.vtkFiltersSources import vtkSphereSource
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper
+
+from i3viewer.i3enums import (ContourDiffCheckpoint, ContourDiffResult, FileType,
+                              PairingStats, Params, SessionResult)
+from i3viewer.i3cache import (cached_csv_blocks, cached_xyz_blocks,
+                              iter_cached_xyz_blocks, redirect_worker_stdout)
+from i3viewer.i3geometry import (ContourSet, points_in_polygon_2d,
+                                 segments_intersect_2d)
+from i3viewer.i3db import (INDEXES, ConnectionManager, SchemaCatalog,
+                           bulk_pragmas, bulk_transaction, ensure_indexes,
+                           find_full_scans, print_write_stats, write_stats)
+from i3viewer.i3layers import LabelLayer, PointLayer, PolylineLayer
+from i3viewer.i3parser import blocks_to_polylines, blocks_to_surfaces
+from i3viewer.i3spatial import (GridIndex, SegmentGrid, bboxes_within,
+                                overlapping_boxes)
+from i3viewer.i3storage import (create_ring_table, insert_rings_sql,
+                                is_ring_table, pack_ring, unpack_ring)
 
 # Filename convention for contour-diff surface files: YYMM_SHnnn.xyzs
 # e.g. "2512_SH007.xyzs" -> period 2025-12, shovel "SH007"
@@ -18,6 +44,185 @@ SHOVEL_FILENAME_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
+# -----------------------------------------------------------------------------
+# Hot Read Queries
+# -----------------------------------------------------------------------------
+# Queries run on every period step of contour-diff browsing, the contour
+# diff itself and the heatmap. They are kept here so checkQueryPlans()
+# explains exactly the SQL that runs. Each must be answered by an index
+# search (see i3db.INDEXES), never a full scan, or browsing slows down
+# linearly with the size of the database. Tables are not aliased, since
+# query plans name the alias rather than the table.
+
+# Distinct values are walked one index seek at a time (a "skip scan")
+# instead of DISTINCT / GROUP BY, which read every row of the table.
+CUTS_PERIODS_SQL = """
+    WITH RECURSIVE periods(period) AS (
+        SELECT MIN(period) FROM cuts
+        UNION ALL
+        SELECT (SELECT MIN(period) FROM cuts WHERE period > periods.period)
+        FROM periods WHERE periods.period IS NOT NULL
+    )
+    SELECT period FROM periods WHERE period IS NOT NULL
+"""
+
+CUTS_PERIOD_SHOVEL_SQL = """
+    SELECT surface_id, X, Y, Z FROM cuts
+    WHERE period=? AND shovel=?
+    ORDER BY surface_id, point_id
+"""
+
+CUTS_PERIOD_SQL = """
+    SELECT surface_id, X, Y, Z FROM cuts
+    WHERE period=?
+    ORDER BY surface_id, point_id
+"""
+
+CUTS_RINGS_PERIOD_SHOVEL_SQL = """
+    SELECT surface_id, coords FROM cuts
+    WHERE period=? AND shovel=?
+    ORDER BY surface_id
+"""
+
+CUTS_RINGS_PERIOD_SQL = """
+    SELECT surface_id, coords FROM cuts
+    WHERE period=?
+    ORDER BY surface_id, shovel
+"""
+
+# Every shovel of a period at once, tagged with its shovel (batch runs,
+# see i3model._cuts_read_period_shovels). Same order as the "All" reads.
+CUTS_PERIOD_SHOVELS_SQL = """
+    SELECT surface_id, shovel, X, Y, Z FROM cuts
+    WHERE period=?
+    ORDER BY surface_id, point_id
+"""
+
+CUTS_RINGS_PERIOD_SHOVELS_SQL = """
+    SELECT surface_id, shovel, coords FROM cuts
+    WHERE period=?
+    ORDER BY surface_id, shovel
+"""
+
+CONTOURDIFF_NAMES_SQL = """
+    WITH RECURSIVE names(result_name) AS (
+        SELECT MIN(result_name) FROM contourdiffs
+        UNION ALL
+        SELECT (SELECT MIN(result_name) FROM contourdiffs
+                WHERE result_name > names.result_name)
+        FROM names WHERE names.result_name IS NOT NULL
+    )
+    SELECT result_name FROM names
+    WHERE result_name IS NOT NULL
+    ORDER BY (SELECT MIN(rowid) FROM contourdiffs
+              WHERE contourdiffs.result_name = names.result_name) ASC
+"""
+
+CONTOURDIFF_IDS_SQL = """
+    WITH RECURSIVE ids(contourdiff_id) AS (
+        SELECT MIN(contourdiff_id) FROM contourdiffs WHERE result_name=:result_name
+        UNION ALL
+        SELECT (SELECT MIN(contourdiff_id) FROM contourdiffs
+                WHERE result_name=:result_name AND contourdiff_id > ids.contourdiff_id)
+        FROM ids WHERE ids.contourdiff_id IS NOT NULL
+    )
+    SELECT contourdiff_id FROM ids WHERE contourdiff_id IS NOT NULL
+"""
+
+CONTOURDIFF_CHECKPOINT_IDS_SQL = """
+    SELECT contourdiff_id FROM contourdiff_periods
+    WHERE result_name=?
+    ORDER BY contourdiff_id
+"""
+
+CONTOURDIFF_NEXT_ID_SQL = """
+    SELECT MAX(contourdiff_id) FROM contourdiff_periods WHERE result_name=?
+"""
+
+CONTOURDIFF_CHECKPOINT_SQL = """
+    SELECT keyframe, surface_ids FROM contourdiff_periods
+    WHERE result_name=? AND contourdiff_id=?
+"""
+
+# Snapshot rows of a keyframe and the deltas after it, up to and including
+# the snapshot being read (see i3model._contourdiffs_read_snapshot).
+CONTOURDIFF_SNAPSHOT_SQL = """
+    SELECT contourdiff_id, surface_id, X, Y, Z FROM contourdiffs
+    WHERE result_name=? AND contourdiff_id BETWEEN ? AND ?
+    ORDER BY contourdiff_id, surface_id, point_id
+"""
+
+CONTOURDIFF_RINGS_SNAPSHOT_SQL = """
+    SELECT contourdiff_id, surface_id, coords FROM contourdiffs
+    WHERE result_name=? AND contourdiff_id BETWEEN ? AND ?
+    ORDER BY contourdiff_id, surface_id
+"""
+
+ROUTES_TONNES_MAX_PERIOD_SQL = "SELECT max(period) FROM routes_tonnes"
+
+ROUTES_TONNES_UPDATE_SQL = """
+    UPDATE polylines
+    SET tonne = (
+        SELECT COALESCE(SUM(routes_tonnes.tonne), 0)
+        FROM routes_tonnes
+        WHERE routes_tonnes.period = ?
+        AND routes_tonnes.segments LIKE '%' || polylines.route || '%'
+    )
+"""
+
+# Heatmap step without the UPDATE above (see i3model.routes_tonnes_read_period):
+# the period's tonnes per distinct segments string...
+ROUTES_TONNES_PERIOD_SQL = """
+    SELECT segments, SUM(tonne) FROM routes_tonnes
+    WHERE period = ?
+    GROUP BY segments
+"""
+
+# ...and, once, every (segments, polyline) pair the UPDATE's LIKE matches.
+ROUTES_TONNES_MATCHES_SQL = """
+    SELECT s.segments, p.polyline_id
+    FROM (SELECT DISTINCT segments FROM routes_tonnes) AS s
+    JOIN (SELECT DISTINCT polyline_id, route FROM polylines) AS p
+    ON s.segments LIKE '%' || p.route || '%'
+"""
+
+
+# -----------------------------------------------------------------------------
+# Cancellation
+# -----------------------------------------------------------------------------
+
+class OperationCancelled(Exception):
+    """Raised by a long i3model operation when its cancel callable returns
+    True. It is raised inside the operation's open transaction, so the
+    writes of the unit in progress are rolled back."""
+
+
+def _check_cancelled(cancel):
+    """Raise OperationCancelled if cancel (a callable, or None) says so."""
+    if cancel is not None and cancel():
+        raise OperationCancelled()
+
+
+# -----------------------------------------------------------------------------
+# Contour Diff — Run State
+# -----------------------------------------------------------------------------
+
+class _ContourDiffJob:
+    """Per-result state of i3model._run_contour_diffs: one shovel filter
+    and the result_name its snapshots are written under."""
+
+    def __init__(self, shovel_name, result_name, contours_a, fingerprint, checkpoints):
+        self.shovel_name = shovel_name
+        self.result_name = result_name
+        self.contours_a = contours_a            # Contour A after the last period done
+        self.base_fingerprint = fingerprint
+        self.fingerprint = fingerprint          # chained up to the current period
+        self.checkpoints = checkpoints          # of the previous run, to resume from
+        self.resuming = True                    # still matching those checkpoints
+        self.reused = 0
+        self.rows = 0
+        self.contours = 0
+
 
 class i3model:
 
@@ -26,28 +231,46 @@ class i3model:
     # -------------------------------------------------------------------------
 
     def __init__(self, file_path):
+        # Pooled SQLite connections and the cached schema of file_path (see
+        # i3db); both must exist before file_path is assigned.
+        self.db = ConnectionManager()
+        self.schema = SchemaCatalog(self._connect)
+        self._file_path = None
         self.file_path = file_path
 
         self.polylines = {}
         self.points = {}
         self.surfaces = {}
-        self.polylabels = {}
-        self.pointlabels = {}
+
+        # Polyline and point labels, one LabelLayer (one 2D actor) each;
+        # filled by i3vtkWidget.polylabels_create_actors and
+        # pointlabels_create_actors.
+        self.polylabels = LabelLayer(Params.PolylabelFontSize.value, Params.PolylabelColor.value)
+        self.pointlabels = LabelLayer(Params.PointlabelFontSize.value, Params.PointlabelColor.value)
 
         self.polyline_id = 1
         self.point_id = 1
         self.surface_id = 1
         self.surface_file_id = 1
-        self.polylabel_id = 1
-        self.pointlabel_id = 1
 
         self.actors = []
         self.contourColor = []
 
+        # PolylineLayer / PointLayer holding every polyline / point when
+        # Params.PolylinesMerged / Params.PointsMerged is set (see
+        # polylines_create_actors, points_create_actors); None otherwise.
+        self.polyline_layer = None
+        self.point_layer = None
+
+        # (file_path, matches) of _routes_tonnes_matches; reset whenever the
+        # polylines or routes_tonnes are rewritten or read again.
+        self._routes_tonnes_cache = None
+
         # Contour-diff workflow state (populated by run_contour_diff,
         # consumed by write_results)
         self.contourdiff_folder_path = None
         self._last_contourdiff_result = None
+        self._last_contourdiff_batch = None
 
         # Contour-diff period-browsing state: which result_name is currently
         # selected/rendered in the 3D view (set by updateContourDiff).
@@ -59,46 +282,182 @@ class i3model:
         # the two — see i3vtkWidget.OnContourDiff.
         self.contourdiff_polylines = {}
 
+        # WriteStats of the most recent bulk save (see i3db.bulk_transaction).
+        self.last_write_stats = None
+
+        # Where the processes of the parsing and clipping pools print:
+        # None (the inherited stdout), "stderr" or "devnull" (see
+        # i3cache.redirect_worker_stdout). Set by i3cli.
+        self.worker_stdout = None
+
+        # PairingStats of the most recent run_contour_diff (all periods).
+        self.last_pairing_stats = None
+
+        # Create new surfaces/cuts/contourdiffs tables in the one-row-per-ring
+        # BLOB layout (see i3storage). Existing tables keep their layout.
+        self.ring_storage = False
+
+        # Every Nth contourdiffs snapshot of a run is a keyframe holding all
+        # of Contour A; the ones in between only hold the rings that changed
+        # (see _contourdiffs_save_snapshot). 1 makes every snapshot a
+        # keyframe.
+        self.contourdiff_keyframe_interval = Params.ContourDiffKeyframeInterval.value
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    @file_path.setter
+    def file_path(self, file_path):
+        # Switching files releases the connections held on the old one.
+        if file_path != self._file_path:
+            self.db.close()
+            self.schema.clear()
+        self._file_path = file_path
+
     def RemoveAllActors(self):
+        self.db.close()
+        self.schema.clear()
+
         self.polylines = {}
         self.points = {}
         self.surfaces = {}
-        self.polylabels = {}
-        self.pointlabels = {}
+        self.polylabels.clear()
+        self.pointlabels.clear()
         self.contourdiff_polylines = {}
+        self.polyline_layer = None
+        self.point_layer = None
+        self._routes_tonnes_cache = None
         self.current_contourdiff_result = None
 
         self.polyline_id = 1
         self.point_id = 1
         self.surface_id = 1
         self.surface_file_id = 1
-        self.polylabel_id = 1
-        self.pointlabel_id = 1
 
     # -------------------------------------------------------------------------
     # Database Utilities
     # -------------------------------------------------------------------------
 
     def _connect(self):
-        """Return a new SQLite connection to the current file path."""
-        return sqlite3.connect(self.file_path)
+        """Return the pooled SQLite connection to the current file path.
+
+        The connection is shared and long-lived: callers must not close it.
+        Use it as a context manager (`with self._connect() as conn:`) to
+        commit on success and roll back on error.
+        """
+        return self.db.connection(self.file_path)
+
+    def _save_connection(self, db_path):
+        """Return a context manager giving a connection to db_path for a
+        save: the pooled one if db_path is the current file, otherwise a
+        short-lived connection closed after the write, so an exported
+        database isn't held open (and locked on Windows) by the pool."""
+        if self.file_path is not None and \
+                os.path.abspath(db_path) == os.path.abspath(self.file_path):
+            return nullcontext(self._connect())
+        return closing(sqlite3.connect(db_path))
 
     def table_exists(self, table_name):
-        """Return True if the given table exists in the SQLite database."""
+        """Return True if the given table exists in the SQLite database.
+
+        Answered from the schema catalog; sqlite_master is only read when
+        the catalog is (re)loaded.
+        """
         try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-                (table_name,),
-            )
-            result = cursor.fetchone()
-            conn.close()
-            return result is not None
+            return self.schema.has_table(table_name)
         except sqlite3.Error as e:
             print(e.sqlite_errorcode)
             return False
 
+    def refreshSchema(self):
+        """Reload the schema catalog if the database schema was changed
+        outside this model. Called by the UI before a burst of has*
+        checks."""
+        try:
+            self.schema.refresh_if_changed()
+        except sqlite3.Error as e:
+            print(e.sqlite_errorcode)
+            self.schema.clear()
+
+    def _schema_invalidate(self, db_path=None, table=None):
+        """Invalidate the schema catalog after a write to db_path (defaults
+        to file_path). Writes to other databases leave it untouched."""
+        if db_path is not None and (
+            self.file_path is None
+            or os.path.abspath(db_path) != os.path.abspath(self.file_path)
+        ):
+            return
+        self.schema.invalidate(table)
+
+    def _hot_queries(self):
+        """Return (name, sql, params) for every hot read query that applies
+        to the tables present in the database, in their current layout."""
+        queries = []
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            if self.table_exists("cuts"):
+                rings = is_ring_table(cursor, "cuts")
+                queries += [
+                    ("cuts periods", CUTS_PERIODS_SQL, ()),
+                    ("cuts period+shovel",
+                     CUTS_RINGS_PERIOD_SHOVEL_SQL if rings else CUTS_PERIOD_SHOVEL_SQL,
+                     ("", "")),
+                    ("cuts period",
+                     CUTS_RINGS_PERIOD_SQL if rings else CUTS_PERIOD_SQL, ("",)),
+                    ("cuts period, all shovels",
+                     CUTS_RINGS_PERIOD_SHOVELS_SQL if rings else CUTS_PERIOD_SHOVELS_SQL, ("",)),
+                ]
+            if self.table_exists("contourdiffs"):
+                rings = is_ring_table(cursor, "contourdiffs")
+                queries += [
+                    ("contourdiffs names", CONTOURDIFF_NAMES_SQL, ()),
+                    ("contourdiffs ids", CONTOURDIFF_IDS_SQL, {"result_name": ""}),
+                    ("contourdiffs snapshot",
+                     CONTOURDIFF_RINGS_SNAPSHOT_SQL if rings else CONTOURDIFF_SNAPSHOT_SQL,
+                     ("", 0, 0)),
+                ]
+            if self.table_exists("contourdiff_periods"):
+                queries += [
+                    ("contourdiff_periods ids", CONTOURDIFF_CHECKPOINT_IDS_SQL, ("",)),
+                    ("contourdiff_periods next id", CONTOURDIFF_NEXT_ID_SQL, ("",)),
+                    ("contourdiff_periods checkpoint", CONTOURDIFF_CHECKPOINT_SQL, ("", 0)),
+                ]
+            if self.table_exists("routes_tonnes"):
+                queries.append(("routes_tonnes max period", ROUTES_TONNES_MAX_PERIOD_SQL, ()))
+                queries.append(("routes_tonnes period", ROUTES_TONNES_PERIOD_SQL, (0,)))
+                if self.table_exists("polylines"):
+                    queries.append(("routes_tonnes update", ROUTES_TONNES_UPDATE_SQL, (0,)))
+        return queries
+
+    def checkQueryPlans(self, verbose=True):
+        """Self-check: run EXPLAIN QUERY PLAN on the hot read queries and
+        flag every full scan of an indexed table (i3db.INDEXES), e.g. on a
+        database written before its indexes existed.
+
+        Returns a list of (query name, plan detail) for each scan found,
+        empty if every hot query is answered by an index search.
+        """
+        if not self.file_path:
+            return []
+        # Plans are explained on a fresh connection: EXPLAIN statements
+        # cached on the pooled one are never re-prepared, so they would keep
+        # reporting the plan from before an index was added elsewhere.
+        try:
+            queries = self._hot_queries()
+            conn = sqlite3.connect(self.file_path)
+            try:
+                flagged = find_full_scans(conn, queries, tables=INDEXES)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(e.sqlite_errorcode)
+            return []
+        if verbose:
+            for name, detail in flagged:
+                print(f"Query plan warning: {name}: {detail}")
+        return flagged
+
     def hasPolylinesTable(self):
         return self.table_exists("polylines")
 
@@ -126,25 +485,15 @@ class i3model:
     def getContourDiffResultNames(self):
         """Return the distinct result_name values stored in the contourdiffs
         table, in the order they were first created (insertion order via
-        MIN(contourdiff_id) per group, then alphabetically as a tiebreak).
-        Used to populate comboBox_contourDiffResult. Returns an empty list
-        if the table doesn't exist or has no rows."""
+        MIN(rowid) per group). Used to populate comboBox_contourDiffResult.
+        Returns an empty list if the table doesn't exist or has no rows."""
         if not self.table_exists("contourdiffs"):
             return []
 
-        conn = self._connect()
-        try:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT result_name FROM contourdiffs
-                GROUP BY result_name
-                ORDER BY MIN(rowid) ASC
-                """
-            )
+            cursor.execute(CONTOURDIFF_NAMES_SQL)
             return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
 
     def hasContourDiffPeriods(self, result_name):
         """Return True if result_name has at least one contourdiff_id to
@@ -177,24 +526,12 @@ class i3model:
 
         contourdiff_id = ids[period_index - 1]
 
-        conn = self._connect()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT surface_id, X, Y, Z FROM contourdiffs
-                WHERE result_name=? AND contourdiff_id=?
-                ORDER BY surface_id, point_id
-                """,
-                (result_name, contourdiff_id),
-            )
-            data = cursor.fetchall()
-        finally:
-            conn.close()
+        with self._connect() as conn:
+            snapshot = self._contourdiffs_read_snapshot(conn.cursor(), result_name, contourdiff_id)
 
         polylines = {}
-        for surface_id, x, y, z in data:
-            polylines.setdefault(surface_id, []).append((x, y, z, 0.0, None, None))
+        for surface_id, vertices in snapshot.items():
+            polylines[surface_id] = [(x, y, z, 0.0, None, None) for x, y, z in vertices]
 
         self.contourdiff_polylines = polylines
         self.current_contourdiff_result = result_name
@@ -228,25 +565,24 @@ class i3model:
     def _contourdiff_get_ids(self, result_name):
         """Return the contourdiff_id values for result_name, sorted
         ascending — this is the navigation order for period browsing.
+
+        Taken from the contourdiff_periods checkpoints, which list every
+        snapshot even when a delta snapshot has no rows; results written
+        before checkpoints existed fall back to the contourdiffs table.
         Returns an empty list if result_name is falsy, the contourdiffs
         table doesn't exist, or result_name has no rows."""
         if not result_name or not self.table_exists("contourdiffs"):
             return []
 
-        conn = self._connect()
-        try:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT DISTINCT contourdiff_id FROM contourdiffs
-                WHERE result_name=?
-                ORDER BY contourdiff_id ASC
-                """,
-                (result_name,),
-            )
+            if self.table_exists("contourdiff_periods"):
+                cursor.execute(CONTOURDIFF_CHECKPOINT_IDS_SQL, (result_name,))
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids:
+                    return ids
+            cursor.execute(CONTOURDIFF_IDS_SQL, {"result_name": result_name})
             return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
 
     # -------------------------------------------------------------------------
     # Contour Diff — Folder Scan
@@ -291,33 +627,7 @@ class i3model:
         basename = os.path.basename(file_path)
         return SHOVEL_FILENAME_PATTERN.match(basename) is not None
 
-    def _read_xyzs_surfaces(self, file_path):
-        """Read a single XYZS file and return its surfaces as a dict
-        of surface_index -> list of (x, y, z) vertices.
-
-        Mirrors surfaces_read_xyzs_file but reads an arbitrary path
-        instead of self.file_path, and uses local (per-file) surface
-        indices starting at 1, since these are not yet merged into
-        the model's main self.surfaces registry.
-        """
-        surfaces = {1: []}
-        current_id = 1
-
-        with open(file_path, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line == "$":
-                    current_id += 1
-                    surfaces[current_id] = []
-                else:
-                    parts = line.split()
-                    if len(parts) == 3:
-                        x, y, z = (round(float(v), 3) for v in parts)
-                        surfaces[current_id].append((x, y, z))
-
-        return {k: v for k, v in surfaces.items() if v}
-
-    def import_files(self, file_paths):
+    def import_files(self, file_paths, workers=None, progress=None, cancel=None):
         """Import scanned XYZS files into the cuts table.
 
         Each filename is expected to follow the 'YYMM_SHnnn.xyzs' convention
@@ -326,15 +636,90 @@ class i3model:
         period and shovel name. Files that don't match the naming
         convention are skipped.
 
+        Files are parsed on a process pool and streamed, in input order,
+        to this (single) writer, which replaces each file's
+        (period, shovel) rows in its own transaction — the resulting cuts
+        table is the same as a sequential import's.
+
+        Imports are incremental: the cuts_manifest table remembers the
+        basename, size, mtime and SHA-1 of the file last imported for each
+        (period, shovel). A file whose size and mtime still match is not
+        read at all; one whose size or mtime changed is hashed, and only
+        re-imported if its content actually differs.
+
+        Args:
+            file_paths: XYZS files to import.
+            workers: parser processes (default: CPU count; 1 parses
+                     in-process).
+            progress: optional callable(done, total, basename), called
+                      after each file has been committed.
+            cancel: optional callable returning True to stop the import.
+                    It is checked before each file is committed; the file
+                    in progress is rolled back and OperationCancelled is
+                    raised. Files already committed stay imported (and in
+                    the manifest), so the next import carries on from there.
+
         Returns a dict with:
-            "imported": list of basenames that were successfully imported
-            "skipped":  list of basenames that didn't match the naming convention
+            "imported":  list of basenames that were successfully imported
+            "unchanged": list of basenames already imported with the same content
+            "skipped":   list of basenames that didn't match the naming convention
         """
         imported = []
+        unchanged = []
         skipped = []
+        jobs = []   # (file_path, basename, period, shovel)
+
+        for file_path in file_paths or []:
+            basename = os.path.basename(file_path)
+            match = SHOVEL_FILENAME_PATTERN.match(basename)
+            if not match:
+                skipped.append(basename)
+                continue
+
+            period = "20" + match.group("yy") + "-" + match.group("mm")
+            shovel = match.group("shovel").upper()
+            jobs.append((file_path, basename, period, shovel))
 
         conn = self._connect()
-        cursor = conn.cursor()
+        try:
+            with conn:
+                cursor = conn.cursor()
+                self._cuts_ensure_table(cursor)
+                self._cuts_manifest_ensure_table(cursor)
+                jobs = self._cuts_manifest_filter(cursor, jobs, unchanged)
+                rings = is_ring_table(cursor, "cuts")
+
+            start = time.perf_counter()
+            rows = 0
+            paths = [job[0] for job in jobs]
+            with bulk_pragmas(conn), \
+                    closing(iter_cached_xyz_blocks(paths, workers, self.worker_stdout)) as parsed:
+                for done, (job, blocks) in enumerate(zip(jobs, parsed), start=1):
+                    _, basename, period, shovel, manifest_row = job
+                    with bulk_transaction(conn, basename, verbose=False, tune=False) as writer:
+                        self._cuts_write_file(
+                            writer, period, shovel, blocks_to_surfaces(blocks, 1), rings)
+                        self._cuts_manifest_write(writer.cursor, manifest_row)
+                        _check_cancelled(cancel)
+                    rows += writer.rows
+                    imported.append(basename)
+                    if progress is not None:
+                        progress(done, len(jobs), basename)
+        finally:
+            # Also after a cancel: the tables exist and the files committed
+            # so far stay imported.
+            self._schema_invalidate()
+
+        self.last_write_stats = write_stats("cuts", rows, time.perf_counter() - start)
+        print_write_stats(self.last_write_stats)
+
+        return {"imported": imported, "unchanged": unchanged, "skipped": skipped}
+
+    def _cuts_ensure_table(self, cursor):
+        """Create the cuts table and its secondary indexes if they don't
+        exist yet."""
+        if self.ring_storage:
+            create_ring_table(cursor, "cuts")
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS cuts (
@@ -349,40 +734,116 @@ class i3model:
             )
             """
         )
+        ensure_indexes(cursor, "cuts")
 
-        for file_path in file_paths or []:
-            basename = os.path.basename(file_path)
-            match = SHOVEL_FILENAME_PATTERN.match(basename)
-            if not match:
-                skipped.append(basename)
-                continue
-
-            period = "20" + match.group("yy") + "-" + match.group("mm")
-            shovel = match.group("shovel").upper()
+    @staticmethod
+    def _cuts_manifest_ensure_table(cursor):
+        """Create the cuts_manifest table if it doesn't exist yet: one row
+        per (period, shovel), describing the file its cuts rows came from."""
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cuts_manifest (
+                period TEXT NOT NULL,
+                shovel TEXT NOT NULL,
+                basename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha1 TEXT NOT NULL,
+                PRIMARY KEY (period, shovel)
+            )
+            """
+        )
 
-            surfaces = self._read_xyzs_surfaces(file_path)
+    @staticmethod
+    def _cuts_manifest_write(cursor, manifest_row):
+        """Insert or replace one (period, shovel, basename, size, mtime_ns,
+        sha1) manifest row."""
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO cuts_manifest
+                (period, shovel, basename, size, mtime_ns, sha1)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            manifest_row,
+        )
 
-            cursor.execute(
-                "DELETE FROM cuts WHERE period=? AND shovel=?",
-                (period, shovel),
-            )
-            for surface_id, vertices in surfaces.items():
-                for pt_idx, (x, y, z) in enumerate(vertices, start=1):
-                    cursor.execute(
-                        """
-                        INSERT INTO cuts
-                            (period, shovel, surface_id, point_id, X, Y, Z)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (period, shovel, surface_id, pt_idx, x, y, z),
-                    )
+    @staticmethod
+    def _file_sha1(file_path):
+        """Return the hex SHA-1 of a file's content."""
+        digest = hashlib.sha1()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _cuts_manifest_filter(self, cursor, jobs, unchanged):
+        """Drop the jobs whose file is already imported with the same
+        content, appending their basenames to unchanged.
+
+        Returns the remaining jobs as (file_path, basename, period, shovel,
+        manifest_row) tuples. When two files in one run map to the same
+        (period, shovel), all of them are imported so the last one wins,
+        exactly as in a full import.
+        """
+        cursor.execute(
+            "SELECT period, shovel, basename, size, mtime_ns, sha1 FROM cuts_manifest"
+        )
+        manifest = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+        key_counts = Counter((period, shovel) for _, _, period, shovel in jobs)
+
+        remaining = []
+        for file_path, basename, period, shovel in jobs:
+            stat = os.stat(file_path)
+            entry = manifest.get((period, shovel))
+            reusable = key_counts[(period, shovel)] == 1 and entry is not None \
+                and entry[0] == basename
+
+            if reusable and (entry[1], entry[2]) == (stat.st_size, stat.st_mtime_ns):
+                unchanged.append(basename)
+                continue
 
-            imported.append(basename)
+            digest = self._file_sha1(file_path)
+            manifest_row = (period, shovel, basename, stat.st_size, stat.st_mtime_ns, digest)
+            if reusable and entry[3] == digest:
+                # Touched (or copied) but identical: remember the new
+                # size/mtime so the next run skips it without hashing.
+                self._cuts_manifest_write(cursor, manifest_row)
+                unchanged.append(basename)
+                continue
 
-        conn.commit()
-        conn.close()
+            remaining.append((file_path, basename, period, shovel, manifest_row))
+        return remaining
 
-        return {"imported": imported, "skipped": skipped}
+    @staticmethod
+    def _cuts_write_file(writer, period, shovel, surfaces, rings=False):
+        """Replace the cuts rows of (period, shovel) with surfaces, one row
+        per ring if the cuts table uses the ring layout."""
+        writer.cursor.execute(
+            "DELETE FROM cuts WHERE period=? AND shovel=?",
+            (period, shovel),
+        )
+        if rings:
+            writer.insert(
+                insert_rings_sql("cuts"),
+                (
+                    (period, shovel, surface_id, *pack_ring(vertices))
+                    for surface_id, vertices in surfaces.items()
+                    if vertices
+                ),
+            )
+            return
+        writer.insert(
+            """
+            INSERT INTO cuts
+                (period, shovel, surface_id, point_id, X, Y, Z)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (period, shovel, surface_id, pt_idx, x, y, z)
+                for surface_id, vertices in surfaces.items()
+                for pt_idx, (x, y, z) in enumerate(vertices, start=1)
+            ),
+        )
 
     # -------------------------------------------------------------------------
     # Contour Diff — Cumulative Period-by-Period Calculation
@@ -399,25 +860,13 @@ class i3model:
         against the same database file while the first has a write
         transaction in flight can raise 'database is locked' on SQLite.
         """
-        if cursor is not None:
-            cursor.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='cuts'"
-            )
-            if cursor.fetchone() is None:
-                return []
-            cursor.execute("SELECT DISTINCT period FROM cuts ORDER BY period ASC")
-            return [row[0] for row in cursor.fetchall()]
-
         if not self.table_exists("cuts"):
             return []
 
-        conn = self._connect()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT period FROM cuts ORDER BY period ASC")
-            return [row[0] for row in cursor.fetchall()]
-        finally:
-            conn.close()
+        if cursor is None:
+            cursor = self._connect().cursor()
+        cursor.execute(CUTS_PERIODS_SQL)
+        return [row[0] for row in cursor.fetchall()]
 
     def _cuts_read_period(self, period, shovel_name, cursor=None):
         """Fetch cuts rows for one period, grouped by surface_id, applying
@@ -426,44 +875,97 @@ class i3model:
         Returns a dict of surface_id -> list of (x, y, z) vertices, ordered
         by point_id.
 
-        If a cursor is supplied, it is reused instead of opening a new
+        If a cursor is supplied, it is reused instead of the model's pooled
         connection (see _cuts_get_periods for why this matters).
         """
-        owns_conn = cursor is None
-        conn = None
-        if owns_conn:
-            conn = self._connect()
-            cursor = conn.cursor()
+        if cursor is None:
+            cursor = self._connect().cursor()
 
-        try:
-            if shovel_name and shovel_name.lower() != "all":
-                cursor.execute(
-                    """
-                    SELECT surface_id, X, Y, Z FROM cuts
-                    WHERE period=? AND shovel=?
-                    ORDER BY surface_id, point_id
-                    """,
-                    (period, shovel_name),
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT surface_id, X, Y, Z FROM cuts
-                    WHERE period=?
-                    ORDER BY surface_id, point_id
-                    """,
-                    (period,),
-                )
-            data = cursor.fetchall()
-        finally:
-            if owns_conn:
-                conn.close()
+        if is_ring_table(cursor, "cuts"):
+            return self._cuts_read_period_rings(cursor, period, shovel_name)
+
+        if shovel_name and shovel_name.lower() != "all":
+            cursor.execute(CUTS_PERIOD_SHOVEL_SQL, (period, shovel_name))
+        else:
+            cursor.execute(CUTS_PERIOD_SQL, (period,))
+        data = cursor.fetchall()
 
         surfaces = {}
         for surface_id, x, y, z in data:
             surfaces.setdefault(surface_id, []).append((x, y, z))
         return surfaces
 
+    @staticmethod
+    def _cuts_read_period_rings(cursor, period, shovel_name):
+        """Ring-layout counterpart of _cuts_read_period.
+
+        With no shovel filter, rings of different shovels that share a
+        surface_id are merged vertex by vertex — point 1 of every shovel,
+        then point 2, and so on — which is the order the vertex layout's
+        'ORDER BY surface_id, point_id' query returns them in.
+        """
+        if shovel_name and shovel_name.lower() != "all":
+            cursor.execute(CUTS_RINGS_PERIOD_SHOVEL_SQL, (period, shovel_name))
+            return {surface_id: unpack_ring(coords) for surface_id, coords in cursor.fetchall()}
+
+        cursor.execute(CUTS_RINGS_PERIOD_SQL, (period,))
+        return {
+            surface_id: i3model._merge_shovel_rings([unpack_ring(coords) for _, coords in group])
+            for surface_id, group in groupby(cursor.fetchall(), key=lambda row: row[0])
+        }
+
+    @staticmethod
+    def _merge_shovel_rings(rings):
+        """Merge the rings of different shovels sharing a surface_id vertex
+        by vertex, in the order of rings (see _cuts_read_period_rings)."""
+        if len(rings) == 1:
+            return rings[0]
+        return [
+            ring[i]
+            for i in range(max(map(len, rings)))
+            for ring in rings
+            if i < len(ring)
+        ]
+
+    def _cuts_read_period_shovels(self, cursor, period, shovel_names):
+        """Fetch the cuts of one period for several shovel filters at once.
+
+        Returns a dict of shovel_name -> the surface_id groups
+        _cuts_read_period(period, shovel_name) returns. The period is read
+        with a single query whatever the number of filters (a single filter
+        uses _cuts_read_period's own query).
+        """
+        keys = {
+            name: name if name and name.lower() != "all" else None
+            for name in shovel_names
+        }
+        if len(set(keys.values())) == 1:
+            groups = self._cuts_read_period(period, next(iter(keys)), cursor=cursor)
+            return {name: groups for name in keys}
+
+        by_shovel = {}
+        if is_ring_table(cursor, "cuts"):
+            cursor.execute(CUTS_RINGS_PERIOD_SHOVELS_SQL, (period,))
+            rows = [(surface_id, shovel, unpack_ring(coords))
+                    for surface_id, shovel, coords in cursor.fetchall()]
+            every = {
+                surface_id: self._merge_shovel_rings([ring for _, _, ring in group])
+                for surface_id, group in groupby(rows, key=lambda row: row[0])
+            }
+            for surface_id, shovel, ring in rows:
+                by_shovel.setdefault(shovel, {})[surface_id] = ring
+        else:
+            cursor.execute(CUTS_PERIOD_SHOVELS_SQL, (period,))
+            every = {}
+            for surface_id, shovel, x, y, z in cursor.fetchall():
+                every.setdefault(surface_id, []).append((x, y, z))
+                by_shovel.setdefault(shovel, {}).setdefault(surface_id, []).append((x, y, z))
+
+        return {
+            name: every if key is None else by_shovel.get(key, {})
+            for name, key in keys.items()
+        }
+
     @staticmethod
     def _build_actors_from_groups(groups, color):
         """Build vtkActors (one per surface_id group) from a dict of
@@ -485,9 +987,9 @@ class i3model:
         if not vertices:
             return None
 
-        points = vtk.vtkPoints()
-        cells = vtk.vtkCellArray()
-        polyline = vtk.vtkPolyLine()
+        points = vtkPoints()
+        cells = vtkCellArray()
+        polyline = vtkPolyLine()
         polyline.GetPointIds().SetNumberOfIds(len(vertices))
 
         z = vertices[0][2]
@@ -501,14 +1003,14 @@ class i3model:
     @staticmethod
     def surfaces_build_actor_static(points, cells, color, surface_id, z):
         """Stateless variant of surfaces_build_actor."""
-        poly_data = vtk.vtkPolyData()
+        poly_data = vtkPolyData()
         poly_data.SetPoints(points)
         poly_data.SetLines(cells)
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(poly_data)
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetRepresentationToSurface()
         actor.GetProperty().EdgeVisibilityOff()
@@ -519,32 +1021,93 @@ class i3model:
         setattr(actor, "z", z)
         return actor
 
-    def _contour_diff_one_period(self, actors_a, actors_b, color):
-        """Clip every A actor against same-Z B actors for a single period.
+    def _contour_diff_one_period(self, contours_a, contours_b, counts=None, executor=None):
+        """Clip every A contour against same-Z B contours for a single period.
 
         Mirrors i3vtkWidget._clip_actor_against_fid_b/contour_difference,
-        but operates on plain actor lists rather than the widget's
-        contourActorsMap, so it can run headless inside the model.
-
-        Returns the new list of A actors representing Contour A's state
-        after this period (unaffected actors are kept as-is; clipped
-        actors are replaced; fully-consumed actors are dropped).
+        but runs headless on i3geometry.ContourSets instead of actors: no
+        VTK object is created, and each A ring is converted to a point list
+        at most once per period.
+
+        Each A contour is only clipped against the B candidates of the
+        pairing stage (ContourSet.candidates). counts, if given, is a
+        Counter that accumulates the pairing tallies (see
+        contour_difference_pairing_stats).
+
+        Z levels never interact, so when executor (a
+        concurrent.futures.Executor) is given, every Z level that has B
+        contours is clipped as a separate task on it
+        (contour_difference_clip_level). Outcomes are merged back by ring
+        index and tallies are summed, so the result does not depend on the
+        order tasks finish in.
+
+        Returns the ContourSet representing Contour A's state after this
+        period (unaffected rings are kept as-is; clipped rings are
+        replaced; fully-consumed rings are dropped).
         """
-        new_actors = []
-        for actor_a in actors_a:
-            if not hasattr(actor_a, "z") or not hasattr(actor_a, "surface_id"):
-                new_actors.append(actor_a)
-                continue
+        if counts is None:
+            counts = Counter()
+
+        if executor is None:
+            outcomes, level_counts = i3model.contour_difference_clip_level(contours_a, contours_b)
+            counts.update(level_counts)
+        else:
+            outcomes = [None] * len(contours_a)
+            b_by_z = contours_b.by_z()
+            levels = [
+                (a_idx, b_by_z[z])
+                for z, a_idx in contours_a.by_z().items()
+                if z in b_by_z
+            ]
+            # Biggest levels first, so a large level does not start last.
+            levels.sort(key=lambda level: len(level[0]) * len(level[1]), reverse=True)
+            results = executor.map(
+                i3model.contour_difference_clip_level,
+                [contours_a.subset(a_idx) for a_idx, _ in levels],
+                [contours_b.subset(b_idx) for _, b_idx in levels],
+            )
+            for (a_idx, _), (level_outcomes, level_counts) in zip(levels, results):
+                for i, outcome in zip(a_idx, level_outcomes):
+                    outcomes[i] = outcome
+                counts.update(level_counts)
+
+        rings = []
+        for i, outcome in enumerate(outcomes):
+            surface_id, z, coords = contours_a.ring(i)
+            if outcome is None:
+                rings.append((surface_id, z, coords))   # unaffected — keep in place
+            elif outcome:
+                rings.append((surface_id, z, outcome))
+            # else: fully consumed — dropped from Contour A
+
+        return ContourSet.from_rings(rings)
+
+    @staticmethod
+    def contour_difference_clip_level(contours_a, contours_b):
+        """Clip every ring of ContourSet contours_a against its pairing
+        candidates in contours_b.
+
+        Top-level task of _contour_diff_one_period, so it only takes and
+        returns picklable values and can run in a worker process.
 
-            z = actor_a.z
+        Returns (outcomes, counts): one outcome per A ring, in order --
+        None if the ring is unaffected, an empty list if it is dropped,
+        otherwise its new (x, y, z) vertices -- and a Counter of the
+        pairing tallies.
+        """
+        counts = Counter()
+        outcomes = []
+        for i in range(len(contours_a)):
+            z = contours_a.z[i]
             combined_arcs = None
             consumed = False
+            a_pts = None
 
-            for actor_b in actors_b:
-                if not (hasattr(actor_b, "z") and actor_b.z == z):
-                    continue
-
-                arcs, fills = i3model.contour_difference_clip_one_sid(actor_a, actor_b, z)
+            for j in contours_b.candidates(z, contours_a.bbox(i), counts):
+                counts["clipped"] += 1
+                if a_pts is None:
+                    a_pts = contours_a.points(i)
+                arcs, fills = i3model.contour_difference_clip_pts(a_pts, contours_b.points(j))
                 if arcs is None:
                     continue
                 if not arcs:
@@ -553,22 +1116,23 @@ class i3model:
                 combined_arcs = arcs
 
             if consumed:
-                continue   # fully consumed — dropped from Contour A
+                outcomes.append([])
+                continue
 
             if combined_arcs is None:
-                new_actors.append(actor_a)   # unaffected — keep in place
+                outcomes.append(None)
                 continue
 
-            poly = i3model.contour_difference_build_polydata(combined_arcs, [], z)
-            new_actor = i3model.contour_difference_build_actor(poly, color, z)
-            if new_actor is not None:
-                new_actor.surface_id = actor_a.surface_id
-                new_actors.append(new_actor)
-
-        return new_actors
+            # The first arc with 2+ points is what actor_pts() would read
+            # back from the actor contour_difference_build_polydata() builds,
+            # with every vertex moved to the contour's Z.
+            arc = next((seg for seg in combined_arcs if len(seg) >= 2), None)
+            outcomes.append([(p[0], p[1], z) for p in arc] if arc is not None else [])
+        return outcomes, counts
 
     def _contourdiffs_ensure_table(self, cursor):
-        """Create the contourdiffs table if it doesn't exist yet.
+        """Create the contourdiffs table if it doesn't exist yet (in the
+        ring layout when self.ring_storage is set).
 
         Each snapshot (one period's resulting geometry) is identified by
         the pair (result_name, contourdiff_id) — contourdiff_id is unique
@@ -577,7 +1141,10 @@ class i3model:
         rows, the row-level primary key extends that pair with
         (surface_id, point_id) to keep individual rows unique while
         preserving (result_name, contourdiff_id) as the snapshot key.
+        Secondary indexes (see i3db.INDEXES) are created alongside.
         """
+        if self.ring_storage:
+            create_ring_table(cursor, "contourdiffs")
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS contourdiffs (
@@ -594,43 +1161,208 @@ class i3model:
             )
             """
         )
+        ensure_indexes(cursor, "contourdiffs")
 
     def _contourdiffs_next_id(self, cursor, result_name):
         """Return the next contourdiff_id for result_name: the current max
-        for that group, plus one (1 if the group doesn't exist yet)."""
-        cursor.execute(
-            "SELECT MAX(contourdiff_id) FROM contourdiffs WHERE result_name=?",
-            (result_name,),
-        )
+        for that group in contourdiff_periods (which, unlike contourdiffs,
+        also lists delta snapshots without rows), plus one (1 if the group
+        doesn't exist yet)."""
+        cursor.execute(CONTOURDIFF_NEXT_ID_SQL, (result_name,))
         row = cursor.fetchone()
         current_max = row[0] if row and row[0] is not None else 0
         return current_max + 1
 
-    def _contourdiffs_save_snapshot(self, cursor, contourdiff_id, period, shovel_name, result_name, actors):
-        """Write one period's resulting Contour A geometry to the
-        contourdiffs table as a snapshot tagged with contourdiff_id (unique
-        within result_name)."""
-        self._contourdiffs_ensure_table(cursor)
+    def _contourdiffs_save_snapshot(self, writer, contourdiff_id, period, shovel_name, result_name,
+                                    contours, previous=None):
+        """Write one period's resulting Contour A geometry (a ContourSet)
+        to the contourdiffs table as a snapshot tagged with contourdiff_id
+        (unique within result_name). writer is the i3db.BulkWriter of the
+        run.
+
+        With previous (Contour A before this period) the snapshot is a
+        delta: only the rings added or changed since previous are written.
+        Rings removed are not recorded here — the checkpoint of every
+        snapshot lists the surface_ids it holds (see
+        _contourdiffs_read_snapshot).
+
+        Returns the number of vertices written (whatever the table layout).
+        """
+        self._contourdiffs_ensure_table(writer.cursor)
 
         shovel_value = shovel_name if shovel_name else "All"
-        rows_written = 0
 
-        for actor in actors:
-            pts = i3model.actor_pts(actor)
-            for pt_idx, (x, y, z) in enumerate(pts, start=1):
-                cursor.execute(
-                    """
-                    INSERT INTO contourdiffs
-                        (result_name, contourdiff_id, period, shovel, surface_id, point_id, X, Y, Z)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (result_name, contourdiff_id, period, shovel_value, actor.surface_id, pt_idx, x, y, z),
-                )
-                rows_written += 1
+        indices = range(len(contours)) if previous is None else contours.changed_since(previous)
+        rings = [contours.ring(i) for i in indices]
 
-        return rows_written
+        if is_ring_table(writer.cursor, "contourdiffs"):
+            writer.insert(
+                insert_rings_sql("contourdiffs"),
+                (
+                    (result_name, contourdiff_id, period, shovel_value, surface_id, *pack_ring(coords))
+                    for surface_id, _, coords in rings
+                ),
+            )
+            return sum(len(coords) for _, _, coords in rings)
 
-    def run_contour_diff(self, shovel_name, result_name=None):
+        return writer.insert(
+            """
+            INSERT INTO contourdiffs
+                (result_name, contourdiff_id, period, shovel, surface_id, point_id, X, Y, Z)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (result_name, contourdiff_id, period, shovel_value, surface_id, pt_idx, x, y, z)
+                for surface_id, _, coords in rings
+                for pt_idx, (x, y, z) in enumerate(coords.tolist(), start=1)
+            ),
+        )
+
+    # -------------------------------------------------------------------------
+    # Contour Diff — Checkpoints (contourdiff_periods)
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _contourdiff_periods_ensure_table(cursor):
+        """Create the contourdiff_periods table if it doesn't exist yet: one
+        checkpoint row per contourdiffs snapshot (see
+        i3enums.ContourDiffCheckpoint)."""
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS contourdiff_periods (
+                result_name TEXT NOT NULL,
+                contourdiff_id INTEGER NOT NULL,
+                period TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                keyframe INTEGER NOT NULL,
+                surface_ids BLOB NOT NULL,
+                z BLOB NOT NULL,
+                PRIMARY KEY (result_name, contourdiff_id)
+            )
+            """
+        )
+
+    @staticmethod
+    def _contourdiff_fingerprint(previous, label, contours):
+        """Chain one more input into a run's fingerprint: the hex SHA-1 of
+        the previous fingerprint, label (the shovel filter, then each
+        period) and the ContourSet read for it.
+
+        A period's fingerprint therefore covers Contour A's starting
+        geometry, the shovel filter and the cuts of that period and of
+        every period before it — everything its snapshot depends on.
+        """
+        digest = hashlib.sha1()
+        for part in (previous, label, contours.digest()):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _contourdiff_inputs(self, cursor, periods, shovel_name, fingerprint):
+        """Yield (period, contours_b, fingerprint) for each period in turn,
+        reading its cuts as the ContourSet Contour B and chaining
+        fingerprint (see _contourdiff_fingerprint)."""
+        for period in periods:
+            contour_b_groups = self._cuts_read_period(period, shovel_name, cursor=cursor)
+            contours_b = ContourSet.from_groups(contour_b_groups)
+            fingerprint = self._contourdiff_fingerprint(fingerprint, period, contours_b)
+            yield period, contours_b, fingerprint
+
+    @staticmethod
+    def _contourdiff_checkpoints(cursor, result_name):
+        """Return the ContourDiffCheckpoints of result_name, ordered by
+        contourdiff_id."""
+        cursor.execute(
+            """
+            SELECT contourdiff_id, period, fingerprint, rows, keyframe, surface_ids, z
+            FROM contourdiff_periods
+            WHERE result_name=?
+            ORDER BY contourdiff_id
+            """,
+            (result_name,),
+        )
+        return [ContourDiffCheckpoint(*row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _contourdiff_checkpoint_write(cursor, result_name, contourdiff_id, period,
+                                      fingerprint, rows, keyframe, contours):
+        """Record the checkpoint of the snapshot just written for period."""
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO contourdiff_periods
+                (result_name, contourdiff_id, period, fingerprint, rows, keyframe, surface_ids, z)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                result_name, contourdiff_id, period, fingerprint, rows, keyframe,
+                np.asarray(contours.surface_ids, dtype="<i8").tobytes(),
+                np.asarray(contours.z, dtype="<f8").tobytes(),
+            ),
+        )
+
+    @staticmethod
+    def _contourdiffs_read_snapshot(cursor, result_name, contourdiff_id):
+        """Return the geometry of one contourdiffs snapshot as a dict of
+        surface_id -> list of (x, y, z) vertices, ordered by surface_id.
+
+        A delta snapshot is rebuilt from its keyframe: the rows of every
+        snapshot from the keyframe up to this one are read in order, the
+        latest rows of each surface_id win, and only the surface_ids the
+        snapshot's checkpoint lists are kept. A snapshot without a
+        checkpoint (written before checkpoints existed) is a keyframe.
+        """
+        keyframe, members = contourdiff_id, None
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='contourdiff_periods'"
+        )
+        if cursor.fetchone() is not None:
+            cursor.execute(CONTOURDIFF_CHECKPOINT_SQL, (result_name, contourdiff_id))
+            row = cursor.fetchone()
+            if row is not None:
+                keyframe = row[0]
+                members = np.frombuffer(row[1], dtype="<i8").tolist()
+
+        rings = is_ring_table(cursor, "contourdiffs")
+        cursor.execute(
+            CONTOURDIFF_RINGS_SNAPSHOT_SQL if rings else CONTOURDIFF_SNAPSHOT_SQL,
+            (result_name, keyframe, contourdiff_id),
+        )
+        groups = {}
+        if rings:
+            for _, surface_id, coords in cursor.fetchall():
+                groups[surface_id] = unpack_ring(coords)
+        else:
+            for (_, surface_id), rows in groupby(cursor.fetchall(), key=lambda row: row[:2]):
+                groups[surface_id] = [row[2:] for row in rows]
+
+        if members is not None:
+            members = set(members)
+            groups = {sid: vertices for sid, vertices in groups.items() if sid in members}
+        return dict(sorted(groups.items()))
+
+    @staticmethod
+    def _contourdiff_load_state(cursor, result_name, checkpoint):
+        """Rebuild the Contour A ContourSet a run had after the period of
+        checkpoint, from that period's contourdiffs snapshot.
+
+        The snapshot holds the vertices; the checkpoint restores the ring
+        order and the Z keys rings are paired on (a ring's Z key is the Z
+        it was read with, which the float32-rounded vertices may not
+        reproduce). Returns None if the snapshot no longer matches the
+        checkpoint.
+        """
+        groups = i3model._contourdiffs_read_snapshot(cursor, result_name, checkpoint.contourdiff_id)
+        surface_ids = np.frombuffer(checkpoint.surface_ids, dtype="<i8").tolist()
+        zs = np.frombuffer(checkpoint.z, dtype="<f8").tolist()
+        if len(groups) != len(surface_ids):
+            return None
+        return ContourSet.from_rings(
+            (surface_id, z, groups[surface_id]) for surface_id, z in zip(surface_ids, zs)
+        )
+
+    def run_contour_diff(self, shovel_name, result_name=None, workers=None, resume=True,
+                         progress=None, cancel=None):
         """Run the cumulative, period-by-period contour difference.
 
         Periods are taken from the cuts table in chronological order.  For
@@ -642,60 +1374,264 @@ class i3model:
 
         After each period is processed, the resulting Contour A geometry is
         written to the contourdiffs table as a snapshot tagged with that
-        period's metadata.
+        period's metadata, and a checkpoint holding the fingerprint of its
+        inputs is written to contourdiff_periods. Every
+        contourdiff_keyframe_interval-th snapshot is a keyframe holding all
+        of Contour A; the others only hold the rings that period changed
+        (see _contourdiffs_read_snapshot for how they are read back).
+
+        Runs are resumable: the periods whose fingerprint still matches
+        the stored checkpoint, from the first one on, keep their snapshots.
+        Contour A is restored from the last of those, and only the periods
+        after it are recomputed and rewritten. Adding a period at the end
+        therefore only computes that period. Changing the surfaces or the
+        shovel filter invalidates every period.
 
         Args:
             shovel_name: shovel to filter by, or "All"/falsy for no filter.
             result_name: label stored alongside each contourdiffs snapshot
                          (typically the folder name shown in lineEdit_result).
-
-        Returns a ContourDiffResult(contours, periods, rows, result_name)
-        summarizing the run. The same object is cached on the model so a
-        subsequent call to write_results() can persist a session row for it.
+            workers: processes to clip Z levels on (default: CPU count;
+                     1 clips in-process). Snapshots are identical whatever
+                     the value.
+            resume: reuse matching snapshots of a previous run (default);
+                    False recomputes every period.
+            progress: optional callable(done, total, period), called after
+                      each period, reused or computed.
+            cancel: optional callable returning True to stop the run. It is
+                    checked before each period; the whole run is rolled
+                    back (the previous run's snapshots and checkpoints are
+                    left as they were) and OperationCancelled is raised.
+
+        Returns a ContourDiffResult(contours, periods, rows, result_name,
+        reused) summarizing the run. rows counts every snapshot row of
+        result_name, reused or not. The same object is cached on the model
+        so a subsequent call to write_results() can persist a session row
+        for it.
         """
-        color = self.contourColor or [1.0, 1.0, 0.0]
-        contour_a_groups = self.surfaces if self.surfaces else self.surfaces_read_table()
-        actors_a = self._build_actors_from_groups(contour_a_groups, color)
+        result = self._run_contour_diffs(
+            [(shovel_name, result_name)], workers, resume, progress, cancel)[0]
+        self._last_contourdiff_result = result
+        self.current_contourdiff_result = result_name
+        return result
 
-        conn = self._connect()
-        cursor = conn.cursor()
-        try:
-            self._contourdiffs_ensure_table(cursor)
-            cursor.execute(
-                "DELETE FROM contourdiffs WHERE result_name=?", (result_name,)
-            )
+    def run_contour_diff_batch(self, shovel_names=None, result_name=None, workers=None, resume=True,
+                               progress=None, cancel=None):
+        """Run the contour difference for several shovel filters in one pass.
 
-            periods = self._cuts_get_periods(cursor=cursor)
+        Same results as calling run_contour_diff once per shovel, but the
+        surfaces are read once, each period's cuts are read with a single
+        query for every shovel (see _cuts_read_period_shovels) and each
+        distinct Contour B is built and indexed once.
 
-            total_rows = 0
-            total_contours = 0
+        Args:
+            shovel_names: shovel filters to run ("All" included as such);
+                          default: "All" followed by every shovel of the
+                          scanned folder (get_shovel_names), or of the cuts
+                          table if no folder was scanned.
+            result_name: prefix of the result names: shovel S is stored as
+                         "<result_name>_<S>" (just "<S>" without a prefix).
+            workers, resume, progress, cancel: as for run_contour_diff.
+
+        Returns a list of ContourDiffResult, one per shovel in order. They
+        are kept on the model for write_batch_results().
+        """
+        if shovel_names is None:
+            if self.contourdiff_folder_path:
+                shovels = self.get_shovel_names(self.scan_folder(self.contourdiff_folder_path))
+            else:
+                shovels = self._cuts_get_shovels()
+            shovel_names = ["All"] + shovels
 
-            for period in periods:
-                contour_b_groups = self._cuts_read_period(period, shovel_name, cursor=cursor)
-                actors_b = self._build_actors_from_groups(contour_b_groups, color)
+        jobs = [
+            (shovel, f"{result_name}_{shovel}" if result_name else shovel)
+            for shovel in shovel_names
+        ]
+        results = self._run_contour_diffs(jobs, workers, resume, progress, cancel)
+        self._last_contourdiff_batch = results
+        if results:
+            self.current_contourdiff_result = results[-1].result_name
+        return results
+
+    def _cuts_get_shovels(self):
+        """Return the distinct shovel names of the cuts table, sorted."""
+        if not self.table_exists("cuts"):
+            return []
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT shovel FROM cuts ORDER BY shovel")
+            return [row[0] for row in cursor.fetchall()]
 
-                actors_a = self._contour_diff_one_period(actors_a, actors_b, color)
+    def _run_contour_diffs(self, jobs, workers=None, resume=True, progress=None, cancel=None):
+        """Run the contour difference for every (shovel_name, result_name)
+        of jobs in a single pass over the periods (see run_contour_diff).
 
-                next_contourdiff_id = self._contourdiffs_next_id(cursor, result_name)
-                rows_written = self._contourdiffs_save_snapshot(
-                    cursor, next_contourdiff_id, period, shovel_name, result_name, actors_a
-                )
-                total_rows += rows_written
-                total_contours = len(actors_a)
+        Contour A's starting geometry is read once; each period's cuts are
+        read once for all jobs and each distinct Contour B is built once.
+        Every job then resumes, clips and writes its own snapshots and
+        checkpoints, exactly as a run of its own would.
 
-            conn.commit()
+        Returns a list of ContourDiffResult, in the order of jobs.
+        """
+        contour_a_groups = self.surfaces if self.surfaces else self.surfaces_read_table()
+        contours_a = ContourSet.from_groups(contour_a_groups)
+
+        # Z levels are independent, so there is no use for more workers
+        # than Contour A has levels.
+        workers = min(workers or os.cpu_count() or 1, len(contours_a.by_z()))
+        executor = None
+        if workers > 1:
+            # spawn, not fork: the parent is a Qt application with live threads.
+            executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=redirect_worker_stdout, initargs=(self.worker_stdout,))
+
+        pairing = Counter()
+        try:
+            with self._connect() as conn:
+                with bulk_transaction(conn, "contourdiffs") as writer:
+                    cursor = writer.cursor
+                    self._contourdiffs_ensure_table(cursor)
+                    self._contourdiff_periods_ensure_table(cursor)
+
+                    periods = self._cuts_get_periods(cursor=cursor)
+                    runs = [
+                        _ContourDiffJob(
+                            shovel_name, result_name, contours_a,
+                            self._contourdiff_fingerprint(
+                                "", shovel_name if shovel_name else "All", contours_a),
+                            self._contourdiff_checkpoints(cursor, result_name) if resume else [],
+                        )
+                        for shovel_name, result_name in jobs
+                    ]
+
+                    for index, period in enumerate(periods):
+                        _check_cancelled(cancel)
+                        groups = self._cuts_read_period_shovels(
+                            cursor, period, [job.shovel_name for job in runs])
+                        built = {}
+                        for job in runs:
+                            # Jobs whose filters read the same cuts share one ContourSet.
+                            key = id(groups[job.shovel_name])
+                            if key not in built:
+                                built[key] = ContourSet.from_groups(groups[job.shovel_name])
+                            contours_b = built[key]
+                            job.fingerprint = self._contourdiff_fingerprint(
+                                job.fingerprint, period, contours_b)
+
+                            if job.resuming:
+                                checkpoint = job.checkpoints[job.reused] \
+                                    if job.reused < len(job.checkpoints) else None
+                                if checkpoint and checkpoint[:3] == (job.reused + 1, period,
+                                                                     job.fingerprint):
+                                    job.reused += 1
+                                    continue
+                                self._contourdiff_resume(
+                                    writer, job, periods[:index], pairing, executor, cancel)
+
+                            self._contourdiff_compute_period(
+                                writer, job, period, contours_b, job.fingerprint, pairing,
+                                executor, cancel)
+                        if progress is not None:
+                            progress(index + 1, len(periods), period)
+
+                    for job in runs:
+                        if job.resuming:
+                            self._contourdiff_resume(
+                                writer, job, periods, pairing, executor, cancel)
+                self.last_write_stats = writer.stats
         finally:
-            conn.close()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            self._schema_invalidate()
+        self.last_pairing_stats = i3model.contour_difference_pairing_stats(pairing)
+
+        return [
+            ContourDiffResult(
+                contours=job.contours,
+                periods=len(periods),
+                rows=job.rows,
+                result_name=job.result_name,
+                reused=job.reused,
+            )
+            for job in runs
+        ]
+
+    def _contourdiff_resume(self, writer, job, done_periods, pairing, executor, cancel=None):
+        """End the resume phase of job, before its first changed period (or
+        after the last period if none changed).
+
+        Restores Contour A from the last reused snapshot and deletes the
+        job's snapshots after it. If that snapshot no longer matches its
+        checkpoint, the job starts over: every period in done_periods is
+        read again and recomputed.
+        """
+        cursor = writer.cursor
+        job.resuming = False
+        if job.reused:
+            last = job.checkpoints[job.reused - 1]
+            state = self._contourdiff_load_state(cursor, job.result_name, last)
+            if state is None:
+                job.reused = 0      # snapshot and checkpoint disagree: start over
+            else:
+                job.contours_a = state
+                job.contours = len(state)
+                job.rows = sum(checkpoint.rows for checkpoint in job.checkpoints[:job.reused])
+                print(f"contourdiffs: {job.result_name}: reusing {job.reused} periods "
+                      f"(up to {last.period})")
 
-        result = ContourDiffResult(
-            contours=total_contours,
-            periods=len(periods),
-            rows=total_rows,
-            result_name=result_name,
+        for table in ("contourdiffs", "contourdiff_periods"):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE result_name=? AND contourdiff_id>?",
+                (job.result_name, job.reused),
+            )
+
+        if not job.reused:
+            for period, contours_b, fingerprint in self._contourdiff_inputs(
+                    cursor, done_periods, job.shovel_name, job.base_fingerprint):
+                self._contourdiff_compute_period(
+                    writer, job, period, contours_b, fingerprint, pairing, executor, cancel)
+
+    def _contourdiff_compute_period(self, writer, job, period, contours_b, fingerprint,
+                                    pairing, executor, cancel=None):
+        """Clip job's Contour A against contours_b for period, then write
+        its snapshot (a keyframe every contourdiff_keyframe_interval
+        snapshots, a delta otherwise) and checkpoint."""
+        _check_cancelled(cancel)
+        cursor = writer.cursor
+        previous = job.contours_a
+        job.contours_a = self._contour_diff_one_period(previous, contours_b, pairing, executor)
+
+        contourdiff_id = self._contourdiffs_next_id(cursor, job.result_name)
+        keyframe = self._contourdiff_next_keyframe(cursor, job.result_name, contourdiff_id)
+        rows_written = self._contourdiffs_save_snapshot(
+            writer, contourdiff_id, period, job.shovel_name, job.result_name, job.contours_a,
+            previous if keyframe != contourdiff_id else None,
         )
-        self._last_contourdiff_result = result
-        self.current_contourdiff_result = result_name
-        return result
+        self._contourdiff_checkpoint_write(
+            cursor, job.result_name, contourdiff_id, period,
+            fingerprint, rows_written, keyframe, job.contours_a)
+        job.rows += rows_written
+        job.contours = len(job.contours_a)
+
+    def _contourdiff_next_keyframe(self, cursor, result_name, contourdiff_id):
+        """Return the keyframe of snapshot contourdiff_id, about to be
+        written: the keyframe of the snapshot before it, unless that is
+        contourdiff_keyframe_interval or more snapshots back (or the
+        snapshot has no predecessor), in which case contourdiff_id starts a
+        new keyframe.
+
+        The stored keyframe is followed rather than derived from the id,
+        so a run resumed with another interval never names a delta
+        snapshot as its keyframe.
+        """
+        interval = max(1, self.contourdiff_keyframe_interval or 1)
+        if contourdiff_id > 1:
+            cursor.execute(CONTOURDIFF_CHECKPOINT_SQL, (result_name, contourdiff_id - 1))
+            row = cursor.fetchone()
+            if row is not None and contourdiff_id - row[0] < interval:
+                return row[0]
+        return contourdiff_id
 
     def write_results(self):
         """Write the most recent run_contour_diff() result to the sessions
@@ -714,8 +1650,50 @@ class i3model:
         )
         date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
 
-        conn = self._connect()
-        cursor = conn.cursor()
+        with self._connect() as conn:
+            session_id = self._sessions_insert(
+                conn.cursor(), date_str, folder_name, result)
+        self._schema_invalidate()
+
+        return SessionResult(
+            id=session_id,
+            date=date_str,
+            folder=folder_name,
+            rows=result.rows,
+            contours=result.contours,
+            status="Complete",
+        )
+
+    def write_batch_results(self):
+        """Write one sessions row per result of the most recent
+        run_contour_diff_batch() and return their SessionResults, in order.
+
+        Each row's folder is the result's result_name, which names its
+        shovel. Raises RuntimeError if no batch has been run.
+        """
+        if self._last_contourdiff_batch is None:
+            raise RuntimeError("write_batch_results() called before run_contour_diff_batch()")
+
+        date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+        sessions = []
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            for result in self._last_contourdiff_batch:
+                session_id = self._sessions_insert(cursor, date_str, result.result_name, result)
+                sessions.append(SessionResult(
+                    id=session_id,
+                    date=date_str,
+                    folder=result.result_name,
+                    rows=result.rows,
+                    contours=result.contours,
+                    status="Complete",
+                ))
+        self._schema_invalidate()
+        return sessions
+
+    @staticmethod
+    def _sessions_insert(cursor, date_str, folder_name, result):
+        """Insert one sessions row and return its session_id."""
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS sessions (
@@ -735,29 +1713,7 @@ class i3model:
             """,
             (date_str, folder_name, result.rows, result.contours, "Complete"),
         )
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-
-        return SessionResult(
-            id=session_id,
-            date=date_str,
-            folder=folder_name,
-            rows=result.rows,
-            contours=result.contours,
-            status="Complete",
-        )
-
-    @staticmethod
-    def _compute_gradient(current, previous):
-        """Return gradient (%) between two (x, y, z) points, or 0.0 for the first point."""
-        if previous is None:
-            return 0.0
-        prev_x, prev_y, prev_z = previous[:3]
-        x, y, z = current[:3]
-        delta_z = z - prev_z
-        distance = math.sqrt((x - prev_x) ** 2 + (y - prev_y) ** 2)
-        return (delta_z / distance) * 100 if distance != 0 else 0.0
+        return cursor.lastrowid
 
     # -------------------------------------------------------------------------
     # Polylines — Read
@@ -765,49 +1721,21 @@ class i3model:
 
     def polylines_read_xyz_file(self):
         """Read an XYZ file and return polylines with computed gradient values."""
-        polylines = {self.polyline_id: []}
-
-        with open(self.file_path, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line == "$":
-                    self.polyline_id += 1
-                    polylines[self.polyline_id] = []
-                else:
-                    parts = line.split()
-                    if len(parts) == 3:
-                        x, y, z = (round(float(v), 3) for v in parts)
-                        prev = polylines[self.polyline_id][-1] if polylines[self.polyline_id] else None
-                        gradient = round(self._compute_gradient((x, y, z), prev), 3)
-                        polylines[self.polyline_id].append((x, y, z, gradient, None, None))
-
-        return {k: v for k, v in polylines.items() if v}
+        blocks = cached_xyz_blocks(self.file_path)
+        polylines = blocks_to_polylines(blocks, self.polyline_id)
+        self.polyline_id += blocks.n_separators
+        return polylines
 
     def polylines_read_csv_file(self):
         """Read a CSV file and return polylines with computed gradient values."""
-        polylines = {self.polyline_id: []}
-
-        with open(self.file_path, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line == "$":
-                    self.polyline_id += 1
-                    polylines[self.polyline_id] = []
-                else:
-                    parts = line.split(",")
-                    if len(parts) == 4:
-                        name, *xyz = parts
-                        x, y, z = (round(float(v), 3) for v in xyz)
-                        prev = polylines[self.polyline_id][-1] if polylines[self.polyline_id] else None
-                        gradient = round(self._compute_gradient((x, y, z), prev), 3)
-                        polylines[self.polyline_id].append((x, y, z, gradient, name, None))
-
-        return {k: v for k, v in polylines.items() if v}
+        blocks = cached_csv_blocks(self.file_path)
+        polylines = blocks_to_polylines(blocks, self.polyline_id)
+        self.polyline_id += blocks.n_separators
+        return polylines
 
     def polylines_read_table(self):
         """Fetch polylines grouped by polyline_id from the SQLite database."""
-        conn = self._connect()
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         cursor.execute(
             """
             SELECT polyline_id, X, Y, Z, gradient, route, tonne,
@@ -822,7 +1750,6 @@ class i3model:
             """
         )
         data = cursor.fetchall()
-        conn.close()
 
         polylines = {}
         for polyline_id, x, y, z, g, *rest in data:
@@ -833,6 +1760,7 @@ class i3model:
         polylines = self.polylines_read_table()
         if polylines:
             self.polylines.update(polylines)
+        self._routes_tonnes_cache = None
 
     # -------------------------------------------------------------------------
     # Polylines — Actors
@@ -855,7 +1783,15 @@ class i3model:
         return self.polylines_create_actors()
 
     def polylines_create_actors(self):
-        """Create and return a VTK actor for every polyline in self.polylines."""
+        """Create and return the VTK actors for every polyline in self.polylines.
+
+        With Params.PolylinesMerged, all polylines go into one PolylineLayer
+        (self.polyline_layer) and its actors are returned: normally a single
+        actor. Otherwise each polyline gets its own actor.
+        """
+        if Params.PolylinesMerged.value:
+            return self.polylines_create_merged_actors()
+
         self.actors = []
         for polyline_id, vertices in self.polylines.items():
             actor = self.polylines_create_actor(polyline_id, vertices)
@@ -863,14 +1799,25 @@ class i3model:
                 self.actors.append(actor)
         return self.actors
 
+    def polylines_create_merged_actors(self):
+        """Build self.polyline_layer from self.polylines, each polyline with
+        a random colour, and return its actors."""
+        colors = {
+            polyline_id: [random.randint(0, 255) / 255.0 for _ in range(3)]
+            for polyline_id in self.polylines
+        }
+        self.polyline_layer = PolylineLayer(self.polylines, colors)
+        self.actors = list(self.polyline_layer.actors)
+        return self.actors
+
     def polylines_create_actor(self, polyline_id, vertices):
         """Create a VTK actor for a single polyline."""
         if not vertices:
             return None
 
-        points = vtk.vtkPoints()
-        cells = vtk.vtkCellArray()
-        polyline = vtk.vtkPolyLine()
+        points = vtkPoints()
+        cells = vtkCellArray()
+        polyline = vtkPolyLine()
         polyline.GetPointIds().SetNumberOfIds(len(vertices))
 
         color = [random.randint(0, 255) / 255.0 for _ in range(3)]
@@ -884,14 +1831,14 @@ class i3model:
 
     def polylines_build_actor(self, points, cells, color, polyline_id):
         """Construct and return a VTK actor for a polyline."""
-        poly_data = vtk.vtkPolyData()
+        poly_data = vtkPolyData()
         poly_data.SetPoints(points)
         poly_data.SetLines(cells)
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(poly_data)
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetRepresentationToWireframe()
         actor.GetProperty().SetColor(color)
@@ -906,8 +1853,16 @@ class i3model:
 
     def polylines_save_database(self, db_path):
         """Save polyline data to the SQLite database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with self._save_connection(db_path) as conn, \
+                bulk_transaction(conn, "polylines") as writer:
+            self._polylines_write(writer)
+        self.last_write_stats = writer.stats
+        self._schema_invalidate(db_path)
+
+    def _polylines_write(self, writer):
+        """Recreate the polylines table rows through an i3db.BulkWriter."""
+        cursor = writer.cursor
+        self._routes_tonnes_cache = None
 
         cursor.execute(
             """
@@ -933,16 +1888,15 @@ class i3model:
         )
         cursor.execute("DELETE FROM polylines")
 
-        for polyline_id, points in self.polylines.items():
-            for pt_idx, (x, y, z, g, r, *_) in enumerate(points, start=1):
-                cursor.execute(
-                    "INSERT INTO polylines (polyline_id, point_id, X, Y, Z, gradient, route) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (polyline_id, pt_idx, x, y, z, g, r),
-                )
-
-        conn.commit()
-        conn.close()
+        writer.insert(
+            "INSERT INTO polylines (polyline_id, point_id, X, Y, Z, gradient, route) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (polyline_id, pt_idx, x, y, z, g, r)
+                for polyline_id, points in self.polylines.items()
+                for pt_idx, (x, y, z, g, r, *_) in enumerate(points, start=1)
+            ),
+        )
 
     # -------------------------------------------------------------------------
     # Points — Read
@@ -969,13 +1923,11 @@ class i3model:
 
     def points_read_table(self):
         """Fetch points from the SQLite database."""
-        conn = self._connect()
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         cursor.execute(
             "SELECT point_id, X, Y, Z, name FROM points ORDER BY point_id"
         )
         data = cursor.fetchall()
-        conn.close()
 
         points = {}
         for point_id, x, y, z, name in data:
@@ -1002,7 +1954,15 @@ class i3model:
         return self.points_create_actors()
 
     def points_create_actors(self):
-        """Create and return a VTK actor for every point in self.points."""
+        """Create and return the VTK actors for every point in self.points.
+
+        With Params.PointsMerged, all points go into one PointLayer
+        (self.point_layer) drawn by a single actor, which is returned.
+        Otherwise each point gets its own actor.
+        """
+        if Params.PointsMerged.value:
+            return self.points_create_merged_actors()
+
         self.actors = []
         for point_id, vertices in self.points.items():
             actor = self.point_create_actor(point_id, vertices)
@@ -1010,13 +1970,25 @@ class i3model:
                 self.actors.append(actor)
         return self.actors
 
+    def points_create_merged_actors(self):
+        """Build self.point_layer from self.points, each point with a random
+        colour, and return its actors. Points are sphere glyphs on Windows,
+        as in points_build_actor_win."""
+        colors = {
+            point_id: [random.randint(0, 255) / 255.0 for _ in range(3)]
+            for point_id in self.points
+        }
+        self.point_layer = PointLayer(self.points, colors, sys.platform.startswith("win"))
+        self.actors = list(self.point_layer.actors)
+        return self.actors
+
     def point_create_actor(self, point_id, vertices):
         """Create a VTK actor for a single point."""
         if not vertices:
             return None
 
-        points = vtk.vtkPoints()
-        vertices_cell = vtk.vtkCellArray()
+        points = vtkPoints()
+        vertices_cell = vtkCellArray()
         color = [random.randint(0, 255) / 255.0 for _ in range(3)]
 
         x, y, z, _ = vertices[0]
@@ -1030,24 +2002,24 @@ class i3model:
 
     def points_build_actor_win(self, points, vertices_cell, color, point_id):
         """Build a sphere-glyphed point actor for Windows."""
-        poly_data = vtk.vtkPolyData()
+        poly_data = vtkPolyData()
         poly_data.SetPoints(points)
         poly_data.SetVerts(vertices_cell)
 
-        sphere = vtk.vtkSphereSource()
+        sphere = vtkSphereSource()
         sphere.SetRadius(Params.PointWinRadius.value)
         sphere.SetThetaResolution(Params.PointWinTheta.value)
         sphere.SetPhiResolution(Params.PointWinPhi.value)
 
-        glyph = vtk.vtkGlyph3D()
+        glyph = vtkGlyph3D()
         glyph.SetInputData(poly_data)
         glyph.SetSourceConnection(sphere.GetOutputPort())
         glyph.SetScaleModeToDataScalingOff()
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputConnection(glyph.GetOutputPort())
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetColor(color)
         actor.GetProperty().SetPointSize(Params.PointWinSize.value)
@@ -1058,14 +2030,14 @@ class i3model:
 
     def points_build_actor(self, points, vertices_cell, color, point_id):
         """Build a standard point actor."""
-        poly_data = vtk.vtkPolyData()
+        poly_data = vtkPolyData()
         poly_data.SetPoints(points)
         poly_data.SetVerts(vertices_cell)
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(poly_data)
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetRepresentationToPoints()
         actor.GetProperty().SetColor(color)
@@ -1089,8 +2061,15 @@ class i3model:
 
     def points_save_database(self, db_path):
         """Save point data to the SQLite database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        with self._save_connection(db_path) as conn, \
+                bulk_transaction(conn, "points") as writer:
+            self._points_write(writer)
+        self.last_write_stats = writer.stats
+        self._schema_invalidate(db_path)
+
+    def _points_write(self, writer):
+        """Recreate the points table rows through an i3db.BulkWriter."""
+        cursor = writer.cursor
 
         cursor.execute(
             """
@@ -1105,15 +2084,14 @@ class i3model:
         )
         cursor.execute("DELETE FROM points")
 
-        for point_id, vertices in self.points.items():
-            for x, y, z, name in vertices:
-                cursor.execute(
-                    "INSERT INTO points (point_id, X, Y, Z, Name) VALUES (?, ?, ?, ?, ?)",
-                    (point_id, x, y, z, name),
-                )
-
-        conn.commit()
-        conn.close()
+        writer.insert(
+            "INSERT INTO points (point_id, X, Y, Z, Name) VALUES (?, ?, ?, ?, ?)",
+            (
+                (point_id, x, y, z, name)
+                for point_id, vertices in self.points.items()
+                for x, y, z, name in vertices
+            ),
+        )
 
     # -------------------------------------------------------------------------
     # Surfaces — Read
@@ -1121,31 +2099,22 @@ class i3model:
 
     def surfaces_read_xyzs_file(self):
         """Read an XYZS file and return surfaces."""
-        surfaces = {self.surface_id: []}
-
-        with open(self.file_path, "r") as file:
-            for line in file:
-                line = line.strip()
-                if line == "$":
-                    self.surface_id += 1
-                    surfaces[self.surface_id] = []
-                else:
-                    parts = line.split()
-                    if len(parts) == 3:
-                        x, y, z = (round(float(v), 3) for v in parts)
-                        surfaces[self.surface_id].append((x, y, z))
-
-        return {k: v for k, v in surfaces.items() if v}
+        blocks = cached_xyz_blocks(self.file_path)
+        surfaces = blocks_to_surfaces(blocks, self.surface_id)
+        self.surface_id += blocks.n_separators
+        return surfaces
 
     def surfaces_read_table(self):
         """Fetch surfaces grouped by surface_id from the SQLite database."""
-        conn = self._connect()
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
+        if is_ring_table(cursor, "surfaces"):
+            cursor.execute("SELECT surface_id, coords FROM surfaces ORDER BY surface_id")
+            return {surface_id: unpack_ring(coords) for surface_id, coords in cursor.fetchall()}
+
         cursor.execute(
             "SELECT surface_id, X, Y, Z FROM surfaces ORDER BY surface_id, point_id"
         )
         data = cursor.fetchall()
-        conn.close()
 
         surfaces = {}
         for surface_id, x, y, z in data:
@@ -1190,9 +2159,9 @@ class i3model:
         if not vertices:
             return None
 
-        points = vtk.vtkPoints()
-        cells = vtk.vtkCellArray()
-        polyline = vtk.vtkPolyLine()
+        points = vtkPoints()
+        cells = vtkCellArray()
+        polyline = vtkPolyLine()
         polyline.GetPointIds().SetNumberOfIds(len(vertices))
 
         z = vertices[0][2]      # all points share the same Z in 2.5D data
@@ -1205,14 +2174,14 @@ class i3model:
 
     def surfaces_build_actor(self, points, cells, color, surface_id, z):
         """Construct and return a VTK actor for a surface contour."""
-        poly_data = vtk.vtkPolyData()
+        poly_data = vtkPolyData()
         poly_data.SetPoints(points)
         poly_data.SetLines(cells)
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(poly_data)
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetRepresentationToSurface()
         actor.GetProperty().EdgeVisibilityOff()
@@ -1229,9 +2198,18 @@ class i3model:
 
     def surfaces_save_database(self, db_path):
         """Save surface data to the SQLite database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
+        with self._save_connection(db_path) as conn, \
+                bulk_transaction(conn, "surfaces") as writer:
+            self._surfaces_write(writer)
+        self.last_write_stats = writer.stats
+        self._schema_invalidate(db_path)
+
+    def _surfaces_write(self, writer):
+        """Recreate the surfaces table rows through an i3db.BulkWriter."""
+        cursor = writer.cursor
+
+        if self.ring_storage:
+            create_ring_table(cursor, "surfaces")
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS surfaces (
@@ -1246,15 +2224,25 @@ class i3model:
         )
         cursor.execute("DELETE FROM surfaces")
 
-        for surface_id, points in self.surfaces.items():
-            for pt_idx, (x, y, z) in enumerate(points, start=1):
-                cursor.execute(
-                    "INSERT INTO surfaces (surface_id, point_id, X, Y, Z) VALUES (?, ?, ?, ?, ?)",
-                    (surface_id, pt_idx, x, y, z),
-                )
+        if is_ring_table(cursor, "surfaces"):
+            writer.insert(
+                insert_rings_sql("surfaces"),
+                (
+                    (surface_id, *pack_ring(points))
+                    for surface_id, points in self.surfaces.items()
+                    if points
+                ),
+            )
+            return
 
-        conn.commit()
-        conn.close()
+        writer.insert(
+            "INSERT INTO surfaces (surface_id, point_id, X, Y, Z) VALUES (?, ?, ?, ?, ?)",
+            (
+                (surface_id, pt_idx, x, y, z)
+                for surface_id, points in self.surfaces.items()
+                for pt_idx, (x, y, z) in enumerate(points, start=1)
+            ),
+        )
 
     # -------------------------------------------------------------------------
     # Surface Reconstruction
@@ -1262,12 +2250,12 @@ class i3model:
 
     def delaunay_reconstruction_actor(self, contour_polydata, delaunaycfg):
         """Create a Delaunay-triangulated surface mesh from contour polydata."""
-        cleaner = vtk.vtkCleanPolyData()
+        cleaner = vtkCleanPolyData()
         cleaner.SetInputData(contour_polydata)
         cleaner.SetTolerance(delaunaycfg.cleaner_tolerance)
         cleaner.Update()
 
-        delaunay = vtk.vtkDelaunay2D()
+        delaunay = vtkDelaunay2D()
         delaunay.SetInputData(cleaner.GetOutput())
         delaunay.SetAlpha(delaunaycfg.delaunay_alpha)
         delaunay.SetTolerance(delaunaycfg.delaunay_tolerance)
@@ -1276,7 +2264,7 @@ class i3model:
         delaunay.SetProjectionPlaneMode(delaunaycfg.projection_plane_mode)
         delaunay.Update()
 
-        normals = vtk.vtkPolyDataNormals()
+        normals = vtkPolyDataNormals()
         normals.SetInputData(delaunay.GetOutput())
         normals.SetFeatureAngle(delaunaycfg.feature_angle)
         normals.ComputePointNormalsOn()
@@ -1285,10 +2273,10 @@ class i3model:
         normals.SplittingOff()
         normals.Update()
 
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(normals.GetOutput())
 
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         return actor
 
@@ -1373,6 +2361,51 @@ class i3model:
             return t, u, ix, iy
         return None
 
+    @staticmethod
+    def _segment_intersections_2d(arc, b_closed):
+        """Find every intersection of open polyline arc with closed polygon
+        b_closed (last point == first point) in XY.
+
+        Segment pairs are found by a sort-and-sweep over their bounding
+        boxes (i3spatial.overlapping_boxes), so only pairs whose boxes
+        overlap are tested, in one batch, by i3geometry.segments_intersect_2d
+        (the vectorized _segment_intersect_2d). B's boxes are padded
+        by the slack that test allows along B (u in [-eps, 1 + eps]) plus
+        a small absolute margin, so no pair it would accept is skipped.
+
+        Returns a list of (arc_seg_idx, t, ix, iy, b_edge_idx, u) sorted
+        by (arc_seg_idx, t, b_edge_idx): the events testing every segment
+        of arc against every edge of B in order gives, sorted by
+        (arc_seg_idx, t).
+        """
+        pad = 1e-6
+        slack = 1e-9
+        a_xy = np.asarray([p[:2] for p in arc], dtype=np.float64).reshape(-1, 2)
+        b_xy = np.asarray([p[:2] for p in b_closed], dtype=np.float64).reshape(-1, 2)
+        if len(a_xy) < 2 or len(b_xy) < 2:
+            return []
+
+        a_lo = np.minimum(a_xy[:-1], a_xy[1:]) - pad
+        a_hi = np.maximum(a_xy[:-1], a_xy[1:]) + pad
+        b_reach = np.abs(b_xy[1:] - b_xy[:-1]) * slack + pad
+        b_lo = np.minimum(b_xy[:-1], b_xy[1:]) - b_reach
+        b_hi = np.maximum(b_xy[:-1], b_xy[1:]) + b_reach
+        pairs = overlapping_boxes(np.hstack([a_lo, a_hi]).tolist(),
+                                  np.hstack([b_lo, b_hi]).tolist())
+        if not pairs:
+            return []
+
+        # Candidate pairs are tested in one batch (segments_intersect_2d).
+        a_idx, b_idx = np.array(pairs, dtype=np.int64).T
+        hit, t, u, ix, iy = segments_intersect_2d(
+            a_xy[a_idx], a_xy[a_idx + 1], b_xy[b_idx], b_xy[b_idx + 1])
+
+        events = list(zip(*(
+            values[hit].tolist() for values in (a_idx, t, ix, iy, b_idx, u)
+        )))
+        events.sort(key=lambda e: (e[0], e[1], e[4]))
+        return events
+
     @staticmethod
     def _boundary_substitution(a_pts, b_pts, tol=0.4):
         """Boundary substitution algorithm — 2.5D.
@@ -1393,6 +2426,10 @@ class i3model:
             Step 3 — i3model._bsub_step3_build_arcs
             Step 4 — i3model._bsub_step4_rebuild_a
 
+        B's vertices and edges are indexed once (i3spatial.GridIndex and
+        SegmentGrid, cell size tol) and the indexes are shared by Steps 1
+        and 2, so vertex matching is near-linear instead of O(n_a * n_b).
+
         Args:
             a_pts: ordered list of (x, y, z) — open polyline (A)
             b_pts: ordered list of (x, y, z) — closed polygon (B), last
@@ -1410,11 +2447,15 @@ class i3model:
             or None if fewer than 2 intersection points exist (no substitution),
             or if Start/End cannot be located, or rebuild fails.
         """
-        intersections = i3model._bsub_step1_find_intersections(a_pts, b_pts, tol)
+        b_grid = GridIndex(b_pts, tol)
+        intersections = i3model._bsub_step1_find_intersections(
+            a_pts, b_pts, tol, b_grid=b_grid)
         if intersections is None:
             return None
 
-        start_end = i3model._bsub_step2_find_start_end(b_pts, intersections, tol)
+        b_edges = SegmentGrid(b_pts, tol, closed=True)
+        start_end = i3model._bsub_step2_find_start_end(
+            b_pts, intersections, tol, b_edges=b_edges)
         if start_end is None:
             return None
         start_pt, end_pt = start_end
@@ -1433,35 +2474,37 @@ class i3model:
         return rebuilt, inner_arc
 
     @staticmethod
-    def _bsub_step1_find_intersections(a_pts, b_pts, tol=0.4):
+    def _bsub_step1_find_intersections(a_pts, b_pts, tol=0.4, b_grid=None):
         """Step 1 — Compute all A-vertex × B-vertex coincidence points.
 
-        Compares each unique A vertex directly against every B vertex in 2D
-        (x, y); Z is taken from the matching A vertex. A hit is recorded
-        only when both vertices coincide within tol. No edge projection, no
-        t_b ambiguity. seen_a_vertices / seen_b_vertices guard against
+        Compares each unique A vertex against the B vertices in 2D (x, y);
+        Z is taken from the matching A vertex. A hit is recorded only when
+        both vertices coincide within tol. No edge projection, no t_b
+        ambiguity. seen_a_vertices / seen_b_vertices guard against
         recording duplicate hits when two distinct A (or B) vertices both
         land within tol of the same counterpart vertex.
 
+        B vertices are looked up through a GridIndex (only the 3x3 cells
+        around each A vertex are tested), which returns the same lowest
+        matching index as a scan of every B vertex.
+
         Args:
-            a_pts: ordered list of (x, y, z) — open polyline (A)
-            b_pts: ordered list of (x, y, z) — closed polygon (B)
-            tol:   vertex-matching tolerance
+            a_pts:  ordered list of (x, y, z) — open polyline (A)
+            b_pts:  ordered list of (x, y, z) — closed polygon (B)
+            tol:    vertex-matching tolerance
+            b_grid: GridIndex of b_pts with radius tol (built if None)
 
         Returns:
             list of (x, y, z, a_idx, t_a, b_idx, t_b) intersection tuples,
             or None if fewer than 2 are found (substitution not applicable).
         """
         n_a = len(a_pts)
-        n_b = len(b_pts)
+        if b_grid is None:
+            b_grid = GridIndex(b_pts, tol)
 
         def _find_b_vertex_for_vertex(px, py):
             """Return b_vertex_idx j if b_pts[j] coincides with (px, py) within tol, else None."""
-            for j in range(n_b):
-                bx, by = b_pts[j][0], b_pts[j][1]
-                if (bx - px) ** 2 + (by - py) ** 2 < tol * tol:
-                    return j
-            return None
+            return b_grid.first_within(px, py)
 
         raw_intersections = []   # (x, y, z, a_edge_idx, t_a, b_edge_idx, t_b)
 
@@ -1498,7 +2541,7 @@ class i3model:
         return intersections
 
     @staticmethod
-    def _bsub_step2_find_start_end(b_pts, intersections, tol=0.4):
+    def _bsub_step2_find_start_end(b_pts, intersections, tol=0.4, b_edges=None):
         """Step 2 — Find Start Point and End Point on actor_b.
 
         Walk b edges from index 0, recording whether any intersection point
@@ -1512,15 +2555,23 @@ class i3model:
             Start Point — on the edge just BEFORE the winning gap
             End Point   — on the edge just AFTER the winning gap
 
+        Which intersections lie on which B edge is worked out once, testing
+        each intersection only against the edges a SegmentGrid of B puts in
+        its cell.
+
         Args:
             b_pts:         ordered list of (x, y, z) — closed polygon (B)
             intersections: list of intersection tuples from Step 1
             tol:           vertex-matching tolerance
+            b_edges:       closed SegmentGrid of b_pts with radius tol
+                           (built if None)
 
         Returns:
             (start_pt, end_pt) each as (x, y, z), or None if not found.
         """
         n_b = len(b_pts)
+        if b_edges is None:
+            b_edges = SegmentGrid(b_pts, tol, closed=True)
 
         def _dist2(p, q):
             return (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2
@@ -1539,11 +2590,15 @@ class i3model:
             cy = p3[1] + t * dy
             return (cx - ix) ** 2 + (cy - iy) ** 2 < tol * tol
 
+        # For every b edge j, the intersections lying on it, in order.
+        edge_points = [[] for _ in range(n_b)]
+        for pt in intersections:
+            for j in b_edges.candidates(pt[0], pt[1]):
+                if _pt_on_b_edge(pt[0], pt[1], j):
+                    edge_points[j].append(pt)
+
         # Boolean sequence: does any intersection point lie on b edge j?
-        edge_has_intersection = []
-        for j in range(n_b):
-            has = any(_pt_on_b_edge(pt[0], pt[1], j) for pt in intersections)
-            edge_has_intersection.append(has)
+        edge_has_intersection = [bool(points) for points in edge_points]
 
         # ------------------------------------------------------------------
         # Find the real "gap" — the contiguous (circular) run of B-edges
@@ -1614,11 +2669,12 @@ class i3model:
             end_edge = order[(run_end_idx + 1) % n_b]
             return start_edge, end_edge
 
+        def _first_on_edge(j):
+            return edge_points[j][0] if edge_points[j] else None
+
         def _flanking_points(run):
             start_edge, end_edge = _run_edges(run)
-            s_pt = next((pt for pt in intersections if _pt_on_b_edge(pt[0], pt[1], start_edge)), None)
-            e_pt = next((pt for pt in intersections if _pt_on_b_edge(pt[0], pt[1], end_edge)), None)
-            return s_pt, e_pt
+            return _first_on_edge(start_edge), _first_on_edge(end_edge)
 
         best_run = None
         best_gap2 = -1.0
@@ -1636,21 +2692,12 @@ class i3model:
 
         start_edge, end_edge = _run_edges(best_run)
 
-        start_pt = None   # (x, y, z)
-        end_pt   = None   # (x, y, z)
-
-        for pt in intersections:
-            if _pt_on_b_edge(pt[0], pt[1], start_edge):
-                start_pt = (pt[0], pt[1], pt[2])
-                break
-
-        for pt in intersections:
-            if _pt_on_b_edge(pt[0], pt[1], end_edge):
-                end_pt = (pt[0], pt[1], pt[2])
-                break
-
-        if start_pt is None or end_pt is None:
+        s_pt = _first_on_edge(start_edge)
+        e_pt = _first_on_edge(end_edge)
+        if s_pt is None or e_pt is None:
             return None
+        start_pt = (s_pt[0], s_pt[1], s_pt[2])
+        end_pt = (e_pt[0], e_pt[1], e_pt[2])
 
         # --- DEBUG: start and end points (csv format) ---
         print(f"[_boundary_substitution] start_pt: {start_pt[0]},{start_pt[1]},{start_pt[2]},,,,")
@@ -1753,11 +2800,13 @@ class i3model:
             arc1 = _to_xyz(b_augmented[sp_idx:] + b_augmented[:ep_idx + 1])
             arc2 = _to_xyz(b_augmented[ep_idx: sp_idx + 1])
 
-        # Count intersections belonging to each arc (by 2D proximity)
+        # Count intersections belonging to each arc (by 2D proximity),
+        # testing each one only against the arc segments in its grid cell.
         def _count_intersections_on_arc(arc, ixs):
+            arc_edges = SegmentGrid(arc, tol)
             count = 0
             for pt in ixs:
-                for k in range(len(arc) - 1):
+                for k in arc_edges.candidates(pt[0], pt[1]):
                     dx = arc[k + 1][0] - arc[k][0]
                     dy = arc[k + 1][1] - arc[k][1]
                     seg2 = dx * dx + dy * dy
@@ -1994,9 +3043,18 @@ class i3model:
         all_arc_segments = []
         all_gap_fills    = []
 
-        for arc in input_arcs:
-            if len(arc) < 2:
-                continue
+        # Whether each arc starts inside B is decided at the midpoint of its
+        # first segment rather than at its first vertex, to avoid ambiguity
+        # when that point lies exactly on B's boundary. One batch
+        # point-in-polygon query covers every arc.
+        input_arcs = [arc for arc in input_arcs if len(arc) >= 2]
+        starts_inside = points_in_polygon_2d(
+            [(arc[0][0] + arc[1][0]) / 2 for arc in input_arcs],
+            [(arc[0][1] + arc[1][1]) / 2 for arc in input_arcs],
+            b_closed,
+        ).tolist()
+
+        for arc, started_inside in zip(input_arcs, starts_inside):
 
             # Ensure arc is not accidentally self-closed for open arcs
             pts = list(arc)
@@ -2004,22 +3062,9 @@ class i3model:
             # ---------------------------------------------------------------
             # Step 1: find all intersections of this arc with B edges
             # ---------------------------------------------------------------
-            events = []  # (arc_seg_idx, t, ix, iy, b_edge_idx, u)
+            # (arc_seg_idx, t, ix, iy, b_edge_idx, u), in traversal order
+            events = i3model._segment_intersections_2d(pts, b_closed)
             n_arc = len(pts)
-            n_b   = len(b_closed)
-            for i in range(n_arc - 1):
-                p1 = pts[i][:2]
-                p2 = pts[i + 1][:2]
-                for j in range(n_b - 1):
-                    p3 = b_closed[j][:2]
-                    p4 = b_closed[j + 1][:2]
-                    r = i3model._segment_intersect_2d(p1, p2, p3, p4)
-                    if r is not None:
-                        t, u, ix, iy = r
-                        events.append((i, t, ix, iy, j, u))
-
-            # Sort events in traversal order along this arc
-            events.sort(key=lambda e: (e[0], e[1]))
 
             # ---------------------------------------------------------------
             # Step 2: build augmented point list with intersections inserted
@@ -2042,17 +3087,6 @@ class i3model:
             # ---------------------------------------------------------------
             # Step 3: walk augmented list, collecting outside arcs
             # ---------------------------------------------------------------
-            # Determine initial inside/outside state using the midpoint of the
-            # first segment rather than the first vertex, to avoid ambiguity
-            # when the first point lies exactly on B's boundary.
-            if len(pts) >= 2:
-                mid_x = (pts[0][0] + pts[1][0]) / 2
-                mid_y = (pts[0][1] + pts[1][1]) / 2
-                started_inside = i3model._point_in_polygon_2d(
-                    mid_x, mid_y, b_closed)
-            else:
-                started_inside = i3model._point_in_polygon_2d(
-                    pts[0][0], pts[0][1], b_closed)
             is_inside = started_inside
 
             # (b_edge_idx, u, x, y) for each transition point
@@ -2110,15 +3144,7 @@ class i3model:
             enter_transitions = []  # (b_edge, u, x, y) where arc enters B
             exit_transitions  = []  # (b_edge, u, x, y) where arc exits B
 
-            # For gap-fill pairing, re-derive started_inside consistently
-            if len(pts) >= 2:
-                mid_x = (pts[0][0] + pts[1][0]) / 2
-                mid_y = (pts[0][1] + pts[1][1]) / 2
-                started_inside = i3model._point_in_polygon_2d(
-                    mid_x, mid_y, b_closed)
-            else:
-                started_inside = i3model._point_in_polygon_2d(
-                    pts[0][0], pts[0][1], b_closed)
+            # Gap-fill pairing starts from the same initial state
             currently_inside = started_inside
             for tr in transitions:
                 if currently_inside:
@@ -2194,6 +3220,67 @@ class i3model:
     # Contour Difference — small focused methods
     # -------------------------------------------------------------------------
 
+    @staticmethod
+    def actor_bbox(actor):
+        """Return the 2D bounding box (xmin, ymin, xmax, ymax) of actor's
+        polydata, or None if it has no points.
+
+        Computed once and cached on the actor as .bbox. It covers every
+        point of the polydata, so it always contains actor_pts(actor).
+        """
+        if hasattr(actor, "bbox"):
+            return actor.bbox
+        bbox = None
+        mapper = actor.GetMapper()
+        poly = mapper.GetInput() if mapper is not None else None
+        if poly is not None and poly.GetNumberOfPoints() > 0:
+            xmin, xmax, ymin, ymax, _, _ = poly.GetBounds()
+            bbox = (xmin, ymin, xmax, ymax)
+        actor.bbox = bbox
+        return bbox
+
+    @staticmethod
+    def contour_difference_group_by_z(actors):
+        """Bucket actors by their .z: returns a dict z -> list of actors,
+        each list in the input order. Actors without a z are left out."""
+        by_z = {}
+        for actor in actors:
+            if hasattr(actor, "z"):
+                by_z.setdefault(actor.z, []).append(actor)
+        return by_z
+
+    @staticmethod
+    def contour_difference_candidates(actor_a, b_by_z, counts, tol=0.4):
+        """Pairing stage: yield the B actors worth clipping actor_a against.
+
+        Only the B actors at actor_a's Z are considered (looked up in
+        b_by_z, from contour_difference_group_by_z), in their original
+        order. Pairs whose bounding boxes are more than tol apart are
+        pruned: boundary substitution needs at least two A/B vertex pairs
+        closer than tol, so such a pair can never change actor_a. tol must
+        match the one _boundary_substitution is run with.
+
+        counts is a Counter; "considered" and "pruned" are added to it.
+        """
+        bbox_a = i3model.actor_bbox(actor_a)
+        for actor_b in b_by_z.get(actor_a.z, ()):
+            counts["considered"] += 1
+            bbox_b = i3model.actor_bbox(actor_b)
+            if (bbox_a is not None and bbox_b is not None
+                    and not bboxes_within(bbox_a, bbox_b, tol)):
+                counts["pruned"] += 1
+                continue
+            yield actor_b
+
+    @staticmethod
+    def contour_difference_pairing_stats(counts, verbose=True):
+        """Build (and print) the PairingStats of a pairing Counter."""
+        stats = PairingStats(counts["considered"], counts["pruned"], counts["clipped"])
+        if verbose:
+            print(f"pairing: {stats.considered} pairs considered, "
+                  f"{stats.pruned} pruned, {stats.clipped} clipped")
+        return stats
+
     @staticmethod
     def actor_pts(actor):
         """Extract the ordered list of (x, y, z) vertices from a vtkActor.
@@ -2224,7 +3311,7 @@ class i3model:
                     for i in range(pts.GetNumberOfPoints())]
 
         lines.InitTraversal()
-        id_list = vtk.vtkIdList()
+        id_list = vtkIdList()
         lines.GetNextCell(id_list)
         return [(pts.GetPoint(id_list.GetId(i))[0],
                  pts.GetPoint(id_list.GetId(i))[1],
@@ -2249,9 +3336,14 @@ class i3model:
             and gap_fills is a list of point-lists (B boundary arcs to display).
             Returns (None, []) if A is unaffected, ([], []) if fully consumed.
         """
-        a_pts = i3model.actor_pts(actor_a)
-        b_pts = i3model.actor_pts(actor_b)
+        return i3model.contour_difference_clip_pts(
+            i3model.actor_pts(actor_a), i3model.actor_pts(actor_b))
 
+    @staticmethod
+    def contour_difference_clip_pts(a_pts, b_pts):
+        """Point-list core of contour_difference_clip_one_sid: clip A's
+        (x, y, z) vertices against B's. Same return values.
+        """
         if len(a_pts) < 2 or len(b_pts) < 3:
             return None, []
 
@@ -2289,14 +3381,14 @@ class i3model:
         else:
             arcs = arc_state or []
 
-        vtk_pts   = vtk.vtkPoints()
-        vtk_cells = vtk.vtkCellArray()
+        vtk_pts   = vtkPoints()
+        vtk_cells = vtkCellArray()
         has_pts   = False
 
         for seg in arcs:
             if len(seg) < 2:
                 continue
-            pl = vtk.vtkPolyLine()
+            pl = vtkPolyLine()
             pl.GetPointIds().SetNumberOfIds(len(seg))
             for i, pt in enumerate(seg):
                 pid = vtk_pts.InsertNextPoint(pt[0], pt[1], z)
@@ -2307,7 +3399,7 @@ class i3model:
         for gap in gap_fills:
             if len(gap) < 2:
                 continue
-            pl = vtk.vtkPolyLine()
+            pl = vtkPolyLine()
             pl.GetPointIds().SetNumberOfIds(len(gap))
             for i, pt in enumerate(gap):
                 pid = vtk_pts.InsertNextPoint(pt[0], pt[1], z)
@@ -2318,7 +3410,7 @@ class i3model:
         if not has_pts:
             return None
 
-        poly = vtk.vtkPolyData()
+        poly = vtkPolyData()
         poly.SetPoints(vtk_pts)
         poly.SetLines(vtk_cells)
         return poly
@@ -2336,9 +3428,9 @@ class i3model:
         """
         if poly is None:
             return None
-        mapper = vtk.vtkPolyDataMapper()
+        mapper = vtkPolyDataMapper()
         mapper.SetInputData(poly)
-        actor = vtk.vtkActor()
+        actor = vtkActor()
         actor.SetMapper(mapper)
         actor.GetProperty().SetColor(color)
         actor.GetProperty().SetLineWidth(2)
@@ -2349,70 +3441,47 @@ class i3model:
     # Labels
     # -------------------------------------------------------------------------
 
-    def polylabels_create_actor(self, actor, label_text="Polyline Label"):
-        """Create a 3D billboard label at the arc-length midpoint of a polyline actor."""
-        mapper = actor.GetMapper()
-        poly_data = mapper.GetInput()
-
-        if poly_data is None:
-            raise ValueError("Actor does not contain polydata.")
-
-        points = poly_data.GetPoints()
-        lines = poly_data.GetLines()
-        lines.InitTraversal()
-
-        id_list = vtk.vtkIdList()
-        if not lines.GetNextCell(id_list):
-            raise ValueError("No polyline found in polydata.")
-
-        n_points = id_list.GetNumberOfIds()
-
-        # Compute cumulative arc lengths
-        arc_lengths = [0.0]
-        total_length = 0.0
-        for i in range(1, n_points):
-            p1 = points.GetPoint(id_list.GetId(i - 1))
-            p2 = points.GetPoint(id_list.GetId(i))
-            total_length += vtk.vtkMath.Distance2BetweenPoints(p1, p2) ** 0.5
-            arc_lengths.append(total_length)
-
-        half_length = total_length / 2.0
-
-        # Interpolate position at the midpoint
-        midpoint = [0.0, 0.0, 0.0]
-        for i in range(1, n_points):
-            if arc_lengths[i] >= half_length:
-                p1 = points.GetPoint(id_list.GetId(i - 1))
-                p2 = points.GetPoint(id_list.GetId(i))
-                denom = arc_lengths[i] - arc_lengths[i - 1]
-                if denom == 0.0:
-                    midpoint = list(p1)
-                else:
-                    t = (half_length - arc_lengths[i - 1]) / denom
-                    midpoint = [p1[j] + t * (p2[j] - p1[j]) for j in range(3)]
-                break
-
-        label = vtk.vtkBillboardTextActor3D()
-        label.SetInput(label_text)
-        label.SetPosition(midpoint)
-        label.GetTextProperty().SetFontSize(int(Params.PolylabelFontSize.value))
-        label.GetTextProperty().SetColor(Params.PolylabelColor.value)
-        return label
-
-    def pointlabels_create_actor(self, actor, label_text="Point Label"):
-        """Create a 3D billboard label at the position of a point actor."""
-        mapper = actor.GetMapper()
-        poly_data = mapper.GetInput()
+    def polylabels_anchors(self):
+        """Return the label anchor of every polyline in self.polylines.
 
-        if poly_data is None or poly_data.GetNumberOfPoints() == 0:
-            return None
+        Returns:
+            tuple: (polyline_ids, positions, lengths): the ids in
+            self.polylines order, an (n, 3) array of the arc-length
+            midpoints and an (n,) array of the polyline lengths.
+        """
+        polyline_ids = list(self.polylines)
+        positions = np.zeros((len(polyline_ids), 3))
+        lengths = np.zeros(len(polyline_ids))
+        for k, vertices in enumerate(self.polylines.values()):
+            if not vertices:
+                continue
+            xyz = np.array([vertex[:3] for vertex in vertices], dtype=np.float64)
+            arc_lengths = np.zeros(len(xyz))
+            np.cumsum(np.linalg.norm(np.diff(xyz, axis=0), axis=1), out=arc_lengths[1:])
+            total_length = arc_lengths[-1]
+            lengths[k] = total_length
+            if len(xyz) == 1:
+                positions[k] = xyz[0]
+                continue
 
-        label = vtk.vtkBillboardTextActor3D()
-        label.SetInput(label_text)
-        label.SetPosition(poly_data.GetPoint(0))
-        label.GetTextProperty().SetFontSize(int(Params.PointlabelFontSize.value))
-        label.GetTextProperty().SetColor(Params.PointlabelColor.value)
-        return label
+            # Interpolate position at the midpoint of the first segment
+            # reaching half the length
+            half_length = total_length / 2.0
+            i = max(1, int(np.searchsorted(arc_lengths, half_length)))
+            denom = arc_lengths[i] - arc_lengths[i - 1]
+            t = 0.0 if denom == 0.0 else (half_length - arc_lengths[i - 1]) / denom
+            positions[k] = xyz[i - 1] + t * (xyz[i] - xyz[i - 1])
+        return polyline_ids, positions, lengths
+
+    def pointlabels_anchors(self):
+        """Return (point_ids, positions): the ids in self.points order and
+        an (n, 3) array of their first vertex."""
+        point_ids = list(self.points)
+        positions = np.array(
+            [vertices[0][:3] if vertices else (0.0, 0.0, 0.0) for vertices in self.points.values()],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        return point_ids, positions
 
     # -------------------------------------------------------------------------
     # Routes & Tonnes Database
@@ -2420,8 +3489,7 @@ class i3model:
 
     def tonnes_save_database(self, tonnes_file):
         """Import a CSV tonnes file into the SQLite database."""
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             cursor.execute("DROP TABLE IF EXISTS tonnes")
@@ -2430,33 +3498,31 @@ class i3model:
                 "CREATE TABLE tonnes (period INTEGER, route_id TEXT, tonne REAL)"
             )
 
-            with open(tonnes_file, "r") as f:
-                for row in csv.reader(f):
-                    if len(row) < 3:
-                        continue
-                    try:
-                        period = int(row[0])
-                        route_id = row[1]
-                        tonne = float(row[2])
-                        cursor.execute(
-                            "INSERT INTO tonnes VALUES (?, ?, ?)",
-                            (period, route_id, tonne),
-                        )
-                    except ValueError:
-                        print(
-                            f"Warning: Could not parse period '{row[0]}' or "
-                            f"tonne '{row[2]}'. Skipping row."
-                        )
+            with open(tonnes_file, "r") as f, bulk_transaction(conn, "tonnes") as writer:
+                writer.insert(
+                    "INSERT INTO tonnes VALUES (?, ?, ?)",
+                    self._tonnes_rows(csv.reader(f)),
+                )
+            self.last_write_stats = writer.stats
+        self._schema_invalidate()
 
-            conn.commit()
-        finally:
-            if "conn" in locals():
-                conn.close()
+    @staticmethod
+    def _tonnes_rows(reader):
+        """Yield (period, route_id, tonne) for every parsable CSV row."""
+        for row in reader:
+            if len(row) < 3:
+                continue
+            try:
+                yield int(row[0]), row[1], float(row[2])
+            except ValueError:
+                print(
+                    f"Warning: Could not parse period '{row[0]}' or "
+                    f"tonne '{row[2]}'. Skipping row."
+                )
 
     def routes_tonnes_save_database(self):
         """Create the routes_tonnes joined table in the SQLite database."""
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             cursor.execute("DROP TABLE IF EXISTS routes_tonnes")
@@ -2470,64 +3536,97 @@ class i3model:
                 ORDER BY t.period, r.route_id
                 """
             )
+            ensure_indexes(cursor, "routes_tonnes")
             conn.commit()
-        finally:
-            if "conn" in locals():
-                conn.close()
+        self._routes_tonnes_cache = None
+        self._schema_invalidate()
 
     def hasPeriods(self):
         """Return True if the routes_tonnes table has at least one row."""
-        try:
-            conn = self._connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT count(*) FROM routes_tonnes")
-            result = cursor.fetchone()
-            return bool(result)
-        finally:
-            if "conn" in locals():
-                conn.close()
+        return self.schema.row_count("routes_tonnes") > 0
 
     def getMaxPeriod(self):
         """Return the maximum period value in the routes_tonnes table."""
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT max(period) FROM routes_tonnes")
+            cursor.execute(ROUTES_TONNES_MAX_PERIOD_SQL)
             result = cursor.fetchone()
             return result[0] if result else 0
-        finally:
-            if "conn" in locals():
-                conn.close()
 
     def updateRoutesTonnes(self, period):
         """Update the tonne column in polylines for the given period."""
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """
-                UPDATE polylines
-                SET tonne = (
-                    SELECT COALESCE(SUM(rt.tonne), 0)
-                    FROM routes_tonnes rt
-                    WHERE rt.period = ?
-                    AND rt.segments LIKE '%' || polylines.route || '%'
-                )
-                """,
-                (period,),
-            )
+            cursor.execute(ROUTES_TONNES_UPDATE_SQL, (period,))
             conn.commit()
-        finally:
-            if "conn" in locals():
-                conn.close()
+        self._schema_invalidate(table="polylines")
+
+    def routes_tonnes_read_period(self, period, polyline_ids):
+        """Return the tonnes of period for the polylines polyline_ids, as a
+        float64 array in the same order.
+
+        These are the values updateRoutesTonnes writes to the tonne column
+        (the sum of the period's routes_tonnes rows whose segments contain
+        the polyline's route, 0 if none do), but nothing is written and no
+        polyline is read back: the (segments, polyline) matches are found
+        once (see _routes_tonnes_matches), and a period is then one grouped
+        query over its routes_tonnes rows and a few array operations.
+        """
+        polyline_ids = np.asarray(polyline_ids, dtype=np.int64)
+        tonnes = np.zeros(len(polyline_ids))
+        segments_index, match_segments, match_polylines = self._routes_tonnes_matches()
+        if not len(polyline_ids) or not len(match_polylines):
+            return tonnes
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(ROUTES_TONNES_PERIOD_SQL, (period,))
+            rows = [(segments_index[segments], tonne or 0)
+                    for segments, tonne in cursor.fetchall() if segments in segments_index]
+        segment_tonnes = np.zeros(len(segments_index))
+        if rows:
+            index, values = zip(*rows)
+            segment_tonnes[list(index)] = values
+
+        # Position of each match's polyline in polyline_ids (matches of
+        # polylines not asked for are dropped).
+        order = np.argsort(polyline_ids, kind="stable")
+        found = np.searchsorted(polyline_ids, match_polylines, sorter=order)
+        found = np.minimum(found, len(polyline_ids) - 1)
+        keep = polyline_ids[order[found]] == match_polylines
+        np.add.at(tonnes, order[found[keep]], segment_tonnes[match_segments[keep]])
+        return tonnes
+
+    def _routes_tonnes_matches(self):
+        """Return (segments_index, match_segments, match_polylines): the
+        index of every routes_tonnes segments string that matches a
+        polyline, and one entry per (segments, polyline_id) pair matched
+        with the LIKE of ROUTES_TONNES_UPDATE_SQL. Cached for file_path
+        until the polylines or routes_tonnes change."""
+        cached = self._routes_tonnes_cache
+        if cached is not None and cached[0] == self.file_path:
+            return cached[1]
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(ROUTES_TONNES_MATCHES_SQL)
+            rows = cursor.fetchall()
+        segments_index = {}
+        match_segments = np.array(
+            [segments_index.setdefault(segments, len(segments_index)) for segments, _ in rows],
+            dtype=np.int64)
+        match_polylines = np.array([polyline_id for _, polyline_id in rows], dtype=np.int64)
+
+        matches = (segments_index, match_segments, match_polylines)
+        self._routes_tonnes_cache = (self.file_path, matches)
+        return matches
 
     def get_sessions(self):
         """Return all rows from the sessions table as SessionResult tuples,
         most recent first. Returns an empty list if no sessions exist yet."""
         if not self.table_exists("sessions"):
             return []
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -2544,21 +3643,15 @@ class i3model:
                 )
                 for row in data
             ]
-        finally:
-            if "conn" in locals():
-                conn.close()
 
     def delete_session(self, session_id):
         """Delete a session row from the sessions table by id."""
         if not self.table_exists("sessions"):
             return
-        try:
-            conn = self._connect()
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "DELETE FROM sessions WHERE session_id=?", (session_id,)
             )
             conn.commit()
-        finally:
-            if "conn" in locals():
-                conn.close()
+        self._schema_invalidate(table="sessions")
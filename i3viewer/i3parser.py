@@ -0,0 +1,251 @@
+import locale
+from collections import namedtuple
+from itertools import compress, repeat
+
+import numpy as np
+
+# Parsed contents of a '$'-separated geometry file (XYZ, XYZS or CSV).
+#
+#   coords       — (N, 3) float64 array of X, Y, Z, rounded to 3 decimals
+#   offsets      — (B + 1) int64 array; block b spans coords[offsets[b]:offsets[b + 1]]
+#   separators   — (B,) int64 array; number of '$' lines seen before block b,
+#                  so block b's id is start_id + separators[b]
+#   n_separators — total number of '$' lines in the file
+#   names        — list of N route names (CSV only), otherwise None
+#
+# Empty blocks (two '$' in a row, or a '$' at the end of the file) are not
+# stored, but they still advance the id counter exactly like a line-by-line
+# reader incrementing its id on every '$'.
+GeometryBlocks = namedtuple(
+    "GeometryBlocks", ["coords", "offsets", "separators", "n_separators", "names"]
+)
+
+# Bytes treated as whitespace by bytes.split() / bytes.strip().
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b" \t\n\r\x0b\x0c")] = True
+
+_NEWLINE = ord("\n")
+_COMMA = ord(",")
+_DOLLAR = ord("$")
+
+
+# -----------------------------------------------------------------------------
+# Rounding & Gradients
+# -----------------------------------------------------------------------------
+
+def round3(values):
+    """Round a float64 array to 3 decimals, bit-for-bit like round(v, 3).
+
+    np.round() scales by 1000 before rounding, which can land on the wrong
+    side of a half-way case that Python's correctly-rounded round() gets
+    right. Those (rare) near-ties are detected and re-rounded in Python so
+    results always match the scalar round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    values = values.ravel()
+    scaled = values * 1000.0
+    rounded = np.rint(scaled) / 1000.0
+
+    with np.errstate(invalid="ignore"):
+        frac = np.abs(scaled - np.trunc(scaled))
+        ambiguous = (np.abs(frac - 0.5) <= 4 * np.spacing(np.abs(scaled))) | \
+                    (np.abs(scaled) >= 2.0 ** 52)
+    ambiguous &= np.isfinite(scaled)
+
+    idx = np.flatnonzero(ambiguous)
+    if idx.size:
+        rounded[idx] = [round(v, 3) for v in values[idx].tolist()]
+    return rounded.reshape(shape)
+
+
+def compute_gradients(coords, offsets):
+    """Return the gradient (%) of every vertex relative to its predecessor.
+
+    gradient = delta_z / xy_distance * 100, evaluated along each block. The
+    first vertex of every block gets 0.0, as does any vertex whose XY
+    distance to the previous one is zero. Values are rounded to 3 decimals.
+    """
+    n = len(coords)
+    gradients = np.zeros(n, dtype=np.float64)
+    if n < 2:
+        return gradients
+
+    delta = coords[1:] - coords[:-1]
+    # An array exponent makes numpy call pow() element-wise, the same libm
+    # routine float.__pow__ uses, instead of its x*x fast path.
+    two = np.full(n - 1, 2.0)
+    distance = np.sqrt(np.power(delta[:, 0], two) + np.power(delta[:, 1], two))
+
+    step = np.zeros(n - 1, dtype=np.float64)
+    np.divide(delta[:, 2], distance, out=step, where=distance != 0)
+    gradients[1:] = round3(step * 100)
+
+    gradients[offsets[:-1]] = 0.0
+    return gradients
+
+
+# -----------------------------------------------------------------------------
+# Block Parsing
+# -----------------------------------------------------------------------------
+
+def _normalize_newlines(data):
+    """Apply universal-newline translation, as text-mode open() does."""
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return data
+
+
+def _scan_lines(data):
+    """Locate the lines and whitespace-separated tokens in data.
+
+    Returns (buf, newlines, token_line, line_tokens, separator_lines) where
+    token_line holds the line index of every token produced by
+    data.split(), line_tokens the token count per line and separator_lines
+    a boolean mask of the lines whose stripped content is exactly '$'.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    n_lines = len(newlines) + 1
+
+    whitespace = _WHITESPACE[buf]
+    starts = ~whitespace
+    starts[1:] &= whitespace[:-1]
+    token_pos = np.flatnonzero(starts)
+    token_line = np.searchsorted(newlines, token_pos, side="left")
+    line_tokens = np.bincount(token_line, minlength=n_lines)
+
+    # A '$' token is a single '$' byte followed by whitespace or EOF.
+    after = token_pos + 1
+    single = np.ones(len(token_pos), dtype=bool)
+    inside = after < len(buf)
+    single[inside] = whitespace[after[inside]]
+    dollar = (buf[token_pos] == _DOLLAR) & single
+
+    separator_lines = np.zeros(n_lines, dtype=bool)
+    separator_lines[token_line[dollar]] = True
+    separator_lines &= line_tokens == 1
+
+    return buf, newlines, token_line, line_tokens, separator_lines
+
+
+def _group_blocks(valid_lines, separator_lines):
+    """Return (offsets, separators, n_separators) for the data lines."""
+    seps_before = np.cumsum(separator_lines)
+    point_seps = seps_before[valid_lines]
+    n = len(point_seps)
+    n_separators = int(seps_before[-1]) if len(seps_before) else 0
+
+    if n == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), n_separators
+
+    boundaries = np.flatnonzero(np.diff(point_seps)) + 1
+    offsets = np.concatenate(([0], boundaries, [n])).astype(np.int64)
+    separators = point_seps[offsets[:-1]].astype(np.int64)
+    return offsets, separators, n_separators
+
+
+def _floats(tokens, count):
+    """Convert an iterable of byte tokens to float64 with float() semantics."""
+    return np.fromiter(map(float, tokens), dtype=np.float64, count=count)
+
+
+def parse_xyz_blocks(data):
+    """Parse the bytes of an XYZ/XYZS file ('x y z' lines, '$' separators).
+
+    Lines that don't hold exactly three whitespace-separated fields are
+    ignored.
+    """
+    data = _normalize_newlines(data)
+    _, _, token_line, line_tokens, separator_lines = _scan_lines(data)
+
+    valid = line_tokens == 3
+    token_mask = valid[token_line]
+    n_values = int(np.count_nonzero(token_mask))
+
+    values = _floats(compress(data.split(), token_mask.tolist()), n_values)
+    coords = round3(values).reshape(-1, 3)
+
+    offsets, separators, n_separators = _group_blocks(
+        np.flatnonzero(valid), separator_lines)
+    return GeometryBlocks(coords, offsets, separators, n_separators, None)
+
+
+def parse_csv_blocks(data, encoding=None):
+    """Parse the bytes of a CSV polyline file ('name,x,y,z' lines, '$'
+    separators).
+
+    Lines that don't split into exactly four comma-separated fields are
+    ignored. Route names are decoded with the locale's preferred encoding
+    (what text-mode open() uses) unless encoding is given.
+    """
+    data = _normalize_newlines(data)
+    buf, newlines, _, _, separator_lines = _scan_lines(data)
+    n_lines = len(separator_lines)
+
+    comma_line = np.searchsorted(newlines, np.flatnonzero(buf == _COMMA), side="left")
+    valid = (np.bincount(comma_line, minlength=n_lines) == 3) & ~separator_lines
+    n_points = int(np.count_nonzero(valid))
+
+    lines = compress(data.split(b"\n"), valid.tolist())
+    fields = b",".join(map(bytes.strip, lines)).split(b",") if n_points else []
+
+    encoding = encoding or locale.getpreferredencoding(False)
+    names = b"\n".join(fields[0::4]).decode(encoding).split("\n") if n_points else []
+    coords = np.column_stack([
+        _floats(fields[1::4], n_points),
+        _floats(fields[2::4], n_points),
+        _floats(fields[3::4], n_points),
+    ]) if n_points else np.zeros((0, 3), dtype=np.float64)
+    coords = round3(coords)
+
+    offsets, separators, n_separators = _group_blocks(
+        np.flatnonzero(valid), separator_lines)
+    return GeometryBlocks(coords, offsets, separators, n_separators, names)
+
+
+def read_xyz_blocks(file_path):
+    """Read and parse an XYZ/XYZS file into GeometryBlocks."""
+    with open(file_path, "rb") as file:
+        return parse_xyz_blocks(file.read())
+
+
+def read_csv_blocks(file_path):
+    """Read and parse a CSV polyline file into GeometryBlocks."""
+    with open(file_path, "rb") as file:
+        return parse_csv_blocks(file.read())
+
+
+# -----------------------------------------------------------------------------
+# Dict Conversion
+# -----------------------------------------------------------------------------
+
+def _block_slices(blocks, start_id):
+    """Yield (block_id, start, stop) for every non-empty block."""
+    offsets = blocks.offsets.tolist()
+    for b, sep in enumerate(blocks.separators.tolist()):
+        yield start_id + sep, offsets[b], offsets[b + 1]
+
+
+def blocks_to_surfaces(blocks, start_id=1):
+    """Convert GeometryBlocks to the surfaces dict used by i3model:
+    surface_id -> list of (x, y, z)."""
+    x, y, z = blocks.coords.T.tolist() if len(blocks.coords) else ([], [], [])
+    rows = list(zip(x, y, z))
+    return {
+        block_id: rows[start:stop]
+        for block_id, start, stop in _block_slices(blocks, start_id)
+    }
+
+
+def blocks_to_polylines(blocks, start_id=1):
+    """Convert GeometryBlocks to the polylines dict used by i3model:
+    polyline_id -> list of (x, y, z, gradient, name, None)."""
+    x, y, z = blocks.coords.T.tolist() if len(blocks.coords) else ([], [], [])
+    gradients = compute_gradients(blocks.coords, blocks.offsets).tolist()
+    names = blocks.names if blocks.names is not None else repeat(None)
+    rows = list(zip(x, y, z, gradients, names, repeat(None)))
+    return {
+        block_id: rows[start:stop]
+        for block_id, start, stop in _block_slices(blocks, start_id)
+    }
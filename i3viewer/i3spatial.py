@@ -0,0 +1,169 @@
+import math
+
+# Grid cells are made this much (relative) larger than the distance they
+# must cover, so that two points closer than that distance always fall in
+# the same or adjacent cells whatever the rounding of x / cell. Exact as
+# long as |x| / cell stays below ~1e9 (mine-grid coordinates around 8e6
+# with a 0.4 tolerance give ~2e7).
+_CELL_PAD = 1e-6
+
+
+def _cell_of(x, y, cell):
+    return math.floor(x / cell), math.floor(y / cell)
+
+
+class GridIndex:
+    """Uniform-grid spatial hash of 2D points for fixed-radius lookups.
+
+    Points are bucketed by (floor(x / cell), floor(y / cell)) with cell
+    equal to radius (plus _CELL_PAD), so every point closer than radius to
+    a query point lies in the 3x3 block of cells around it. Buckets hold
+    point indices in ascending order. Only x and y of each point are used.
+    """
+
+    def __init__(self, points, radius):
+        if radius <= 0:
+            raise ValueError(f"radius must be positive, got {radius}")
+        self.points = points
+        self.radius = radius
+        self.cell = radius * (1.0 + _CELL_PAD)
+
+        cells = {}
+        for i, p in enumerate(points):
+            cells.setdefault(_cell_of(p[0], p[1], self.cell), []).append(i)
+        self.cells = cells
+
+    def candidates(self, x, y):
+        """Return the indices of every point that may lie within radius of
+        (x, y), in ascending order (a superset of the exact answer)."""
+        cx, cy = _cell_of(x, y, self.cell)
+        found = []
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                bucket = self.cells.get((i, j))
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
+
+    def first_within(self, x, y):
+        """Return the lowest index k with
+        (x_k - x) ** 2 + (y_k - y) ** 2 < radius * radius, or None.
+
+        This is the point a linear scan from index 0 stops at.
+        """
+        r2 = self.radius * self.radius
+        for k in self.candidates(x, y):
+            p = self.points[k]
+            if (p[0] - x) ** 2 + (p[1] - y) ** 2 < r2:
+                return k
+        return None
+
+
+class SegmentGrid:
+    """Uniform-grid index of a polyline's segments for point-on-segment
+    tests.
+
+    Segment k runs from points[k] to points[k + 1] (wrapping back to
+    points[0] when closed). It is registered in every cell its reach
+    overlaps: its bounding box, extended by slack * length along each axis
+    (the parametric slack of a t in [-slack, 1 + slack] test) and padded by
+    radius. A query point then only has to look at the segments of its own
+    cell.
+
+    cell defaults to the larger of radius and the mean segment length, so
+    a typical segment covers a handful of cells. Segments that would cover
+    more than max_cells cells are kept on a short list returned by every
+    query instead.
+    """
+
+    def __init__(self, points, radius, slack=None, closed=False, cell=None, max_cells=64):
+        if radius <= 0:
+            raise ValueError(f"radius must be positive, got {radius}")
+        slack = radius if slack is None else slack
+        n = len(points)
+        n_segments = n if closed else max(n - 1, 0)
+        self.n_segments = n_segments
+
+        if cell is None:
+            total = sum(
+                math.hypot(points[(k + 1) % n][0] - points[k][0],
+                           points[(k + 1) % n][1] - points[k][1])
+                for k in range(n_segments)
+            )
+            cell = max(radius, total / n_segments if n_segments else radius)
+        self.cell = cell
+
+        cells = {}
+        always = []
+        pad = 1.0 + _CELL_PAD
+        for k in range(n_segments):
+            x3, y3 = points[k][0], points[k][1]
+            x4, y4 = points[(k + 1) % n][0], points[(k + 1) % n][1]
+            dx, dy = abs(x4 - x3), abs(y4 - y3)
+            reach_x = (slack * dx + radius) * pad
+            reach_y = (slack * dy + radius) * pad
+            i0, j0 = _cell_of(min(x3, x4) - reach_x, min(y3, y4) - reach_y, cell)
+            i1, j1 = _cell_of(max(x3, x4) + reach_x, max(y3, y4) + reach_y, cell)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > max_cells:
+                always.append(k)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    cells.setdefault((i, j), []).append(k)
+        self.cells = cells
+        self.always = always
+
+    def candidates(self, x, y):
+        """Return the indices of every segment that may pass within reach of
+        (x, y), in ascending order (a superset of the exact answer)."""
+        bucket = self.cells.get(_cell_of(x, y, self.cell), [])
+        if not self.always:
+            return bucket
+        return sorted(bucket + self.always)
+
+
+def bboxes_within(a, b, distance):
+    """Return True unless 2D boxes a and b, each (xmin, ymin, xmax, ymax),
+    are more than distance apart along x or y.
+
+    distance is widened by _CELL_PAD, so rounding never rejects two boxes
+    holding points closer than distance.
+    """
+    pad = distance * (1.0 + _CELL_PAD)
+    return (a[0] <= b[2] + pad and b[0] <= a[2] + pad
+            and a[1] <= b[3] + pad and b[1] <= a[3] + pad)
+
+
+def overlapping_boxes(boxes_a, boxes_b):
+    """Return every (i, j) such that 2D boxes boxes_a[i] and boxes_b[j],
+    each (xmin, ymin, xmax, ymax), overlap (touching counts).
+
+    Sort-and-sweep on x: box edges are visited in x order while the boxes
+    of each side whose x-extent is open are kept in an active set, so a
+    box is only compared with the other side's boxes it overlaps in x.
+    That is O((n + k) log n) for k overlapping-in-x pairs, instead of the
+    O(n_a * n_b) of testing every pair. Pairs come out in sweep order.
+    """
+    # (x, 0 = opens / 1 = closes, side, index): at equal x, boxes open
+    # before any closes, so boxes that only touch are still paired.
+    events = []
+    for side, boxes in enumerate((boxes_a, boxes_b)):
+        for k, box in enumerate(boxes):
+            events.append((box[0], 0, side, k))
+            events.append((box[2], 1, side, k))
+    events.sort()
+
+    active = ({}, {})
+    pairs = []
+    for _, closes, side, k in events:
+        if closes:
+            del active[side][k]
+            continue
+        box = boxes_b[k] if side else boxes_a[k]
+        ymin, ymax = box[1], box[3]
+        for other, other_box in active[1 - side].items():
+            if other_box[1] <= ymax and ymin <= other_box[3]:
+                pairs.append((other, k) if side else (k, other))
+        active[side][k] = box
+    return pairs
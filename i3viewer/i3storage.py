@@ -0,0 +1,214 @@
+import argparse
+import os
+import sqlite3
+from itertools import groupby
+
+import numpy as np
+
+# Ring ("columnar BLOB") storage for the geometry tables.
+#
+# The default layout of surfaces, cuts and contourdiffs is one row per
+# vertex. The ring layout keeps the same table names and key columns but
+# stores one row per contour ring:
+#
+#   <key columns>  — as in the vertex layout, minus point_id
+#   n_points       — number of vertices in the ring
+#   z              — Z of the first vertex (the contour level)
+#   xmin .. ymax   — 2D bounding box of the ring
+#   coords         — n_points * (x, y, z) packed as little-endian float64
+#
+# The layout of an existing table is detected from its columns (see
+# is_ring_table), so every reader handles both transparently and writers
+# keep whichever layout a database already uses.
+
+RING_KEYS = {
+    "surfaces": (("surface_id", "INTEGER"),),
+    "cuts": (("period", "TEXT"), ("shovel", "TEXT"), ("surface_id", "INTEGER")),
+    "contourdiffs": (
+        ("result_name", "TEXT"),
+        ("contourdiff_id", "INTEGER"),
+        ("period", "TEXT"),
+        ("shovel", "TEXT"),
+        ("surface_id", "INTEGER"),
+    ),
+}
+
+# Primary key of each ring table (contourdiffs rows are unique per snapshot
+# and surface_id; period/shovel are descriptive).
+RING_PRIMARY_KEYS = {
+    "surfaces": ("surface_id",),
+    "cuts": ("period", "shovel", "surface_id"),
+    "contourdiffs": ("result_name", "contourdiff_id", "surface_id"),
+}
+
+RING_COLUMNS = ("n_points", "z", "xmin", "ymin", "xmax", "ymax", "coords")
+
+
+# -----------------------------------------------------------------------------
+# Packing
+# -----------------------------------------------------------------------------
+
+def pack_ring(vertices):
+    """Pack a ring's (x, y, z, ...) vertices.
+
+    Returns (n_points, z, xmin, ymin, xmax, ymax, coords) where coords is
+    the little-endian float64 x, y, z of every vertex.
+    """
+    coords = np.array([v[:3] for v in vertices], dtype="<f8").reshape(-1, 3)
+    xmin, ymin = coords[:, :2].min(axis=0).tolist()
+    xmax, ymax = coords[:, :2].max(axis=0).tolist()
+    return (len(coords), float(coords[0, 2]), xmin, ymin, xmax, ymax,
+            coords.tobytes())
+
+
+def unpack_ring(coords):
+    """Unpack a coords BLOB into a list of (x, y, z) tuples."""
+    return list(map(tuple, np.frombuffer(coords, dtype="<f8").reshape(-1, 3).tolist()))
+
+
+# -----------------------------------------------------------------------------
+# Schema
+# -----------------------------------------------------------------------------
+
+def is_ring_table(cursor, table):
+    """Return True if table exists and uses the ring layout."""
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    return "coords" in {row[1] for row in cursor.fetchall()}
+
+
+def create_ring_table(cursor, table, name=None):
+    """Create the ring-layout table for table (as name, if given)."""
+    keys = ",\n    ".join(f"{col} {typ} NOT NULL" for col, typ in RING_KEYS[table])
+    primary_key = ", ".join(RING_PRIMARY_KEYS[table])
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS "{name or table}" (
+            {keys},
+            n_points INTEGER NOT NULL,
+            z REAL,
+            xmin REAL,
+            ymin REAL,
+            xmax REAL,
+            ymax REAL,
+            coords BLOB NOT NULL,
+            PRIMARY KEY ({primary_key})
+        )
+        """
+    )
+
+
+def insert_rings_sql(table, name=None):
+    """Return the INSERT statement for ring rows: key columns then
+    RING_COLUMNS."""
+    columns = [col for col, _ in RING_KEYS[table]] + list(RING_COLUMNS)
+    marks = ", ".join("?" * len(columns))
+    return f'INSERT INTO "{name or table}" ({", ".join(columns)}) VALUES ({marks})'
+
+
+# -----------------------------------------------------------------------------
+# Migration
+# -----------------------------------------------------------------------------
+
+def _vertex_groups(conn, table):
+    """Yield (key, vertices) for every ring of a vertex-layout table, in the
+    order the rings should be written to the ring table."""
+    keys = [col for col, _ in RING_KEYS[table]]
+    select = f'SELECT {", ".join(keys)}, X, Y, Z FROM "{table}"'
+    order = ", ".join(RING_PRIMARY_KEYS[table]) + ", point_id"
+
+    if table == "contourdiffs":
+        # Keep result_name groups in creation order (getContourDiffResultNames
+        # orders them by MIN(rowid)).
+        names = [row[0] for row in conn.execute(
+            "SELECT result_name FROM contourdiffs GROUP BY result_name ORDER BY MIN(rowid)"
+        ).fetchall()]
+        queries = [(select + f" WHERE result_name=? ORDER BY {order}", (name,))
+                   for name in names]
+    else:
+        queries = [(select + f" ORDER BY {order}", ())]
+
+    n_keys = len(keys)
+    for sql, params in queries:
+        rows = conn.execute(sql, params)
+        for key, group in groupby(rows, key=lambda row: row[:n_keys]):
+            yield key, [row[n_keys:] for row in group]
+
+
+def migrate_table(conn, table):
+    """Convert one vertex-layout table to the ring layout in place.
+
+    Returns (rings, vertices) written, or None if the table is missing or
+    already uses the ring layout.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    )
+    if cursor.fetchone() is None or is_ring_table(cursor, table):
+        return None
+
+    tmp = f"{table}__rings"
+    cursor.execute(f'DROP TABLE IF EXISTS "{tmp}"')
+    create_ring_table(cursor, table, tmp)
+
+    counts = [0, 0]
+
+    def _rows():
+        for key, vertices in _vertex_groups(conn, table):
+            counts[0] += 1
+            counts[1] += len(vertices)
+            yield (*key, *pack_ring(vertices))
+
+    cursor.executemany(insert_rings_sql(table, tmp), _rows())
+    cursor.execute(f'DROP TABLE "{table}"')
+    cursor.execute(f'ALTER TABLE "{tmp}" RENAME TO "{table}"')
+    return tuple(counts)
+
+
+def migrate_database(db_path, tables=tuple(RING_KEYS), vacuum=True):
+    """Convert the geometry tables of db_path to the ring layout.
+
+    All tables are converted in one transaction; the file is then vacuumed
+    so the freed pages are returned to the filesystem. Returns a dict of
+    table -> (rings, vertices) for every table that was converted.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        results = {}
+        with conn:
+            for table in tables:
+                counts = migrate_table(conn, table)
+                if counts is not None:
+                    results[table] = counts
+        if vacuum and results:
+            conn.execute("VACUUM")
+        return results
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert the surfaces, cuts and contourdiffs tables of an "
+                    "i3viewer database to one-row-per-ring BLOB storage."
+    )
+    parser.add_argument("db_path", help="SQLite database to migrate in place")
+    parser.add_argument("--tables", nargs="+", choices=sorted(RING_KEYS),
+                        default=list(RING_KEYS), help="tables to convert")
+    parser.add_argument("--no-vacuum", action="store_true",
+                        help="skip VACUUM after converting")
+    args = parser.parse_args(argv)
+
+    before = os.path.getsize(args.db_path)
+    results = migrate_database(args.db_path, args.tables, not args.no_vacuum)
+    after = os.path.getsize(args.db_path)
+
+    if not results:
+        print("Nothing to migrate.")
+    for table, (rings, vertices) in results.items():
+        print(f"{table}: {vertices} vertex rows -> {rings} ring rows")
+    print(f"size: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
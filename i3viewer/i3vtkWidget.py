@@ -1,9 +1,14 @@
+from collections import Counter
+import math
+
+import numpy as np
 import vtk
 import vtkmodules.qt.QVTKRenderWindowInteractor as QVTK
 from PySide6.QtWidgets import QHBoxLayout, QWidget
 from vtk import vtkActor
 
-from i3viewer.i3enums import DelaunayCfg, FileType, Params, SurfaceCfg
+from i3viewer.i3enums import (DelaunayCfg, FileType, Params, PointPick, PolylinePick,
+                              SurfaceCfg)
 from i3viewer.i3model import i3model
 from i3viewer.i3point import NonModalDialog as PointDialog
 from i3viewer.i3polyline import NonModalDialog as PolylineDialog
@@ -28,7 +33,11 @@ class i3vtkWidget(QWidget):
         self.contourActors = []
         self.contourActorsMap = {}
         self.contourDiffActors = []
+        self.pairing_stats = None
         self.selected_actor = None
+        # Heatmap tonnes of the merged PolylineLayer's polylines, in its
+        # cell order, for the period last loaded by heatmap_load_period.
+        self.heatmap_tonnes = None
         self.surfaceActor = None
         self.wireframeActor = None
 
@@ -83,10 +92,12 @@ class i3vtkWidget(QWidget):
         existing_count = len(self.actors)
 
         if fileType == FileType.DB:
+            self.model.refreshSchema()
+            self.model.checkQueryPlans()
             if self.model.hasPointsTable():
-                self.actors.extend(self.model.points_format_actors(fileType))
+                self.actors.extend(self.points_format_actors(fileType))
             if self.model.hasPolylinesTable():
-                self.actors.extend(self.model.polylines_format_actors(fileType))
+                self.actors.extend(self.polylines_format_actors(fileType))
             if self.model.hasSurfacesTable():
                 existing_contour_count = len(self.contourActors)
                 self.contourActors.extend(self.model.surfaces_format_actors(fileType))
@@ -109,11 +120,11 @@ class i3vtkWidget(QWidget):
                 self.model.surface_file_id += 1
 
         elif fileType in (FileType.XYZ, FileType.CSV):
-            self.actors.extend(self.model.polylines_format_actors(fileType))
+            self.actors.extend(self.polylines_format_actors(fileType))
             self.polylabels_create_actors(fileType)
 
         elif fileType == FileType.SRG:
-            self.actors.extend(self.model.points_format_actors(fileType))
+            self.actors.extend(self.points_format_actors(fileType))
             self.pointlabels_create_actors(fileType)
 
         elif fileType == FileType.XYZS:
@@ -142,19 +153,59 @@ class i3vtkWidget(QWidget):
 
         self.UpdateView()
 
+    def polylines_format_actors(self, fileType):
+        """Load polylines through the model and return their new actors.
+
+        A merged PolylineLayer is rebuilt over all the model's polylines,
+        so the previous layer's actors are taken out of the scene first.
+        """
+        old_layer = self.model.polyline_layer
+        actors = self.model.polylines_format_actors(fileType)
+        if old_layer is not None and old_layer is not self.model.polyline_layer:
+            self.swap_actors(old_layer.actors, [])
+            if isinstance(self.selected_actor, PolylinePick):
+                self.selected_actor = None
+            self.heatmap_tonnes = None
+        return actors
+
+    def points_format_actors(self, fileType):
+        """Load points through the model and return their new actors,
+        taking a replaced merged PointLayer out of the scene."""
+        old_layer = self.model.point_layer
+        actors = self.model.points_format_actors(fileType)
+        if old_layer is not None and old_layer is not self.model.point_layer:
+            self.swap_actors(old_layer.actors, [])
+            if isinstance(self.selected_actor, PointPick):
+                self.selected_actor = None
+        return actors
+
     # -------------------------------------------------------------------------
     # Actor Lookup
     # -------------------------------------------------------------------------
 
     def polylines_get_actor(self, polyline_id):
-        """Return the VTK actor for the given polyline_id, or None."""
+        """Return the VTK actor for the given polyline_id, or None.
+
+        With a merged PolylineLayer, a PolylinePick for the polyline is
+        returned instead.
+        """
+        layer = self.model.polyline_layer if self.model else None
+        if layer is not None:
+            return PolylinePick(polyline_id) if polyline_id in layer else None
         for actor in self.actors:
             if hasattr(actor, "polyline_id") and actor.polyline_id == polyline_id:
                 return actor
         return None
 
     def points_get_actor(self, point_id):
-        """Return the VTK actor for the given point_id, or None."""
+        """Return the VTK actor for the given point_id, or None.
+
+        With a merged PointLayer, a PointPick for the point is returned
+        instead.
+        """
+        layer = self.model.point_layer if self.model else None
+        if layer is not None:
+            return PointPick(point_id) if point_id in layer else None
         for actor in self.actors:
             if hasattr(actor, "point_id") and actor.point_id == point_id:
                 return actor
@@ -212,8 +263,10 @@ class i3vtkWidget(QWidget):
         changed = False
         new_actor_list = []
 
+        b_by_z = i3model.contour_difference_group_by_z(actors_b)
+        counts = Counter()
         for actor_a in actors_a:
-            new_actor = self._clip_actor_against_fid_b(actor_a, actors_b, color)
+            new_actor = self._clip_actor_against_fid_b(actor_a, b_by_z, color, counts)
 
             if new_actor is self._UNCHANGED:
                 new_actor_list.append(actor_a)   # unaffected — keep in place
@@ -230,6 +283,7 @@ class i3vtkWidget(QWidget):
                 self.contourActors.append(new_actor)
                 new_actor_list.append(new_actor)
 
+        self.pairing_stats = i3model.contour_difference_pairing_stats(counts)
         if not changed:
             return False
 
@@ -237,8 +291,15 @@ class i3vtkWidget(QWidget):
         self.UpdateView(False)
         return True
 
-    def _clip_actor_against_fid_b(self, actor_a, actors_b, color):
-        """Clip one A contour actor against every same-Z actor in actors_b.
+    def _clip_actor_against_fid_b(self, actor_a, b_by_z, color, counts):
+        """Clip one A contour actor against the same-Z B actors that
+        i3model.contour_difference_candidates() pairs it with.
+
+        Args:
+            actor_a: contour actor of file A
+            b_by_z:  B actors bucketed by i3model.contour_difference_group_by_z
+            color:   color of rebuilt actors
+            counts:  pairing Counter (considered / pruned / clipped)
 
         Returns:
             _UNCHANGED   — actor_a is unaffected (no B actor produced a result)
@@ -251,10 +312,8 @@ class i3vtkWidget(QWidget):
         z = actor_a.z
         combined_arcs = None
 
-        for actor_b in actors_b:
-            if not (hasattr(actor_b, "z") and actor_b.z == z):
-                continue
-
+        for actor_b in i3model.contour_difference_candidates(actor_a, b_by_z, counts):
+            counts["clipped"] += 1
             arcs, fills = i3model.contour_difference_clip_one_sid(
                 actor_a, actor_b, z)
             # fills (B's inner boundary arcs) are intentionally discarded —
@@ -276,6 +335,16 @@ class i3vtkWidget(QWidget):
     # Actor Management
     # -------------------------------------------------------------------------
 
+    def swap_actors(self, old_actors, new_actors):
+        """Replace old_actors with new_actors in self.actors and the scene."""
+        for actor in old_actors:
+            if actor in self.actors:
+                self.actors.remove(actor)
+            self.RemoveActor(actor)
+        for actor in new_actors:
+            self.actors.append(actor)
+            self.AddActor(actor)
+
     def RemoveAllActors(self):
         for actor in self.actors:
             self.RemoveActor(actor)
@@ -288,6 +357,7 @@ class i3vtkWidget(QWidget):
         self.contourActors = []
         self.contourActorsMap = {}
         self.contourDiffActors = []
+        self.heatmap_tonnes = None
         self.UpdateView()
         if self.model:
             self.model.RemoveAllActors()
@@ -333,6 +403,26 @@ class i3vtkWidget(QWidget):
         self.picker.Pick(click_pos[0], click_pos[1], 0, self.renderer)
         actor = self.picker.GetActor()
 
+        layer = self.model.polyline_layer if self.model else None
+        if actor and layer is not None and layer.owns(actor):
+            polyline_id = layer.polyline_id_at(
+                self.picker.GetDataSet(), self.picker.GetCellId())
+            actor = PolylinePick(polyline_id) if polyline_id is not None else None
+
+        layer = self.model.point_layer if self.model else None
+        if layer is not None and layer.glyphs and layer.actor.GetVisibility():
+            # The picker only hits the glyphs' centre vertices: hit the drawn
+            # spheres instead, unless something else was picked in front.
+            p0, p1 = self._pick_ray(click_pos)
+            point_id, distance = layer.pick(p0, p1)
+            if point_id is not None and (
+                    not actor or layer.owns(actor)
+                    or distance < math.dist(p0, self.picker.GetPickPosition())):
+                actor = PointPick(point_id)
+        if actor and layer is not None and layer.owns(actor):
+            point_id = layer.point_id_at(self.picker.GetPointId())
+            actor = PointPick(point_id) if point_id is not None else None
+
         if actor:
             if self.selected_actor == actor:
                 self.deselect_actor(actor)
@@ -349,14 +439,36 @@ class i3vtkWidget(QWidget):
 
         self.UpdateView(False)
 
+    def _pick_ray(self, click_pos):
+        """The world coordinates of the near and far ends of the view ray
+        through display position click_pos."""
+        ends = []
+        for z in (0.0, 1.0):
+            self.renderer.SetDisplayPoint(click_pos[0], click_pos[1], z)
+            self.renderer.DisplayToWorld()
+            x, y, z, w = self.renderer.GetWorldPoint()
+            ends.append((x / w, y / w, z / w))
+        return ends
+
     def select_actor(self, actor):
         """Highlight a polyline or point actor on selection."""
         if self.model is None:
             return
 
-        if hasattr(actor, "polyline_id") and actor.polyline_id in self.model.polylines:
+        if isinstance(actor, PolylinePick):
+            layer = self.model.polyline_layer
+            if layer is None or actor.polyline_id not in layer:
+                return
+            layer.select(actor.polyline_id)
+            self.polylines_update_layer()
+        elif hasattr(actor, "polyline_id") and actor.polyline_id in self.model.polylines:
             actor.GetProperty().SetColor(Params.SelectedColor.value)
             actor.GetProperty().SetLineWidth(Params.PolylineSelectedWidth.value)
+        elif isinstance(actor, PointPick):
+            layer = self.model.point_layer
+            if layer is None or actor.point_id not in layer:
+                return
+            layer.select(actor.point_id)
         elif hasattr(actor, "point_id") and actor.point_id in self.model.points:
             actor.GetProperty().SetColor(Params.SelectedColor.value)
             actor = self.model.point_select(actor, Params.PointWinSelectedRadius.value)
@@ -370,7 +482,12 @@ class i3vtkWidget(QWidget):
         if self.model is None:
             return
 
-        if hasattr(actor, "polyline_id") and hasattr(actor, "color"):
+        if isinstance(actor, PolylinePick):
+            if self.model.polyline_layer is not None:
+                self.model.polyline_layer.deselect()
+                self.polylines_update_layer()
+
+        elif hasattr(actor, "polyline_id") and hasattr(actor, "color"):
             if self.heatmap:
                 color = getattr(actor, "rainbow_color")
                 width = getattr(actor, "rainbow_width")
@@ -380,6 +497,10 @@ class i3vtkWidget(QWidget):
             actor.GetProperty().SetColor(color)
             actor.GetProperty().SetLineWidth(width)
 
+        elif isinstance(actor, PointPick):
+            if self.model.point_layer is not None:
+                self.model.point_layer.deselect()
+
         elif hasattr(actor, "point_id") and hasattr(actor, "color"):
             actor.GetProperty().SetColor(getattr(actor, "color"))
             self.model.point_select(actor, Params.PointWinRadius.value)
@@ -389,6 +510,14 @@ class i3vtkWidget(QWidget):
 
         self.selected_actor = None
 
+    def polylines_update_layer(self):
+        """Apply the merged PolylineLayer's style and selection, swapping its
+        actors in the scene if the set of line widths changed."""
+        layer = self.model.polyline_layer
+        old_actors = layer.actors
+        if layer.update():
+            self.swap_actors(old_actors, layer.actors)
+
     # -------------------------------------------------------------------------
     # Dialogs
     # -------------------------------------------------------------------------
@@ -401,6 +530,11 @@ class i3vtkWidget(QWidget):
         if hasattr(actor, "polyline_id"):
             polyline_id = actor.polyline_id
             points = self.model.polylines[polyline_id]
+            layer = self.model.polyline_layer
+            if layer is not None and self.heatmap_tonnes is not None and polyline_id in layer:
+                # The tonne column is not updated per period with a merged layer.
+                tonne = float(self.heatmap_tonnes[layer.cells[polyline_id]])
+                points = [(*point[:5], tonne, *point[6:]) for point in points]
             num_points = len(points)
             polyline_length = self.calculate_polyline_length(points)
 
@@ -652,38 +786,73 @@ class i3vtkWidget(QWidget):
     # Heatmap
     # -------------------------------------------------------------------------
 
+    def heatmap_load_period(self, period):
+        """Load the tonnes of period for the heatmap (then call OnHeatMap).
+
+        With a merged PolylineLayer they are read as one array, in the
+        layer's cell order, into heatmap_tonnes; the polylines table is
+        neither updated nor read again. Otherwise the tonne column of the
+        polylines is updated for period and the polylines are reread.
+        """
+        if not self.model:
+            return
+        layer = self.model.polyline_layer
+        if layer is not None:
+            self.heatmap_tonnes = self.model.routes_tonnes_read_period(
+                period, layer.polyline_ids)
+        else:
+            self.model.updateRoutesTonnes(period)
+            self.polylines_update_data()
+
+    def heatmap_layer_tonnes(self, layer):
+        """Return the heatmap tonnes of layer's polylines in cell order: the
+        period loaded by heatmap_load_period, or else the tonne column the
+        polylines were read with."""
+        if self.heatmap_tonnes is not None:
+            return self.heatmap_tonnes
+        polylines = self.model.polylines
+        return np.array([polylines[polyline_id][0][5] or 0
+                         for polyline_id in layer.polyline_ids.tolist()], dtype=float)
+
     def OnHeatMap(self, enable):
         if not (self.model and self.model.polylines):
             return
 
         self.heatmap = enable
-        tonelajes = [
-            polyline[0][5] if polyline[0][5] is not None else 0
-            for polyline in self.model.polylines.values()
-        ]
-        min_tonelaje = min(tonelajes)
-        max_tonelaje = max(tonelajes)
-
-        for polyline_id, polyline in self.model.polylines.items():
-            tonelaje = polyline[0][5] if polyline[0][5] is not None else 0
-            actor = self.polylines_get_actor(polyline_id)
-
-            if enable:
-                color = self.rainbow_color(tonelaje, min_tonelaje, max_tonelaje)
-                width = self.rainbow_width(tonelaje, min_tonelaje, max_tonelaje)
-                setattr(actor, "rainbow_color", color)
-                setattr(actor, "rainbow_width", width)
-            else:
-                color = getattr(actor, "color")
-                width = Params.PolylineDefaultWidth.value
-
-            if hasattr(actor, "GetProperty"):
-                prop = getattr(actor, 'GetProperty')()
-                prop.SetColor(color)
-                prop.SetLineWidth(width)
+        layer = self.model.polyline_layer
+        if layer is not None:
+            tonnes = self.heatmap_layer_tonnes(layer)
+            min_tonelaje = float(tonnes.min()) if len(tonnes) else 0
+            max_tonelaje = float(tonnes.max()) if len(tonnes) else 0
+            self.heatmap_style_layer(layer, enable, tonnes, min_tonelaje, max_tonelaje)
+        else:
+            tonelajes = [
+                polyline[0][5] if polyline[0][5] is not None else 0
+                for polyline in self.model.polylines.values()
+            ]
+            min_tonelaje = min(tonelajes)
+            max_tonelaje = max(tonelajes)
+
+            for polyline_id, polyline in self.model.polylines.items():
+                tonelaje = polyline[0][5] if polyline[0][5] is not None else 0
+                actor = self.polylines_get_actor(polyline_id)
+
+                if enable:
+                    color = self.rainbow_color(tonelaje, min_tonelaje, max_tonelaje)
+                    width = self.rainbow_width(tonelaje, min_tonelaje, max_tonelaje)
+                    setattr(actor, "rainbow_color", color)
+                    setattr(actor, "rainbow_width", width)
+                else:
+                    color = getattr(actor, "color")
+                    width = Params.PolylineDefaultWidth.value
+
+                if hasattr(actor, "GetProperty"):
+                    prop = getattr(actor, 'GetProperty')()
+                    prop.SetColor(color)
+                    prop.SetLineWidth(width)
 
         if enable:
-            self.AddScaleBarActor()
+            self.AddScaleBarActor(min_tonelaje, max_tonelaje)
         else:
             self.RemoveScaleBarActor()
 
@@ -693,6 +862,23 @@ class i3vtkWidget(QWidget):
         else:
             self.UpdateView(False)
 
+    def heatmap_style_layer(self, layer, enable, tonnes, min_tonne, max_tonne):
+        """Switch the merged PolylineLayer to the heatmap of tonnes (in cell
+        order) or back to the polylines' own colours.
+
+        The heatmap colours the layer's tonne array (in Mt) through
+        Params.LookupTable, the table the scale bar shows (its range is
+        set by AddScaleBarActor), and takes the widths from rainbow_width
+        over the whole array. A period step only rewrites the two arrays.
+        """
+        if enable:
+            layer.set_heatmap(tonnes / 1_000_000,
+                              self.rainbow_width(tonnes, min_tonne, max_tonne),
+                              Params.LookupTable.value)
+        else:
+            layer.set_heatmap()
+        self.polylines_update_layer()
+
     def rainbow_color(self, tonne, min_tonne=0, max_tonne=100):
         """Map a tonne value to an RGB tuple using VTK's rainbow colormap."""
         lut = Params.LookupTable.value
@@ -706,12 +892,13 @@ class i3vtkWidget(QWidget):
         """Calculate proportional polyline width based on tonne value.
 
         Args:
-            tonne: Current tonne value.
+            tonne: Current tonne value, or a numpy array of them.
             min_tonne: Minimum of the data range.
             max_tonne: Maximum of the data range.
 
         Returns:
-            float: Linearly interpolated width, clamped to [min_width, max_width].
+            float: Linearly interpolated width, clamped to [min_width, max_width]
+            (an array of them for an array of tonnes, unless the range is empty).
         """
         min_width = Params.PolylineMinWidth.value
         max_width = Params.PolylineMaxWidth.value
@@ -719,7 +906,7 @@ class i3vtkWidget(QWidget):
         if min_tonne == max_tonne:
             return (min_width + max_width) / 2
 
-        clamped = max(min_tonne, min(max_tonne, tonne))
+        clamped = np.clip(tonne, min_tonne, max_tonne)
         return min_width + (clamped - min_tonne) * (max_width - min_width) / (max_tonne - min_tonne)
 
     # -------------------------------------------------------------------------
@@ -755,10 +942,10 @@ class i3vtkWidget(QWidget):
     # Scale Bar
     # -------------------------------------------------------------------------
 
-    def AddScaleBarActor(self):
-        """Add the colour scale bar (Mt) to the renderer."""
+    def AddScaleBarActor(self, min_tonne, max_tonne):
+        """Add the colour scale bar (Mt) to the renderer, setting the range
+        of Params.LookupTable to min_tonne..max_tonne in Mt."""
         lut = Params.LookupTable.value
-        min_tonne, max_tonne = lut.GetTableRange()
         lut.SetTableRange(min_tonne / 1_000_000, max_tonne / 1_000_000)
         lut.Build()
 
@@ -794,29 +981,37 @@ class i3vtkWidget(QWidget):
             return
         if enable:
             self.polylabels_create_actors(fileType)
-        for _, label in self.model.polylabels.items():
-            if enable:
-                self.AddActor(label)
-            else:
-                self.RemoveActor(label)
+            self.AddActor(self.model.polylabels.actor)
+        else:
+            self.RemoveActor(self.model.polylabels.actor)
         self.UpdateView(False)
 
     def polylabels_create_actors(self, fileType):
+        """Fill the polyline LabelLayer with one label per polyline.
+
+        The anchors are only recomputed when the set of polylines changed;
+        otherwise (e.g. a heatmap period step) only the texts and the
+        priorities are rewritten. With the heatmap, heavier routes win
+        the placement; otherwise longer polylines do.
+        """
         if not (self.model and self.model.polylines):
             return
 
-        if fileType == FileType.DB:
-            self.model.polylabels = {}
-            self.model.polylabel_id = 1
-
+        labels = self.model.polylabels
+        layer = self.model.polyline_layer
+        period_tonnes = {}
+        if layer is not None and self.heatmap_tonnes is not None:
+            period_tonnes = dict(zip(layer.polyline_ids.tolist(), self.heatmap_tonnes.tolist()))
+        texts = []
+        tonnes = []
         for polyline_id, polyline in self.model.polylines.items():
-            actor = self.polylines_get_actor(polyline_id)
             row = polyline[0]
 
             if fileType == FileType.DB and self.heatmap:
                 route = row[4] if row[4] is not None else str(polyline_id)
-                tonelaje = row[5] if row[5] is not None else 0
+                tonelaje = period_tonnes.get(polyline_id, row[5] if row[5] is not None else 0)
                 label = f"{route}={tonelaje / 1_000_000:,.1f}Mt"
+                tonnes.append(tonelaje)
             elif fileType == FileType.DB and not self.heatmap:
                 route = row[4] if row[4] is not None else str(polyline_id)
                 label = f"{route}"
@@ -824,16 +1019,18 @@ class i3vtkWidget(QWidget):
                 label = f"{polyline_id}"
             else:
                 label = ""
+            texts.append(label)
 
-            label_actor = self.model.polylabels_create_actor(actor, label)
-            self.model.polylabels[self.model.polylabel_id] = label_actor
-            self.model.polylabel_id += 1
+        priorities = tonnes if len(tonnes) == len(texts) else None
+        if labels.ids != list(self.model.polylines):
+            polyline_ids, positions, lengths = self.model.polylabels_anchors()
+            labels.set_labels(polyline_ids, positions, texts, lengths)
+        labels.set_texts(texts, priorities)
 
     def CleanPolylabels(self):
         if not self.model:
             return
-        for _, label in self.model.polylabels.items():
-            self.RemoveActor(label)
+        self.RemoveActor(self.model.polylabels.actor)
 
     # -------------------------------------------------------------------------
     # Point Labels
@@ -844,37 +1041,34 @@ class i3vtkWidget(QWidget):
             return
         if enable:
             self.pointlabels_create_actors(fileType)
-        for _, label in self.model.pointlabels.items():
-            if enable:
-                self.AddActor(label)
-            else:
-                self.RemoveActor(label)
+            self.AddActor(self.model.pointlabels.actor)
+        else:
+            self.RemoveActor(self.model.pointlabels.actor)
         self.UpdateView(False)
 
     def pointlabels_create_actors(self, fileType):
+        """Fill the point LabelLayer with one label per point (its name),
+        recomputing the anchors only when the set of points changed."""
         if not (self.model and self.model.points):
             return
 
-        if fileType == FileType.DB:
-            self.model.pointlabels = {}
-            self.model.pointlabel_id = 1
-
-        for point_id, point in self.model.points.items():
-            actor = self.points_get_actor(point_id)
+        texts = []
+        for point in self.model.points.values():
             label = ""
             if fileType in (FileType.SRG, FileType.DB):
                 name = point[0][3] if point[0][3] is not None else ""
                 label = name.upper()
+            texts.append(label)
 
-            label_actor = self.model.pointlabels_create_actor(actor, label)
-            self.model.pointlabels[self.model.pointlabel_id] = label_actor
-            self.model.pointlabel_id += 1
+        labels = self.model.pointlabels
+        if labels.ids != list(self.model.points):
+            labels.set_labels(*self.model.pointlabels_anchors(), texts)
+        labels.set_texts(texts)
 
     def CleanPointlabels(self):
         if not self.model:
             return
-        for _, label in self.model.pointlabels.items():
-            self.RemoveActor(label)
+        self.RemoveActor(self.model.pointlabels.actor)
 
     # -------------------------------------------------------------------------
     # Surface & Wireframe
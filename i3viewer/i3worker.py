@@ -0,0 +1,135 @@
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from i3viewer.i3model import OperationCancelled
+
+
+class _ThreadStdout:
+    """sys.stdout stand-in that also hands what a worker thread prints to
+    that worker's log callback, one complete line at a time.
+
+    Everything is still written to the real stdout, so console output is
+    the same as before; other threads are not affected. Without a real
+    stdout (sys.stdout is None in a windowed build), lines only go to the
+    log callbacks.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sinks = {}     # thread ident -> [log callback, pending text]
+
+    def write(self, text):
+        sink = self.sinks.get(threading.get_ident())
+        if sink is not None:
+            *lines, sink[1] = (sink[1] + text).split("\n")
+            for line in lines:
+                sink[0](line)
+        if self.stream is None:
+            return len(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+_stdout_lock = threading.Lock()
+
+
+@contextmanager
+def _capture_prints(log):
+    """Also send the calling thread's prints to log, line by line, for
+    the duration of the block."""
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _ThreadStdout):
+            sys.stdout = _ThreadStdout(sys.stdout)
+        proxy = sys.stdout
+        ident = threading.get_ident()
+        proxy.sinks[ident] = [log, ""]
+    try:
+        yield
+    finally:
+        with _stdout_lock:
+            _, pending = proxy.sinks.pop(ident)
+            if not proxy.sinks and sys.stdout is proxy:
+                sys.stdout = proxy.stream
+        if pending:
+            log(pending)
+
+
+class WorkerSignals(QObject):
+    """Signals of a Worker. They are emitted from the pool thread and
+    delivered, queued, to slots living on the GUI thread."""
+
+    progress = Signal(int, int, str)    # done, total, label
+    log = Signal(str)                   # one line printed by the job
+    finished = Signal(object)           # the job's return value
+    cancelled = Signal()                # the job stopped on cancel()
+    failed = Signal(str)                # the job raised; formatted traceback
+
+
+class Worker(QRunnable):
+    """Run a long i3model operation on the global QThreadPool.
+
+    fn is called as fn(worker) on the pool thread. It reports progress
+    through worker.report(done, total, label), and passes
+    worker.is_cancelled as the operation's cancel callable: i3model raises
+    OperationCancelled from inside its open transaction, so partial writes
+    are rolled back. Lines the job prints are emitted on signals.log.
+
+    Exactly one of signals.finished, signals.cancelled or signals.failed is
+    emitted when fn returns.
+
+    Usage:
+        worker = Worker(lambda w: model.run_contour_diff(
+            "All", progress=w.report, cancel=w.is_cancelled))
+        worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(on_done)
+        worker.start()
+        ...
+        worker.cancel()
+    """
+
+    def __init__(self, fn):
+        super().__init__()
+        # The caller holds the reference; the pool must not delete it.
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.signals = WorkerSignals()
+        self._cancel = threading.Event()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        QThreadPool.globalInstance().start(self)
+
+    def cancel(self):
+        """Ask the job to stop at its next cancellation check."""
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def report(self, done, total, label):
+        self.signals.progress.emit(done, total, str(label))
+
+    def run(self):
+        try:
+            with _capture_prints(self.signals.log.emit):
+                result = self.fn(self)
+        except OperationCancelled:
+            self.running = False
+            self.signals.cancelled.emit()
+        except Exception:
+            self.running = False
+            self.signals.failed.emit(traceback.format_exc())
+        else:
+            self.running = False
+            self.signals.finished.emit(result)
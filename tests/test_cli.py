@@ -0,0 +1,41 @@
+"""i3viewer-cli writes nothing but its JSON report to stdout, including
+what the parsing and clipping pools' processes print."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.synthetic import generate
+
+SIZES = dict(pits=1, benches=2, ring_points=60, periods=3, shovels=2,
+             routes=1, route_points=5, points=1)
+
+
+@pytest.fixture
+def data(tmp_path):
+    generate(str(tmp_path / "data"), SIZES, seed=7)
+    return tmp_path / "data"
+
+
+def _cli(tmp_path, data, *extra):
+    env = dict(os.environ, I3VIEWER_CACHE_DIR=str(tmp_path / "cache"))
+    return subprocess.run(
+        [sys.executable, "-m", "i3viewer.i3cli", "--db", str(tmp_path / "test.db"),
+         "--folder", str(data / "cuts"), "--surfaces", str(data / "pit.xyzs"),
+         "--workers", "2", *extra],
+        capture_output=True, text=True, env=env, check=True)
+
+
+@pytest.mark.parametrize("quiet", [False, True])
+def test_stdout_is_the_json_report(tmp_path, data, quiet):
+    done = _cli(tmp_path, data, *(["--quiet"] if quiet else []), "--all-shovels")
+    report = json.loads(done.stdout)
+    assert [result["result_name"] for result in report["diff"]["results"]] == \
+        ["cuts_All", "cuts_SH001", "cuts_SH002"]
+    assert report["import"]["imported"] == SIZES["periods"] * SIZES["shovels"]
+    if quiet:
+        assert "_boundary_substitution" not in done.stderr
+    else:
+        assert "_boundary_substitution" in done.stderr
@@ -0,0 +1,69 @@
+"""i3model.run_contour_diff_batch writes the same contourdiffs and
+contourdiff_periods rows as one run_contour_diff per shovel, in both
+storage layouts, on a first run and on a resumed one."""
+import contextlib
+import glob
+import io
+
+import pytest
+
+from benchmarks.synthetic import generate
+from i3viewer.i3model import i3model
+
+SIZES = dict(pits=1, benches=3, ring_points=80, periods=4, shovels=3,
+             routes=1, route_points=5, points=1)
+SHOVELS = ["All", "SH001", "SH002", "SH003"]
+
+
+@pytest.fixture(params=[False, True], ids=["points", "rings"])
+def model(request, tmp_path, monkeypatch):
+    """A model on a fresh database, in the point-per-row or the ring_storage
+    layout, holding the pit surfaces and the cuts of a small synthetic data
+    set with several shovels per period."""
+    monkeypatch.setenv("I3VIEWER_CACHE_DIR", str(tmp_path / "cache"))
+    data = tmp_path / "data"
+    generate(str(data), SIZES, seed=11)
+    model = i3model(str(data / "pit.xyzs"))
+    model.ring_storage = request.param
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.surfaces = model.surfaces_read_xyzs_file()
+        model.surfaces_save_database(str(tmp_path / "test.db"))
+        model.surfaces = {}
+        model.file_path = str(tmp_path / "test.db")
+        model.import_files(sorted(glob.glob(str(data / "cuts" / "*.xyzs"))), workers=1)
+    return model
+
+
+def _rows(model, table, result_name):
+    """Every row of result_name in table, without the result_name column."""
+    with model._connect() as conn:
+        cursor = conn.cursor()
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")
+                   if row[1] != "result_name"]
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE result_name = ?",
+                       (result_name,))
+        return sorted(cursor.fetchall())
+
+
+def _assert_same_rows(model, batch_name, separate_name):
+    for table in ("contourdiffs", "contourdiff_periods"):
+        rows = _rows(model, table, separate_name)
+        assert rows
+        assert _rows(model, table, batch_name) == rows
+
+
+def test_batch_matches_separate_runs(model):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = model.run_contour_diff_batch(SHOVELS, "batch", workers=1)
+        separate = [model.run_contour_diff(shovel, f"sep_{shovel}", workers=1)
+                    for shovel in SHOVELS]
+    assert [result.result_name for result in results] == [f"batch_{s}" for s in SHOVELS]
+    for shovel, result, single in zip(SHOVELS, results, separate):
+        assert result._replace(result_name=None) == single._replace(result_name=None)
+        _assert_same_rows(model, f"batch_{shovel}", f"sep_{shovel}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        resumed = model.run_contour_diff_batch(SHOVELS, "batch", workers=1)
+    assert resumed == [result._replace(reused=SIZES["periods"]) for result in results]
+    for shovel in SHOVELS:
+        _assert_same_rows(model, f"batch_{shovel}", f"sep_{shovel}")
@@ -0,0 +1,76 @@
+"""Contour-diff snapshots stay readable when a run is resumed with another
+keyframe interval (i3model.contourdiff_keyframe_interval)."""
+import contextlib
+import glob
+import io
+
+import pytest
+
+from benchmarks.synthetic import generate
+from i3viewer.i3model import i3model
+
+SIZES = dict(pits=1, benches=3, ring_points=120, periods=6, shovels=1,
+             routes=1, route_points=5, points=1)
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """A model on a fresh database holding the pit surfaces and the cuts of
+    a small synthetic data set (in tmp_path / "data")."""
+    monkeypatch.setenv("I3VIEWER_CACHE_DIR", str(tmp_path / "cache"))
+    data = tmp_path / "data"
+    generate(str(data), SIZES, seed=3)
+    model = i3model(str(data / "pit.xyzs"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.surfaces = model.surfaces_read_xyzs_file()
+        model.surfaces_save_database(str(tmp_path / "test.db"))
+        model.surfaces = {}
+        model.file_path = str(tmp_path / "test.db")
+        model.import_files(sorted(glob.glob(str(data / "cuts" / "*.xyzs"))), workers=1)
+    return model
+
+
+def _run(model, result_name, interval, resume=True):
+    model.contourdiff_keyframe_interval = interval
+    with contextlib.redirect_stdout(io.StringIO()):
+        return model.run_contour_diff("All", result_name, workers=1, resume=resume)
+
+
+def _snapshots(model, result_name, periods):
+    with model._connect() as conn:
+        cursor = conn.cursor()
+        return [i3model._contourdiffs_read_snapshot(cursor, result_name, contourdiff_id)
+                for contourdiff_id in range(1, periods + 1)]
+
+
+def _keyframes(model, result_name):
+    with model._connect() as conn:
+        return [checkpoint.keyframe for checkpoint in
+                i3model._contourdiff_checkpoints(conn.cursor(), result_name)]
+
+
+def test_resume_with_smaller_interval_keeps_snapshots(model, tmp_path):
+    _run(model, "run", interval=6)
+    assert _keyframes(model, "run") == [1] * 6
+
+    # Change the last period's cuts: keep only its first ring.
+    last = sorted(glob.glob(str(tmp_path / "data" / "cuts" / "*.xyzs")))[-1]
+    with open(last) as f:
+        first_ring = f.read().split("$\n")[0]
+    with open(last, "w") as f:
+        f.write(first_ring)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.import_files([last], workers=1)
+
+    result = _run(model, "run", interval=2)
+    assert result.reused == 5
+    _run(model, "clean", interval=2, resume=False)
+
+    keyframes = _keyframes(model, "run")
+    assert all(keyframes[k - 1] == k for k in keyframes)     # keyframes are keyframes
+    assert _snapshots(model, "run", 6) == _snapshots(model, "clean", 6)
+
+
+def test_clean_run_keyframes_follow_interval(model):
+    _run(model, "run", interval=4)
+    assert _keyframes(model, "run") == [1, 1, 1, 1, 5, 5]
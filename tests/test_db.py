@@ -0,0 +1,30 @@
+"""i3db bulk transactions."""
+import sqlite3
+
+import pytest
+
+from i3viewer.i3db import bulk_transaction
+
+
+def test_bulk_transaction_refuses_an_open_transaction(tmp_path):
+    conn = sqlite3.connect(tmp_path / "t.db")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    with pytest.raises(RuntimeError):
+        with bulk_transaction(conn, "t", verbose=False):
+            pass
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_bulk_transaction_restores_pragmas(tmp_path):
+    conn = sqlite3.connect(tmp_path / "t.db")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    before = [conn.execute(f"PRAGMA {name}").fetchone()[0]
+              for name in ("journal_mode", "synchronous", "cache_size")]
+    with bulk_transaction(conn, "t", verbose=False) as writer:
+        writer.insert("INSERT INTO t VALUES (?)", ((k,) for k in range(10)))
+    assert writer.stats.rows == 10
+    assert [conn.execute(f"PRAGMA {name}").fetchone()[0]
+            for name in ("journal_mode", "synchronous", "cache_size")] == before
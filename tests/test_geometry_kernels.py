@@ -0,0 +1,125 @@
+"""Parity of the batch 2D kernels of i3viewer.i3geometry with the scalar
+i3model._point_in_polygon_2d / _segment_intersect_2d they replace.
+
+Random polygons, query points and segment pairs include the degenerate
+cases clipping runs into: query points on polygon vertices and edges,
+horizontal edges, parallel and collinear segments, shared and touching
+endpoints, and mine-grid coordinates around 8e6. Results must be
+identical, not just close.
+"""
+import math
+import random
+
+import pytest
+
+from i3viewer.i3geometry import points_in_polygon_2d, segments_intersect_2d
+from i3viewer.i3model import i3model
+
+TRIALS = 40
+SIZE = 300
+
+
+def _coord(rng, origin, span, grid):
+    """A coordinate near origin, snapped to a coarse grid half the time so
+    that exact ties (equal x or y, shared vertices) are common."""
+    v = origin + rng.uniform(-span, span)
+    return round(v / grid) * grid if rng.random() < 0.5 else round(v, 3)
+
+
+def random_polygon(rng, n, origin):
+    cx, cy = origin
+    poly = []
+    for k in range(n):
+        a = 2 * math.pi * k / n
+        r = 100.0 * (1 + 0.4 * math.sin(3 * a) + rng.uniform(-0.2, 0.2))
+        poly.append((round(cx + r * math.cos(a), 3), round(cy + r * math.sin(a), 3), 3015.0))
+    if rng.random() < 0.5:
+        poly.append(poly[0])
+    return poly
+
+
+def random_queries(rng, poly, m, origin):
+    xs, ys = [], []
+    for _ in range(m):
+        kind = rng.random()
+        if kind < 0.2:                      # on a vertex
+            p = rng.choice(poly)
+            x, y = p[0], p[1]
+        elif kind < 0.4:                    # on an edge
+            k = rng.randrange(len(poly))
+            p, q = poly[k], poly[(k + 1) % len(poly)]
+            s = rng.choice([0.0, 0.5, 1.0, rng.random()])
+            x, y = p[0] + s * (q[0] - p[0]), p[1] + s * (q[1] - p[1])
+        elif kind < 0.5:                    # level with a vertex
+            x = _coord(rng, origin[0], 150.0, 5.0)
+            y = rng.choice(poly)[1]
+        else:
+            x = _coord(rng, origin[0], 150.0, 5.0)
+            y = _coord(rng, origin[1], 150.0, 5.0)
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+
+def random_segments(rng, m, origin):
+    p1s, p2s, p3s, p4s = [], [], [], []
+    for _ in range(m):
+        p1 = (_coord(rng, origin[0], 20.0, 1.0), _coord(rng, origin[1], 20.0, 1.0))
+        p2 = (_coord(rng, origin[0], 20.0, 1.0), _coord(rng, origin[1], 20.0, 1.0))
+        kind = rng.random()
+        if kind < 0.15:                     # parallel or collinear
+            off = rng.choice([0.0, 1.0, 1e-9])
+            s0, s1 = rng.uniform(-1, 2), rng.uniform(-1, 2)
+            p3 = (p1[0] + s0 * (p2[0] - p1[0]) + off, p1[1] + s0 * (p2[1] - p1[1]))
+            p4 = (p1[0] + s1 * (p2[0] - p1[0]) + off, p1[1] + s1 * (p2[1] - p1[1]))
+        elif kind < 0.3:                    # shares or touches an endpoint
+            p3 = rng.choice([p1, p2, ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)])
+            p4 = (_coord(rng, origin[0], 20.0, 1.0), _coord(rng, origin[1], 20.0, 1.0))
+        elif kind < 0.35:                   # zero-length
+            p3 = p4 = rng.choice([p1, p2])
+        else:
+            p3 = (_coord(rng, origin[0], 20.0, 1.0), _coord(rng, origin[1], 20.0, 1.0))
+            p4 = (_coord(rng, origin[0], 20.0, 1.0), _coord(rng, origin[1], 20.0, 1.0))
+        p1s.append(p1)
+        p2s.append(p2)
+        p3s.append(p3)
+        p4s.append(p4)
+    return p1s, p2s, p3s, p4s
+
+
+@pytest.mark.parametrize("seed", range(TRIALS))
+def test_points_in_polygon_2d_matches_scalar(seed):
+    rng = random.Random(seed)
+    origin = rng.choice([(0.0, 0.0), (8.0e6, 8.0e6)])
+    poly = random_polygon(rng, rng.choice([3, 4, 12, 100, 400]), origin)
+    xs, ys = random_queries(rng, poly, SIZE, origin)
+
+    want = [i3model._point_in_polygon_2d(x, y, poly) for x, y in zip(xs, ys)]
+    got = points_in_polygon_2d(xs, ys, poly).tolist()
+
+    mismatches = [(xs[k], ys[k], want[k], got[k]) for k in range(SIZE) if got[k] != want[k]]
+    assert not mismatches
+
+
+@pytest.mark.parametrize("seed", range(TRIALS))
+def test_segments_intersect_2d_matches_scalar(seed):
+    rng = random.Random(seed)
+    origin = rng.choice([(0.0, 0.0), (8.0e6, 8.0e6)])
+    p1s, p2s, p3s, p4s = random_segments(rng, SIZE, origin)
+
+    want = [i3model._segment_intersect_2d(*seg) for seg in zip(p1s, p2s, p3s, p4s)]
+    hit, t, u, ix, iy = segments_intersect_2d(p1s, p2s, p3s, p4s)
+    got = [
+        (tk, uk, xk, yk) if h else None
+        for h, tk, uk, xk, yk in zip(hit.tolist(), t.tolist(), u.tolist(),
+                                     ix.tolist(), iy.tolist())
+    ]
+
+    mismatches = [(p1s[k], p2s[k], p3s[k], p4s[k], want[k], got[k])
+                  for k in range(SIZE) if got[k] != want[k]]
+    assert not mismatches
+
+
+def test_segments_intersect_2d_empty():
+    hit, t, u, ix, iy = segments_intersect_2d([], [], [], [])
+    assert hit.shape == t.shape == u.shape == ix.shape == iy.shape == (0,)
@@ -0,0 +1,46 @@
+"""PointLayer.pick hits the glyph spheres drawn around the points, not
+just their centres."""
+import pytest
+
+from i3viewer.i3enums import Params
+from i3viewer.i3layers import PointLayer
+
+R = Params.PointWinRadius.value
+
+
+@pytest.fixture
+def layer():
+    points = {7: [(0.0, 0.0, 0.0)], 8: [(0.0, 0.0, -5 * R)], 9: [(10 * R, 0.0, 0.0)]}
+    colors = {point_id: (1.0, 1.0, 1.0) for point_id in points}
+    return PointLayer(points, colors, glyphs=True)
+
+
+def _down(x, y=0.0):
+    """A vertical pick ray through (x, y), from above."""
+    return (x, y, 100 * R), (x, y, -100 * R)
+
+
+def test_pick_hits_sphere_off_centre(layer):
+    point_id, distance = layer.pick(*_down(0.8 * R))
+    assert point_id == 7
+    assert distance == pytest.approx(100 * R - 0.6 * R)
+    assert layer.pick(*_down(10 * R, 0.9 * R))[0] == 9
+
+
+def test_pick_misses_outside_radius(layer):
+    assert layer.pick(*_down(1.1 * R)) == (None, None)
+    assert layer.pick(*_down(5 * R)) == (None, None)
+
+
+def test_pick_first_sphere_and_selected_radius(layer):
+    # 8 is straight below 7: the ray enters 7 first.
+    assert layer.pick(*_down(0.0))[0] == 7
+    # Selecting 8 draws it larger: offsets beyond R then hit it.
+    offset = (R + Params.PointWinSelectedRadius.value) / 2
+    assert layer.pick(*_down(offset))[0] is None
+    layer.select(8)
+    assert layer.pick(*_down(offset))[0] == 8
+
+
+def test_pick_ignores_spheres_behind_the_ray(layer):
+    assert layer.pick((0.0, 0.0, -100 * R), (0.0, 0.0, -200 * R)) == (None, None)
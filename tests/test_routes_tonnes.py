@@ -0,0 +1,40 @@
+"""i3model.routes_tonnes_read_period returns the tonnes updateRoutesTonnes
+writes to the polylines' tonne column, period by period."""
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from benchmarks.suite import Suite
+from benchmarks.synthetic import generate
+
+SIZES = dict(pits=1, benches=2, ring_points=40, periods=5, shovels=1,
+             routes=24, route_points=4, points=1)
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """A model on a database holding polylines, routes and routes_tonnes."""
+    monkeypatch.setenv("I3VIEWER_CACHE_DIR", str(tmp_path / "cache"))
+    generate(str(tmp_path / "data"), SIZES, seed=5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Suite(str(tmp_path / "data"), str(tmp_path), 1).db_with_heatmap()
+
+
+def test_read_period_matches_update(model):
+    polyline_ids = np.array(list(model.polylines), dtype=np.int64)[::-1]
+    for period in range(1, model.getMaxPeriod() + 1):
+        tonnes = model.routes_tonnes_read_period(period, polyline_ids)
+        model.updateRoutesTonnes(period)
+        model.polylines_reread_table()
+        expected = [model.polylines[polyline_id][0][5] or 0
+                    for polyline_id in polyline_ids.tolist()]
+        assert tonnes == pytest.approx(expected, rel=1e-12)
+        assert tonnes.any()
+
+
+def test_read_period_unknown_ids_and_period(model):
+    assert model.routes_tonnes_read_period(1, []).shape == (0,)
+    assert not model.routes_tonnes_read_period(999, list(model.polylines)).any()
+    assert model.routes_tonnes_read_period(1, [10_000]).tolist() == [0.0]
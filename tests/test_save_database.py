@@ -0,0 +1,46 @@
+"""The *_save_database paths don't keep exported databases open."""
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.synthetic import generate
+from i3viewer.i3model import i3model
+
+SIZES = dict(pits=1, benches=2, ring_points=20, periods=1, shovels=1,
+             routes=3, route_points=4, points=5)
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.setenv("I3VIEWER_CACHE_DIR", str(tmp_path / "cache"))
+    generate(str(tmp_path / "data"), SIZES, seed=2)
+    return tmp_path / "data"
+
+
+@pytest.mark.parametrize("kind, source, reader", [
+    ("polylines", "polylines.csv", "polylines_read_csv_file"),
+    ("points", "points.srg", "points_read_srg_file"),
+    ("surfaces", "pit.xyzs", "surfaces_read_xyzs_file"),
+])
+def test_export_leaves_no_pooled_connection(data, tmp_path, kind, source, reader):
+    model = i3model(str(data / source))
+    setattr(model, kind, getattr(model, reader)())
+    exported = tmp_path / "export.db"
+    with contextlib.redirect_stdout(io.StringIO()):
+        getattr(model, f"{kind}_save_database")(str(exported))
+    assert model.last_write_stats.rows > 0
+    assert model.db.connections_opened == 0
+    exported.unlink()
+
+
+def test_save_to_current_file_uses_the_pool(data, tmp_path):
+    db = tmp_path / "project.db"
+    model = i3model(str(db))
+    model.file_path = str(data / "polylines.csv")
+    model.polylines = model.polylines_read_csv_file()
+    model.file_path = str(db)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.polylines_save_database(str(db))
+    assert model.db.connections_opened == 1
+    assert model.hasPolylinesTable()
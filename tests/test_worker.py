@@ -0,0 +1,28 @@
+"""i3worker._capture_prints, with and without a real stdout."""
+import sys
+import threading
+
+from i3viewer.i3worker import _capture_prints
+
+
+def test_capture_prints_without_stdout(monkeypatch):
+    # A windowed (console=False) build has no stdout at all.
+    monkeypatch.setattr(sys, "stdout", None)
+    lines = []
+    with _capture_prints(lines.append):
+        print("first")
+        print("second", end="")
+        sys.stdout.flush()
+    assert lines == ["first", "second"]
+    assert sys.stdout is None
+
+
+def test_capture_prints_writes_through(capsys):
+    lines = []
+    with _capture_prints(lines.append):
+        print("a\nb")
+        other = threading.Thread(target=print, args=("other thread",))
+        other.start()
+        other.join()
+    assert lines == ["a", "b"]
+    assert capsys.readouterr().out == "a\nb\nother thread\n"